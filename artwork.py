@@ -0,0 +1,498 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+logger = logging.getLogger("Artwork")
+
+# Tamaños (lado máximo en píxeles) a los que se redondean las peticiones
+DEFAULT_SIZES = (64, 128, 256, 512)
+DEFAULT_MEMORY_BYTES = 16 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+JPEG_QUALITY = 85
+RESIZE_TIMEOUT = 30  # segundos
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+# Nombres habituales de la carátula de un directorio, por preferencia
+COVER_NAMES = ('cover', 'folder', 'front')
+FRONT_COVER = 3  # tipo de imagen APIC "Cover (front)"
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Imagen original de la que salen las miniaturas. 'embedded': está en el
+# tag ID3 de 'path'; si no, 'path' es el fichero de imagen.
+Source = namedtuple('Source', 'path embedded mime digest width height')
+# Imagen que se sirve: size 0 es el original tal cual
+Variant = namedtuple('Variant', 'source size mime width height version')
+
+
+def syncsafe(data):
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7f)
+    return value
+
+
+def read_id3_tag(path):
+    """Versión y cuerpo del tag ID3v2 al principio de 'path', o None."""
+    with open(path, 'rb') as f:
+        header = f.read(10)
+        if len(header) < 10 or header[:3] != b'ID3':
+            return None
+        version, flags = header[3], header[5]
+        data = f.read(syncsafe(header[6:10]))
+
+    if version == 2 and flags & 0x40:
+        return None  # v2.2 comprimido: no hay forma estándar de leerlo
+    if flags & 0x80 and version < 4:
+        data = data.replace(b'\xff\x00', b'\xff')
+    if flags & 0x40 and version == 3:
+        data = data[4 + int.from_bytes(data[:4], 'big'):]
+    elif flags & 0x40 and version == 4:
+        data = data[syncsafe(data[:4]):]
+    return version, data
+
+
+def id3_frames(version, data):
+    """Recorre los frames del tag: (identificador, contenido)."""
+    header_size = 6 if version == 2 else 10
+    pos = 0
+    while pos + header_size <= len(data):
+        if version == 2:
+            frame_id, flags = data[pos:pos + 3], 0
+            size = int.from_bytes(data[pos + 3:pos + 6], 'big')
+        else:
+            frame_id = data[pos:pos + 4]
+            size_bytes = data[pos + 4:pos + 8]
+            if version == 4:
+                size = syncsafe(size_bytes)
+            else:
+                size = int.from_bytes(size_bytes, 'big')
+            flags = int.from_bytes(data[pos + 8:pos + 10], 'big')
+
+        if not frame_id.strip(b'\0'):
+            break  # relleno
+        body = data[pos + header_size:pos + header_size + size]
+        pos += header_size + size
+
+        if version == 3 and flags & 0x00c0 or version == 4 and flags & 0x000c:
+            continue  # comprimido o cifrado
+        if version == 4:
+            if flags & 0x0001:
+                body = body[4:]
+            if flags & 0x0002:
+                body = body.replace(b'\xff\x00', b'\xff')
+        yield frame_id, body
+
+
+def parse_picture(version, body):
+    """Tipo de imagen y datos de un frame APIC (PIC en v2.2)."""
+    encoding = body[0]
+    if version == 2:
+        pos = 4  # formato de 3 letras: 'JPG', 'PNG'
+    else:
+        pos = body.index(b'\0', 1) + 1  # tipo MIME
+    picture_type = body[pos]
+    pos += 1
+
+    # Descripción terminada en 0; en UTF-16 el terminador son dos bytes
+    if encoding in (1, 2):
+        while body[pos:pos + 2] != b'\0\0':
+            if pos >= len(body):
+                raise ValueError("Unterminated picture description")
+            pos += 2
+        pos += 2
+    else:
+        pos = body.index(b'\0', pos) + 1
+    return picture_type, body[pos:]
+
+
+def read_embedded_picture(path):
+    """La portada incrustada en el MP3 (o la primera imagen), o None."""
+    tag = read_id3_tag(path)
+    if tag is None:
+        return None
+
+    version, data = tag
+    frame_id = b'PIC' if version == 2 else b'APIC'
+    found = None
+    for name, body in id3_frames(version, data):
+        if name != frame_id:
+            continue
+        picture_type, picture = parse_picture(version, body)
+        if picture_type == FRONT_COVER:
+            return picture
+        found = found or picture
+    return found
+
+
+def image_info(data):
+    """Tipo MIME, ancho y alto de una imagen JPEG o PNG, leídos de su cabecera."""
+    if data.startswith(PNG_SIGNATURE) and data[12:16] == b'IHDR':
+        width, height = struct.unpack('>II', data[16:24])
+        return 'image/png', width, height
+
+    if not data.startswith(b'\xff\xd8'):
+        return None
+    pos = 2
+    while pos + 9 <= len(data):
+        if data[pos] != 0xff:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xff:
+            pos += 1
+            continue
+        if marker == 0x01 or 0xd0 <= marker <= 0xd8:
+            pos += 2
+            continue
+        # SOF0..SOF15 salvo DHT, JPG y DAC: ahí están las dimensiones
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            return 'image/jpeg', width, height
+        pos += 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+    return None
+
+
+def fit(width, height, box):
+    """Dimensiones dentro de un cuadrado de lado 'box', sin ampliar."""
+    if width <= box and height <= box:
+        return width, height
+    scale = box / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def variant_version(digest, size):
+    """Versión (tipo ETag) de una imagen servida; 0 significa 'sin carátula'."""
+    value = hashlib.sha256(f"{digest}.{size}".encode()).digest()[:8]
+    return (int.from_bytes(value, 'big') >> 1) or 1
+
+
+def find_folder_cover(media_dir):
+    """La carátula del directorio: cover/folder/front.* o, si no, la primera imagen."""
+    images = sorted(
+        path for path in Path(media_dir).iterdir()
+        if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES)
+    for name in COVER_NAMES:
+        for path in images:
+            if name in path.stem.lower():
+                return path
+    return images[0] if images else None
+
+
+def resize(data, width, height, quality=JPEG_QUALITY):
+    """
+    Decodifica la imagen y la recodifica como JPEG de width x height.
+    Se ejecuta dentro de un proceso del pool, por eso GStreamer se importa aquí.
+    """
+    from gst_player import init_gst
+    Gst = init_gst()
+
+    pipeline = Gst.parse_launch(
+        'appsrc name=src ! decodebin ! videoconvert ! videoscale ! '
+        f'video/x-raw,width={width},height={height},pixel-aspect-ratio=1/1 ! '
+        f'jpegenc quality={quality} ! appsink name=sink sync=false')
+    pipeline.set_state(Gst.State.PLAYING)
+    src = pipeline.get_by_name('src')
+    src.emit('push-buffer', Gst.Buffer.new_wrapped(data))
+    src.emit('end-of-stream')
+
+    msg = pipeline.get_bus().timed_pop_filtered(
+        RESIZE_TIMEOUT * Gst.SECOND, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    sample = None
+    if msg and msg.type == Gst.MessageType.EOS:
+        sample = pipeline.get_by_name('sink').emit('pull-sample')
+    pipeline.set_state(Gst.State.NULL)
+
+    if sample is None:
+        if msg is None:
+            reason = "timeout"
+        elif msg.type == Gst.MessageType.ERROR:
+            reason = msg.parse_error()[0].message
+        else:
+            reason = "no image decoded"
+        raise RuntimeError(f"Resize to {width}x{height}: {reason}")
+    buffer = sample.get_buffer()
+    return buffer.extract_dup(0, buffer.get_size())
+
+
+class MemoryCache:
+    """LRU en memoria de imágenes ya generadas, limitada en bytes."""
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class DiskCache:
+    """
+    Miniaturas en disco, con límite de tamaño y expulsión LRU (el mtime
+    guarda el orden entre ejecuciones, como en TrackCache). Cada fichero se
+    llama <digest del original>.<tamaño>.jpg.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_DISK_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.cache_dir.glob('*.part'):
+            path.unlink(missing_ok=True)
+
+        paths = sorted(self.cache_dir.glob('*.jpg'), key=lambda p: p.stat().st_mtime_ns)
+        for path in paths:
+            try:
+                digest, size, _ = path.name.split('.')
+                key = (digest, int(size))
+            except ValueError:
+                logger.warning(f"Ignoring unexpected file '{path.name}' in artwork cache")
+                continue
+            length = path.stat().st_size
+            self.entries[key] = (path, length)
+            self.size += length
+
+        logger.info(f"Artwork cache: {len(self.entries)} images, {self.size} bytes")
+
+    def path(self, key):
+        digest, size = key
+        return self.cache_dir / f"{digest}.{size}.jpg"
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except OSError:
+            self.remove(key)
+            return None
+
+    def put(self, key, data):
+        path = self.path(key)
+        part = path.with_name(f"{path.name}.{os.getpid()}.part")
+        part.write_bytes(data)
+        os.replace(part, path)
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.size -= old[1]
+            self.entries[key] = (path, len(data))
+            self.size += len(data)
+            while self.size > self.max_bytes and self.entries:
+                _, (evicted, length) = self.entries.popitem(last=False)
+                self.size -= length
+                evicted.unlink(missing_ok=True)
+
+    def remove(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry:
+                self.size -= entry[1]
+                entry[0].unlink(missing_ok=True)
+
+
+class ArtworkCache:
+    """
+    Carátulas de las pistas: la imagen incrustada en el MP3 (APIC) o, si no
+    tiene, la del directorio de medios. El tamaño pedido se redondea a uno
+    de 'sizes', y cada miniatura se genera una sola vez (en un proceso
+    aparte) y se guarda en memoria y, si hay 'cache_dir', en disco.
+    """
+    def __init__(self, media_dir, cache_dir=None, sizes=DEFAULT_SIZES,
+                 memory_bytes=DEFAULT_MEMORY_BYTES, disk_bytes=DEFAULT_DISK_BYTES,
+                 workers=1, resizer=resize):
+        self.media_dir = Path(media_dir)
+        self.sizes = tuple(sorted(sizes))
+        self.memory = MemoryCache(memory_bytes)
+        self.disk = DiskCache(cache_dir, disk_bytes) if cache_dir else None
+        self.workers = workers
+        self.resizer = resizer
+        self.executor = None
+
+        # Carátula del directorio: (sello del directorio, ruta) de la última
+        # búsqueda y (sello del fichero, Source) de la última lectura
+        self.folder_cover = None
+        self.folder = None
+        # Fichero de la pista -> (sello, Source de la imagen incrustada o None).
+        # El sello (inodo, mtime) del fichero invalida la entrada si cambia.
+        self.sources = {}
+        self.pending = {}  # (digest, tamaño) -> Future de la miniatura en curso
+        self.lock = threading.Lock()
+
+    def box(self, size):
+        """El tamaño de la escalera que cubre 'size' (el mayor si no cabe)."""
+        for box in self.sizes:
+            if 0 < size <= box:
+                return box
+        return self.sizes[-1]
+
+    @staticmethod
+    def make_source(path, data, embedded):
+        info = image_info(data)
+        if info is None:
+            logger.warning(f"Unsupported artwork in '{path.name}'")
+            return None
+        mime, width, height = info
+        digest = hashlib.sha256(data).hexdigest()
+        return Source(path, embedded, mime, digest, width, height)
+
+    @staticmethod
+    def stamp(path):
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns)
+
+    def folder_source(self):
+        # Se vuelve a buscar si cambia el directorio y a leer si cambia la
+        # imagen. Dos peticiones a la vez pueden repetir el trabajo, nada más.
+        dir_stamp, cover = self.stamp(self.media_dir), self.folder_cover
+        if cover is None or cover[0] != dir_stamp:
+            cover = self.folder_cover = (dir_stamp, find_folder_cover(self.media_dir))
+
+        path = cover[1]
+        if path is None:
+            return None
+        stamp, folder = self.stamp(path), self.folder
+        if folder is None or folder[0] != stamp:
+            source = self.make_source(path, path.read_bytes(), False)
+            folder = self.folder = (stamp, source)
+        return folder[1]
+
+    def source(self, filename):
+        path = self.media_dir / filename
+        stamp = self.stamp(path)
+        with self.lock:
+            entry = self.sources.get(filename)
+
+        if entry is None or entry[0] != stamp:
+            # El tag se lee fuera del lock: no bloquea otras peticiones
+            try:
+                picture = read_embedded_picture(path)
+            except (IndexError, ValueError) as e:
+                logger.warning(f"Bad ID3 picture in '{filename}': {e}")
+                picture = None
+
+            entry = (stamp, picture and self.make_source(path, picture, True))
+            with self.lock:
+                self.sources[filename] = entry
+
+        return entry[1] or self.folder_source()
+
+    @staticmethod
+    def read(source):
+        if not source.embedded:
+            return source.path.read_bytes()
+        data = read_embedded_picture(source.path)
+        if data is None:
+            raise OSError(f"No artwork left in '{source.path.name}'")
+        return data
+
+    def variant(self, filename, size):
+        """Qué imagen se sirve para la pista y el tamaño pedido, o None."""
+        source = self.source(filename)
+        if source is None:
+            return None
+
+        box = self.box(size)
+        width, height = fit(source.width, source.height, box)
+        if (width, height) == (source.width, source.height):
+            return Variant(source, 0, source.mime, width, height,
+                           variant_version(source.digest, 0))
+        return Variant(source, box, 'image/jpeg', width, height,
+                       variant_version(source.digest, box))
+
+    def load(self, variant):
+        """
+        Future con los bytes de 'variant'; solo se generan si no están en
+        caché. Lanza OSError si ya no se puede leer la imagen original.
+        """
+        key = (variant.source.digest, variant.size)
+        data = self.memory.get(key)
+        if data is None and variant.size == 0:
+            data = self.read(variant.source)
+            self.memory.put(key, data)
+        if data is None and self.disk:
+            data = self.disk.get(key)
+            if data is not None:
+                self.memory.put(key, data)
+        if data is not None:
+            future = Future()
+            future.set_result(data)
+            return future
+
+        with self.lock:
+            future = self.pending.get(key)
+            if future is not None:
+                return future
+            # Pudo terminar de generarse mientras tanto
+            data = self.memory.get(key)
+            if data is not None:
+                future = Future()
+                future.set_result(data)
+                return future
+
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context('spawn'))
+            future = self.executor.submit(
+                self.resizer, self.read(variant.source), variant.width, variant.height)
+            self.pending[key] = future
+
+        logger.info(f"Resizing '{variant.source.path.name}' to "
+                    f"{variant.width}x{variant.height}")
+        future.add_done_callback(partial(self._on_done, key))
+        return future
+
+    def _on_done(self, key, future):
+        if not future.cancelled() and future.exception() is None:
+            data = future.result()
+            self.memory.put(key, data)
+            if self.disk:
+                try:
+                    self.disk.put(key, data)
+                except OSError as e:
+                    logger.warning(f"Could not store artwork: {e}")
+        elif not future.cancelled():
+            logger.error(f"Artwork resize failed: {future.exception()}")
+
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,195 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+
+logger = logging.getLogger("Logging")
+
+TEXT_FORMAT = logging.BASIC_FORMAT
+
+# Categorías (extra=...) para muestrear o limitar los mensajes frecuentes
+CATALOG = {'category': 'catalog'}
+SESSION = {'category': 'session'}
+STREAM = {'category': 'stream'}
+STATS = {'category': 'stats'}
+
+# Límites por defecto para categorías muy frecuentes (mensajes por segundo)
+DEFAULT_RATE_LIMITS = {'stats': 1}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por mensaje, para procesar los logs sin expresiones regulares."""
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            'ts': record.created,
+            'level': record.levelname,
+            'service': self.service,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        if category := getattr(record, 'category', None):
+            entry['category'] = category
+        if suppressed := getattr(record, 'suppressed', 0):
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        if suppressed := getattr(record, 'suppressed', 0):
+            text += f" [{suppressed} similar suppressed]"
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Muestreo y límite de ritmo por categoría (extra={'category': ...}). Los
+    mensajes sin categoría, y los de WARNING o más, pasan siempre. Cuando se
+    descartan mensajes por el límite, el siguiente que pasa lleva la cuenta
+    en 'suppressed'.
+    """
+    def __init__(self, sample_rates=None, rate_limits=None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        self.windows = {}  # categoría -> [inicio de la ventana, emitidos, descartados]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        category = getattr(record, 'category', None)
+        if category is None or record.levelno >= logging.WARNING:
+            return True
+
+        rate = self.sample_rates.get(category, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return False
+
+        limit = self.rate_limits.get(category)
+        if not limit:
+            return True
+
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(category)
+            if window is None or now - window[0] >= 1:
+                window = self.windows[category] = [now, 0, window[2] if window else 0]
+            if window[1] >= limit:
+                window[2] += 1
+                return False
+
+            window[1] += 1
+            record.suppressed, window[2] = window[2], 0
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Encola el registro tal cual: el mensaje se formatea (msg % args) en el
+    hilo del QueueListener, no en el que atiende la petición. Por eso en los
+    caminos calientes se usa logger.info("... %s", valor) y no f-strings.
+    """
+    def prepare(self, record):
+        return record
+
+
+class AsyncLogging:
+    """Cola + QueueListener: la E/S de los logs sale del hilo que los emite."""
+    def __init__(self, handler, filter=None):
+        self.queue = queue.SimpleQueue()
+        self.handler = LazyQueueHandler(self.queue)
+        if filter:
+            self.handler.addFilter(filter)
+        self.listener = logging.handlers.QueueListener(self.queue, handler)
+
+    def install(self, root=None):
+        """
+        Sustituye solo los handlers puestos por este módulo o por el
+        logging.basicConfig de los scripts; los demás (p. ej. los de captura
+        de pytest) se conservan.
+        """
+        root = root or logging.getLogger()
+        for handler in root.handlers[:]:
+            basic = type(handler) is logging.StreamHandler
+            if basic or isinstance(handler, LazyQueueHandler):
+                root.removeHandler(handler)
+        root.addHandler(self.handler)
+        self.listener.start()
+
+    def stop(self):
+        """Vacía la cola; llamarlo antes de salir para no perder mensajes."""
+        self.listener.stop()
+
+
+def install_filter(filter, root=None):
+    """Logging síncrono: el muestreo se aplica en los handlers del logger raíz."""
+    root = root or logging.getLogger()
+    for handler in root.handlers:
+        if filter not in handler.filters:
+            handler.addFilter(filter)
+
+
+# Cola del proceso; una sola aunque configure se llame varias veces
+pipeline: AsyncLogging = None
+# Filtro del modo síncrono (Logging.Async=0), también uno por proceso
+sync_sampling: SamplingFilter = None
+
+
+def category_values(properties, prefix, cast):
+    return {name[len(prefix):]: cast(value)
+            for name, value in properties.getPropertiesForPrefix(prefix).items()}
+
+
+def configure(properties, service):
+    """
+    Sustituye los handlers del logger raíz por la cola asíncrona según
+    Logging.Format (text|json), Logging.File, Logging.Level,
+    Logging.Sample.<categoría> (fracción) y Logging.RateLimit.<categoría>
+    (mensajes/s). Con Logging.Async=0 se deja el logging síncrono, con el
+    mismo muestreo en los handlers que ya tenga el logger raíz.
+    """
+    global pipeline, sync_sampling
+    if pipeline or sync_sampling:
+        return pipeline
+
+    rate_limits = {**DEFAULT_RATE_LIMITS,
+                   **category_values(properties, 'Logging.RateLimit.', int)}
+    sampling = SamplingFilter(
+        category_values(properties, 'Logging.Sample.', float), rate_limits)
+
+    level = properties.getProperty('Logging.Level')
+    if level:
+        logging.getLogger().setLevel(level.upper())
+
+    if properties.getPropertyAsIntWithDefault('Logging.Async', 1) <= 0:
+        logging.basicConfig()  # no hace nada si ya hay handlers
+        sync_sampling = sampling
+        install_filter(sampling)
+        logger.info(f"Synchronous logging (rate limits {rate_limits})")
+        return None
+
+    path = properties.getProperty('Logging.File')
+    handler = logging.FileHandler(path) if path else logging.StreamHandler(sys.stderr)
+    if properties.getPropertyWithDefault('Logging.Format', 'text') == 'json':
+        handler.setFormatter(JsonFormatter(service))
+    else:
+        handler.setFormatter(TextFormatter(TEXT_FORMAT))
+
+    pipeline = AsyncLogging(handler, sampling)
+    pipeline.install()
+    atexit.register(pipeline.stop)
+    logger.info(f"Asynchronous logging to '{path or 'stderr'}' "
+                f"(rate limits {rate_limits})")
+    return pipeline
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Mide bytes en el cable y latencia de las respuestas del catálogo con y sin
+compresión Ice, sobre un catálogo sintético grande. Entre cliente y
+servidor hay un reenviador TCP que cuenta los bytes de cada sentido.
+Uso: catalog_bench.py [pistas] [repeticiones]
+"""
+
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import Ice
+
+from slice_loader import load_slice
+
+load_slice()
+import Spotifice  # type: ignore # noqa: E402
+
+SERVER_PORT = 10090
+FORWARD_PORT = 10091
+PLAYLIST_SIZE = 500
+
+
+class SyntheticCatalog(Spotifice.MediaServer):
+    def __init__(self, size):
+        self.tracks = [
+            Spotifice.TrackInfo(
+                id=f"Portal2-{i // 100:02d}-Track_Number_{i:05d}.mp3",
+                title=f"Portal2-{i // 100:02d}-Track_Number_{i:05d}",
+                filename=f"Portal2-{i // 100:02d}-Track_Number_{i:05d}.mp3",
+                duration_ms=180000 + i)
+            for i in range(size)]
+
+        self.playlists = {}
+        for n in range(size // PLAYLIST_SIZE):
+            ids = [t.id for t in self.tracks[n * PLAYLIST_SIZE:(n + 1) * PLAYLIST_SIZE]]
+            self.playlists[f"playlist-{n}"] = Spotifice.Playlist(
+                f"playlist-{n}", f"Playlist {n}", "Synthetic", "bench", 0, ids)
+
+    def get_all_tracks(self, current=None):
+        return self.tracks
+
+    def get_all_playlists(self, current=None):
+        return list(self.playlists.values())
+
+    def get_playlist(self, playlist_id, current=None):
+        return self.playlists[playlist_id]
+
+
+class CountingForwarder(threading.Thread):
+    """Reenvía conexiones TCP de listen_port a target_port contando bytes."""
+    def __init__(self, listen_port, target_port):
+        super().__init__(daemon=True)
+        self.target_port = target_port
+        self.sent = 0
+        self.received = 0
+        self.lock = threading.Lock()
+        self.listener = socket.create_server(('127.0.0.1', listen_port))
+
+    def run(self):
+        while True:
+            client, _ = self.listener.accept()
+            upstream = socket.create_connection(('127.0.0.1', self.target_port))
+            directions = ((client, upstream, 'sent'), (upstream, client, 'received'))
+            for src, dst, attr in directions:
+                threading.Thread(target=self.pump, args=(src, dst, attr),
+                                 daemon=True).start()
+
+    def pump(self, src, dst, attr):
+        while data := src.recv(65536):
+            with self.lock:
+                setattr(self, attr, getattr(self, attr) + len(data))
+            dst.sendall(data)
+        dst.close()
+
+    def counters(self):
+        with self.lock:
+            return self.sent, self.received
+
+
+def measure(forwarder, call, runs):
+    call()  # conexión establecida y caché caliente
+    sent, received = forwarder.counters()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+
+    # Los contadores van por detrás del reenvío: dejamos que terminen
+    time.sleep(0.2)
+    new_sent, new_received = forwarder.counters()
+    wire = (new_sent - sent + new_received - received) / runs
+    return wire, statistics.median(times)
+
+
+def main(size, runs):
+    init_data = Ice.InitializationData()
+    init_data.properties = Ice.createProperties()
+    init_data.properties.setProperty('Ice.MessageSizeMax', '0')
+
+    with Ice.initialize(init_data) as ic:
+        adapter = ic.createObjectAdapterWithEndpoints(
+            "CatalogBench", f"tcp -h 127.0.0.1 -p {SERVER_PORT}")
+        adapter.add(SyntheticCatalog(size), Ice.stringToIdentity("catalog"))
+        adapter.activate()
+
+        forwarder = CountingForwarder(FORWARD_PORT, SERVER_PORT)
+        forwarder.start()
+
+        base = Spotifice.MediaServerPrx.uncheckedCast(ic.stringToProxy(
+            f"catalog:tcp -h 127.0.0.1 -p {FORWARD_PORT}"))
+        base = base.ice_collocationOptimized(False)
+
+        print(f"Catálogo: {size} pistas, {size // PLAYLIST_SIZE} playlists")
+        print(f"{'operation':<20}{'compress':>9}{'wire KiB':>12}{'latency ms':>12}")
+        for compress in (False, True):
+            proxy = base.ice_compress(compress).ice_connectionId(f"compress-{compress}")
+            for name, call in (
+                    ('get_all_tracks', proxy.get_all_tracks),
+                    ('get_all_playlists', proxy.get_all_playlists),
+                    ('get_playlist', lambda: proxy.get_playlist('playlist-0'))):
+                wire, latency = measure(forwarder, call, runs)
+                print(f"{name:<20}{str(compress):>9}"
+                      f"{wire / 1024:>12.1f}{latency * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,115 @@
+import logging
+import threading
+
+import Ice
+
+logger = logging.getLogger("CatalogCache")
+
+DEFAULT_REFRESH = 10  # segundos
+
+
+class CatalogCache:
+    """
+    Copia local de las pistas y playlists que ya se han pedido al servidor.
+    Cada 'refresh' segundos un hilo pide solo los cambios desde la última
+    versión conocida (get_changes_since) y actualiza o descarta las
+    entradas afectadas; lo que no está en caché se pide al usarlo.
+    """
+    def __init__(self, server, refresh=DEFAULT_REFRESH):
+        self.server = server
+        self.refresh_interval = refresh
+        self.tracks = {}
+        self.playlists = {}
+        self.epoch = None
+        self.version = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="CatalogCache", daemon=True)
+
+    def start(self):
+        # La versión se toma antes de guardar nada: lo que cambie después
+        # llegará en la primera actualización
+        known = self.server.get_catalog_version()
+        self.epoch, self.version = known.epoch, known.version
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Ice.Exception as e:
+                logger.warning(f"Catalog refresh failed: {e}")
+
+    def refresh(self):
+        changes = self.server.get_changes_since(self.epoch, self.version)
+        with self.lock:
+            if changes.full_resync:
+                logger.info("Catalog version unknown to server, dropping cached entries")
+                self.tracks.clear()
+                self.playlists.clear()
+            else:
+                self.apply(self.tracks, changes.tracks_modified, changes.tracks_removed)
+                self.apply(self.playlists, changes.playlists_modified,
+                           changes.playlists_removed)
+            self.epoch, self.version = changes.epoch, changes.version
+
+    @staticmethod
+    def apply(entries, modified, removed):
+        # Las altas no se guardan: nadie las ha pedido todavía
+        for item in modified:
+            if item.id in entries:
+                entries[item.id] = item
+        for item_id in removed:
+            entries.pop(item_id, None)
+
+    def lookup(self, entries, key, fetch):
+        with self.lock:
+            item, version = entries.get(key), (self.epoch, self.version)
+        if item is None:
+            item = fetch(key)
+            # Si entretanto se aplicaron cambios, este valor pudo quedar
+            # viejo sin que nadie lo corrija: no se guarda
+            with self.lock:
+                if (self.epoch, self.version) == version:
+                    entries[key] = item
+        return item
+
+    def track_info(self, track_id):
+        return self.lookup(self.tracks, track_id, self.server.get_track_info)
+
+    def playlist(self, playlist_id):
+        return self.lookup(self.playlists, playlist_id, self.server.get_playlist)
+
+
+class SharedCatalogs:
+    """
+    Un CatalogCache por servidor, compartido por todas las zonas del
+    proceso que están enlazadas a él; se para cuando lo suelta la última.
+    """
+    def __init__(self):
+        self.caches = {}  # proxy del servidor -> [CatalogCache, zonas que lo usan]
+        self.lock = threading.Lock()
+
+    def acquire(self, server, refresh=DEFAULT_REFRESH):
+        key = server.ice_toString()
+        with self.lock:
+            entry = self.caches.get(key)
+            if entry is None:
+                cache = CatalogCache(server, refresh)
+                cache.start()
+                entry = self.caches[key] = [cache, 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, cache):
+        with self.lock:
+            for key, entry in self.caches.items():
+                if entry[0] is cache:
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        cache.stop()
+                        del self.caches[key]
+                    return
@@ -0,0 +1,77 @@
+import secrets
+import threading
+import time
+from collections import deque
+
+DEFAULT_MAX_CHANGES = 1000
+
+# Qué cambió
+TRACK = 'track'
+PLAYLIST = 'playlist'
+
+# Cómo cambió
+ADDED = 'added'
+MODIFIED = 'modified'
+REMOVED = 'removed'
+
+
+class CatalogLog:
+    """
+    Versión del catálogo y registro acotado de los últimos cambios. Cada
+    cambio incrementa la versión; un cliente que conoce una versión pide
+    solo lo que cambió después, mientras siga en el registro.
+
+    Las versiones solo valen dentro del proceso que las dio: cada registro
+    tiene una 'epoch' aleatoria y una versión de otra epoch (otra réplica u
+    otra ejecución) obliga al cliente a recargarlo todo, aunque el número
+    caiga dentro del rango. La versión empieza además en la hora de
+    arranque (en ms).
+    """
+    def __init__(self, max_changes=DEFAULT_MAX_CHANGES, start=None):
+        self.epoch = secrets.randbits(63)
+        self.version = time.time_ns() // 1_000_000 if start is None else start
+        # Versión más antigua desde la que aún se tienen todos los cambios
+        self.oldest = self.version
+        self.max_changes = max_changes
+        self.changes = deque()  # (versión, tipo, id, cambio)
+        self.lock = threading.Lock()
+
+    def record(self, kind, item_id, change):
+        with self.lock:
+            self.version += 1
+            self.changes.append((self.version, kind, item_id, change))
+            while len(self.changes) > self.max_changes:
+                self.oldest = self.changes.popleft()[0]
+            return self.version
+
+    def changes_since(self, epoch, version):
+        """
+        Versión actual y efecto neto de los cambios posteriores a 'version'
+        ({(tipo, id): cambio}), o None en lugar de los cambios si 'epoch' no
+        es la de este registro o ya no están todos los cambios en él y hay
+        que recargar el catálogo completo.
+        """
+        with self.lock:
+            if epoch != self.epoch or not self.oldest <= version <= self.version:
+                return self.version, None
+
+            # De atrás hacia delante: 'first' acaba con el primer cambio de
+            # cada elemento tras 'version' y 'last' con el último
+            first, last = {}, {}
+            for entry_version, kind, item_id, change in reversed(self.changes):
+                if entry_version <= version:
+                    break
+                first[(kind, item_id)] = change
+                last.setdefault((kind, item_id), change)
+            current = self.version
+
+        net = {}
+        for key, change in first.items():
+            existed, exists = change != ADDED, last[key] != REMOVED
+            if existed and exists:
+                net[key] = MODIFIED
+            elif exists:
+                net[key] = ADDED
+            elif existed:
+                net[key] = REMOVED
+        return current, net
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Memoria por pista y tiempo de get_all_tracks / get_track_columns sobre un
+catálogo sintético: un objeto TrackInfo por pista (como se guardaba antes)
+frente al TrackTable en columnas.
+Uso: catalog_memory_bench.py [pistas] [repeticiones]
+"""
+
+import gc
+import hashlib
+import statistics
+import sys
+import time
+import tracemalloc
+
+import Ice
+
+from slice_loader import load_slice
+from track_table import TrackTable
+
+load_slice()
+import Spotifice  # type: ignore # noqa: E402
+
+SERVER_PORT = 10092
+
+
+def synthetic_rows(size):
+    for i in range(size):
+        name = f"Portal2-{i // 100:02d}-Track_Number_{i:07d}"
+        yield dict(id=f"{name}.mp3", title=name, filename=f"{name}.mp3",
+                   duration_ms=180000 + i % 60000,
+                   version=hashlib.sha256(name.encode()).hexdigest())
+
+
+def build_objects(size):
+    return {row['id']: Spotifice.TrackInfo(**row) for row in synthetic_rows(size)}
+
+
+def build_table(size):
+    table = TrackTable(Spotifice.TrackInfo)
+    for row in synthetic_rows(size):
+        table.append(**row)
+    return table
+
+
+def measure_memory(build, size):
+    gc.collect()
+    tracemalloc.start()
+    catalog = build(size)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return catalog, used / size
+
+
+def measure_retained(tracks, size):
+    """Memoria que sigue ocupada tras construir get_all_tracks y soltarlo."""
+    gc.collect()
+    tracemalloc.start()
+    tracks.values()
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used / size
+
+
+class Catalog(Spotifice.MusicLibrary):
+    def __init__(self, tracks):
+        self.tracks = tracks
+
+    def get_all_tracks(self, current=None):
+        return list(self.tracks.values())
+
+    def get_track_info(self, track_id, current=None):
+        return self.tracks[track_id]
+
+    def get_track_columns(self, current=None):
+        return Spotifice.TrackColumns(*self.tracks.columns())
+
+
+def measure_calls(call, runs):
+    call()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(size, runs):
+    objects, objects_memory = measure_memory(build_objects, size)
+    table, table_memory = measure_memory(build_table, size)
+    print(f"Catálogo: {size} pistas")
+    print(f"{'layout':<16}{'bytes/track':>12}")
+    print(f"{'objects':<16}{objects_memory:>12.0f}")
+    print(f"{'TrackTable':<16}{table_memory:>12.0f}")
+
+    init_data = Ice.InitializationData()
+    init_data.properties = Ice.createProperties()
+    init_data.properties.setProperty('Ice.MessageSizeMax', '0')
+
+    with Ice.initialize(init_data) as ic:
+        adapter = ic.createObjectAdapterWithEndpoints(
+            "CatalogMemoryBench", f"tcp -h 127.0.0.1 -p {SERVER_PORT}")
+        adapter.add(Catalog(objects), Ice.stringToIdentity("objects"))
+        adapter.add(Catalog(table), Ice.stringToIdentity("table"))
+        adapter.activate()
+
+        def proxy(name):
+            proxy = ic.stringToProxy(f"{name}:tcp -h 127.0.0.1 -p {SERVER_PORT}")
+            return Spotifice.MusicLibraryPrx.uncheckedCast(
+                proxy.ice_collocationOptimized(False))
+
+        print(f"{'operation':<32}{'ms':>10}")
+        for label, call in (
+                ('get_all_tracks (objects)', proxy('objects').get_all_tracks),
+                ('get_all_tracks (TrackTable)', proxy('table').get_all_tracks),
+                ('get_track_columns (TrackTable)', proxy('table').get_track_columns)):
+            print(f"{label:<32}{measure_calls(call, runs) * 1000:>10.1f}")
+
+    # Lo que get_all_tracks deja en memoria después de servirse
+    print(f"{'TrackTable after get_all_tracks':<32}"
+          f"{measure_retained(table, size):>10.0f} bytes/track")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,39 @@
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger("CatalogSnapshot")
+
+SNAPSHOT_FORMAT = 1
+
+
+def write_snapshot(path, tracks):
+    """
+    Guarda el catálogo (una lista de dicts, uno por pista) para que los
+    procesos worker lo carguen sin volver a recorrer ni hashear la música.
+    La escritura es atómica: un worker nunca lee un snapshot a medias.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'format': SNAPSHOT_FORMAT, 'tracks': list(tracks)}, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    logger.info(f"Catalog snapshot written to '{path}'")
+
+
+def read_snapshot(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    if data.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format in '{path}'")
+    return data['tracks']
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger("ContentHash")
+
+
+class HashCache:
+    """
+    Hash SHA-256 del contenido de cada fichero, recordado por ruta junto con
+    su tamaño y mtime: solo se vuelve a leer un fichero si alguno cambia.
+    Es thread-safe, y varios hilos calculan a la vez porque hashlib libera
+    el GIL mientras lee y resume el fichero.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring hash cache '{self.path}': {e}")
+
+    def digest(self, filepath):
+        st = filepath.stat()
+        key = str(filepath.resolve())
+        entry = self.entries.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+
+        with open(filepath, 'rb') as f:
+            digest = hashlib.file_digest(f, 'sha256').hexdigest()
+
+        with self.lock:
+            self.entries[key] = [st.st_size, st.st_mtime_ns, digest]
+            self.dirty = True
+        return digest
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
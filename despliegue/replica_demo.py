@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Demo de escalado: abre varias sesiones resolviendo 'mediaServer1' a través
+del Locator y muestra en qué réplica ha quedado fijada cada una. Después
+hace streaming en paralelo por todas ellas.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import Ice
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from slice_loader import load_slice  # noqa: E402
+
+load_slice()
+import Spotifice  # type: ignore # noqa: E402
+
+USERNAME = "user"
+PASSWORD = "secret"
+SESSIONS = 16
+CHUNK_SIZE = 4096
+
+
+def open_session(ic):
+    # Sin caché del Locator: cada sesión vuelve a preguntar por la réplica
+    server = Spotifice.MediaServerPrx.checkedCast(
+        ic.propertyToProxy('MediaServer.Proxy')
+        .ice_locatorCacheTimeout(0)
+        .ice_connectionCached(False))
+
+    # Como en los tests, el propio servidor hace de "render" para el ping
+    render = Spotifice.MediaRenderPrx.uncheckedCast(server)
+    return server, server.authenticate(render, USERNAME, PASSWORD)
+
+
+def stream_all(server, session, counter):
+    track_id = server.get_all_tracks()[0].id
+    session.open_stream(track_id, Spotifice.StreamQuality.ORIGINAL)
+    while chunk := session.get_audio_chunk(CHUNK_SIZE):
+        counter[session.ice_getAdapterId()] += len(chunk)
+
+
+def main(ic):
+    sessions = []
+    for _ in range(SESSIONS):
+        server, session = open_session(ic)
+        sessions.append((server, session))
+        time.sleep(1)  # deja que el nodo publique su nueva carga
+
+    placement = Counter(session.ice_getAdapterId() for _, session in sessions)
+    print("Sesiones por réplica:")
+    for adapter_id, count in sorted(placement.items()):
+        print(f"  {adapter_id}: {count}")
+
+    streamed = Counter()
+    start = time.monotonic()
+    threads = [threading.Thread(target=stream_all, args=(server, session, streamed))
+               for server, session in sessions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    total = sum(streamed.values())
+    print(f"Streaming: {total / elapsed / 1e6:.2f} MB/s en {elapsed:.1f} s")
+    for adapter_id, size in sorted(streamed.items()):
+        print(f"  {adapter_id}: {size / 1e6:.2f} MB")
+
+    for _, session in sessions:
+        session.close()
+
+
+if __name__ == "__main__":
+    with Ice.initialize(sys.argv) as communicator:
+        main(communicator)
@@ -0,0 +1,38 @@
+#!/bin/bash
+# Despliega N réplicas de MediaServer, una por nodo, y lanza la demo de reparto.
+# Uso: ./start_replicas.sh [N] (N >= 2, por defecto 4)
+
+N=${1:-4}
+LOCATOR="IceGrid/Locator:tcp -h 127.0.0.1 -p 4061"
+
+mkdir -p db/registry
+
+echo "Iniciando Registry..."
+icegridregistry --Ice.Config=registry.config &
+sleep 2
+
+for i in $(seq 1 "$N"); do
+    mkdir -p "db/node$i"
+    cat > "db/node$i.config" <<CONFIG
+Ice.Default.Locator=$LOCATOR
+IceGrid.Node.Name=node$i
+IceGrid.Node.Data=db/node$i
+IceGrid.Node.Endpoints=tcp
+CONFIG
+    echo "Iniciando Nodo $i..."
+    icegridnode --Ice.Config="db/node$i.config" &
+    sleep 1
+done
+
+# spotifice.xml ya despliega MediaServer1 y MediaServer2 en node1 y node2
+echo "Desplegando Spotifice..."
+icegridadmin --Ice.Default.Locator="$LOCATOR" -u user -p pass \
+             -e "application add spotifice.xml"
+
+for i in $(seq 3 "$N"); do
+    echo "Añadiendo réplica MediaServer$i en node$i..."
+    icegridadmin --Ice.Default.Locator="$LOCATOR" -u user -p pass \
+                 -e "server template instantiate SpotificeApp node$i MediaServerTemplate index=$i"
+done
+
+python3 replica_demo.py --Ice.Config=../client_icegrid.config
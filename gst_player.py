@@ -6,24 +6,40 @@ import threading
 from enum import Enum, auto
 from time import monotonic
 
-import gi
-
-gi.require_version('Gst', '1.0')
-from gi.repository import Gst  # type: ignore # noqa: E402
+from async_logging import STATS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("GstPlayer")
 
-Gst.init(None)
+# GStreamer se carga e inicializa la primera vez que hace falta (init_gst),
+# no al importar: así no se paga su arranque en procesos que no lo usan.
+Gst = None
 
 state_map = {
-    Gst.State.NULL: 'STOP',
-    Gst.State.READY: 'STOP',
-    Gst.State.PAUSED: 'PAUSED',
-    Gst.State.PLAYING: 'PLAYING',
     None: 'STOP'
 }
 
+
+def init_gst():
+    global Gst
+    if Gst is not None:
+        return Gst
+
+    import gi
+    gi.require_version('Gst', '1.0')
+    from gi.repository import Gst as _Gst  # type: ignore
+
+    _Gst.init(None)
+    state_map.update({
+        _Gst.State.NULL: 'STOP',
+        _Gst.State.READY: 'STOP',
+        _Gst.State.PAUSED: 'PAUSED',
+        _Gst.State.PLAYING: 'PLAYING',
+    })
+    Gst = _Gst
+    return Gst
+
+
 class Cmd(Enum):
     CONFIGURED = auto()
     STOP = auto()
@@ -33,19 +49,31 @@ class Cmd(Enum):
 
 class GstPlayer(threading.Thread):
     CHUNK_SIZE = 4096
-    PIPELINE = 'appsrc name=src ! decodebin ! audioconvert ! audioresample ! autoaudiosink'
+    PIPELINE = ('appsrc name=src ! decodebin ! audioconvert ! volume name=gain ! '
+                'audioresample name=resample ! {sink}')
+    DEFAULT_SINK = 'autoaudiosink'
+    MAX_VOLUME = 10.0
     TIMEOUT_SECS = 2
 
-    def __init__(self, **kwargs):
+    def __init__(self, sink=DEFAULT_SINK, **kwargs):
         super().__init__(**kwargs)
+        init_gst()
+        # Salida de audio (descripción gst-launch): cada zona puede tener la suya
+        self.sink = sink
         self.command_queue = queue.Queue()
         self.play_confirmed_e = threading.Event()
         self.stop_confirmed_e = threading.Event()
         self.stop_confirmed_e.set()
+        # Primer buffer de audio decodificado (mide el tiempo hasta que suena)
+        self.first_audio_e = threading.Event()
+        self.configured_at = None
+        self.first_audio_at = None
 
         self.pipeline: Gst.Pipeline = None
         self.get_chunk_hook = None
         self.track_exhausted_hook = lambda: None
+        self.gain_db = None
+        self.initial = b''
 
         self.show_stats = False
 
@@ -66,13 +94,29 @@ class GstPlayer(threading.Thread):
                     logger.warning(f"Unexpected command: {command}")
 
     def setup_pipeline(self):
-        retval = Gst.parse_launch(self.PIPELINE)
+        retval = Gst.parse_launch(self.PIPELINE.format(sink=self.sink))
         self.appsrc = retval.get_by_name('src')
         self.appsrc.set_properties(
             format=Gst.Format.TIME, block=True, is_live=True, max_bytes=8192)
         self.appsrc.connect('need-data', self.on_need_data)
+        retval.get_by_name('gain').set_property('volume', self.volume())
+        retval.get_by_name('resample').get_static_pad('src').add_probe(
+            Gst.PadProbeType.BUFFER, self.on_first_audio)
         return retval
 
+    def on_first_audio(self, pad, info):
+        self.first_audio_at = monotonic()
+        self.first_audio_e.set()
+        logger.info("First audio %.1f ms after configure",
+                    (self.first_audio_at - self.configured_at) * 1000)
+        return Gst.PadProbeReturn.REMOVE
+
+    def volume(self):
+        # ReplayGain en dB -> factor lineal del elemento 'volume'
+        if self.gain_db is None:
+            return 1.0
+        return min(10 ** (self.gain_db / 20), self.MAX_VOLUME)
+
     def activate_stream(self):
         self.last_time = None
         self.stop_confirmed_e.clear()
@@ -96,8 +140,15 @@ class GstPlayer(threading.Thread):
     def on_need_data(self, src, length):
         assert self.get_chunk_hook
 
-        chunk_size = length if length > 0 else self.CHUNK_SIZE
-        if not (chunk := self.get_chunk_hook(chunk_size)):
+        # El burst inicial entra entero en la primera petición: decodebin
+        # tiene datos para negociar el formato sin más viajes al servidor
+        if self.initial:
+            chunk, self.initial = self.initial, b''
+        else:
+            chunk_size = length if length > 0 else self.CHUNK_SIZE
+            chunk = self.get_chunk_hook(chunk_size)
+
+        if not chunk:
             src.emit('end-of-stream')
             logger.info("Stream exhaused.")
             self.command_queue.put(Cmd.EXHAUSTED)
@@ -115,12 +166,19 @@ class GstPlayer(threading.Thread):
             elapsed = monotonic() - self.last_time
             if elapsed > 0:
                 bitrate = (chunk_size) / elapsed / 1000  # kB/s
-                print(f"\rbitrate: {bitrate:.2f} kB/s    ", end='', flush=True)
+                # Un mensaje por chunk: lo limita la categoría 'stats'
+                logger.info("bitrate: %.2f kB/s", bitrate, extra=STATS)
         self.last_time = monotonic()
 
-    def configure(self, get_chunk_hook, track_exhausted_hook=None):
+    def configure(self, get_chunk_hook, track_exhausted_hook=None, gain_db=None,
+                  initial=b''):
         self.get_chunk_hook = get_chunk_hook
         self.track_exhausted_hook = track_exhausted_hook or (lambda: None)
+        self.gain_db = gain_db
+        self.initial = initial
+        self.configured_at = monotonic()
+        self.first_audio_at = None
+        self.first_audio_e.clear()
         self.stop_confirmed_e.clear()
         self.command_queue.put(Cmd.CONFIGURED)
 
@@ -150,9 +208,23 @@ class GstPlayer(threading.Thread):
 
         return state_map.get(state.state)
 
+    def get_position_ms(self):
+        pipeline = self.pipeline
+        if pipeline is None:
+            return None
+
+        found, position = pipeline.query_position(Gst.Format.TIME)
+        return position // Gst.MSECOND if found else None
+
     def is_playing(self):
         return self.play_confirmed_e.is_set()
 
+    def wait_first_audio(self, timeout=TIMEOUT_SECS):
+        """Instante (monotonic) en que salió el primer audio, o None."""
+        if self.first_audio_e.wait(timeout):
+            return self.first_audio_at
+        return None
+
     def confirm_play_starts(self):
         retval = self.play_confirmed_e.wait(self.TIMEOUT_SECS)
         logger.debug(f"play confirmed: {retval}")
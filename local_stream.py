@@ -0,0 +1,66 @@
+import ipaddress
+import logging
+import os
+import socket
+from functools import cache
+
+import Ice
+
+logger = logging.getLogger("LocalStream")
+
+HOST_ID_FILES = (
+    '/etc/machine-id',
+    '/var/lib/dbus/machine-id',
+    '/proc/sys/kernel/random/boot_id',
+)
+
+
+@cache
+def host_id():
+    """Identificador de esta máquina: el mismo para el render y el servidor."""
+    for path in HOST_ID_FILES:
+        try:
+            with open(path) as f:
+                if value := f.read().strip():
+                    return value
+        except OSError:
+            continue
+    return socket.gethostname()
+
+
+def connection_addresses(con):
+    """Direcciones local y remota de la conexión IP bajo 'con' (o None)."""
+    info = con.getInfo()
+    while info is not None and not isinstance(info, Ice.IPConnectionInfo):
+        info = info.underlying
+    if info is None:
+        return None
+    return info.localAddress, info.remoteAddress
+
+
+def is_local_connection(current):
+    """La petición llega por loopback, o desde una dirección de esta máquina."""
+    if current is None or current.con is None:
+        return True  # llamada colocada: mismo proceso
+
+    addresses = connection_addresses(current.con)
+    if addresses is None:
+        return False
+    local, remote = addresses
+    try:
+        return ipaddress.ip_address(remote.split('%')[0]).is_loopback or remote == local
+    except ValueError:
+        return False
+
+
+def open_verified(path, device, inode, size):
+    """
+    Abre el fichero que indicó el servidor y comprueba que es exactamente
+    ese (mismo dispositivo, inodo y tamaño), no otro con la misma ruta.
+    """
+    f = open(path, 'rb')
+    st = os.fstat(f.fileno())
+    if (st.st_dev, st.st_ino, st.st_size) != (device, inode, size):
+        f.close()
+        raise OSError(f"'{path}' is not the file offered by the server")
+    return f
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Coste de CPU en el render de leer una pista del servidor en la misma
+máquina: por Ice sobre loopback (get_audio_chunk) frente al camino local
+(open_local_stream y lectura directa del fichero). El servidor debe
+arrancarse con MediaServer.LocalStreams=1.
+Uso: local_stream_bench.py <config-cliente> [repeticiones]
+"""
+
+import statistics
+import sys
+import time
+
+import Ice
+
+import local_stream
+from slice_loader import load_slice
+
+load_slice()
+import Spotifice  # type: ignore # noqa: E402
+
+USERNAME = "user"
+PASSWORD = "secret"
+CHUNK_SIZE = 64 * 1024
+
+
+def read_remote(session, track_id):
+    session.open_stream(track_id, Spotifice.StreamQuality.ORIGINAL)
+    total = 0
+    while chunk := session.get_audio_chunk(CHUNK_SIZE):
+        total += len(chunk)
+    return total
+
+
+def read_local(session, track_id):
+    local = session.open_local_stream(
+        track_id, Spotifice.StreamQuality.ORIGINAL, local_stream.host_id())
+    total = 0
+    with local_stream.open_verified(
+            local.path, local.device, local.inode, local.size) as f:
+        while chunk := f.read(CHUNK_SIZE):
+            total += len(chunk)
+    return total
+
+
+def measure(read, session, track_id, runs):
+    cpu, wall = [], []
+    for _ in range(runs):
+        start_cpu, start_wall = time.process_time(), time.perf_counter()
+        size = read(session, track_id)
+        cpu.append(time.process_time() - start_cpu)
+        wall.append(time.perf_counter() - start_wall)
+    return size, statistics.median(cpu), statistics.median(wall)
+
+
+def main(config, runs):
+    with Ice.initialize(config) as ic:
+        server = Spotifice.MediaServerPrx.checkedCast(
+            ic.propertyToProxy('MediaServer.Proxy'))
+        render = Spotifice.MediaRenderPrx.uncheckedCast(server)
+        session = server.authenticate(render, USERNAME, PASSWORD)
+        track_id = max(server.get_all_tracks(), key=lambda t: t.id).id
+
+        print(f"Pista '{track_id}', mediana de {runs} lecturas")
+        print(f"{'path':<12}{'bytes':>12}{'cpu ms':>10}{'wall ms':>10}")
+        for label, read in (('loopback', read_remote), ('local', read_local)):
+            size, cpu, wall = measure(read, session, track_id, runs)
+            print(f"{label:<12}{size:>12}{cpu * 1000:>10.1f}{wall * 1000:>10.1f}")
+
+        session.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: local_stream_bench.py <client-config> [runs]")
+
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("MediaAnalysis")
+
+
+def analyse(source):
+    """
+    Decodifica la pista completa para obtener su duración exacta y su
+    ganancia ReplayGain. Se ejecuta en un proceso del pool.
+    """
+    from gst_player import init_gst
+    Gst = init_gst()
+
+    pipeline = Gst.parse_launch(
+        'filesrc name=src ! decodebin ! audioconvert ! audioresample ! '
+        'rganalysis ! fakesink name=sink sync=false')
+    pipeline.get_by_name('src').set_property('location', str(source))
+
+    # La duración decodificada es el final del último buffer que llega al sink
+    end = 0
+
+    def on_buffer(pad, info):
+        nonlocal end
+        buf = info.get_buffer()
+        if buf.pts != Gst.CLOCK_TIME_NONE:
+            duration = buf.duration if buf.duration != Gst.CLOCK_TIME_NONE else 0
+            end = max(end, buf.pts + duration)
+        return Gst.PadProbeReturn.OK
+
+    sink_pad = pipeline.get_by_name('sink').get_static_pad('sink')
+    sink_pad.add_probe(Gst.PadProbeType.BUFFER, on_buffer)
+
+    gain = peak = None
+    bus = pipeline.get_bus()
+    pipeline.set_state(Gst.State.PLAYING)
+    try:
+        while True:
+            msg = bus.timed_pop_filtered(
+                Gst.CLOCK_TIME_NONE,
+                Gst.MessageType.EOS | Gst.MessageType.ERROR | Gst.MessageType.TAG)
+
+            if msg.type == Gst.MessageType.ERROR:
+                error, _ = msg.parse_error()
+                raise RuntimeError(f"{source.name}: {error.message}")
+
+            if msg.type == Gst.MessageType.EOS:
+                break
+
+            tags = msg.parse_tag()
+            found, value = tags.get_double(Gst.TAG_TRACK_GAIN)
+            if found:
+                gain = value
+            found, value = tags.get_double(Gst.TAG_TRACK_PEAK)
+            if found:
+                peak = value
+    finally:
+        pipeline.set_state(Gst.State.NULL)
+
+    st = source.stat()
+    return {
+        'filename': source.name,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'duration_ms': end // Gst.MSECOND,
+        'gain_db': gain,
+        'peak': peak,
+    }
+
+
+class AnalysisStore:
+    """
+    Resultados persistidos en un fichero JSON lines. Cada pista analizada
+    se añade en cuanto termina, así que un análisis interrumpido no se pierde.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea cortada por una interrupción
+                    logger.warning(f"Skipping corrupt analysis record in '{self.path}'")
+                    continue
+                self.records[record['filename']] = record
+
+        logger.info(f"Loaded {len(self.records)} analysis records")
+
+    def is_fresh(self, source):
+        record = self.records.get(source.name)
+        if record is None:
+            return False
+
+        st = source.stat()
+        return record['size'] == st.st_size and record['mtime_ns'] == st.st_mtime_ns
+
+    def get(self, filename):
+        return self.records.get(filename)
+
+    def append(self, record):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.records[record['filename']] = record
+
+
+def run_analysis(sources, store, workers=0, on_result=None):
+    """Analiza en paralelo las pistas que no estén ya al día en 'store'."""
+    pending = [s for s in sources if not store.is_fresh(s)]
+    if not pending:
+        return 0
+
+    workers = workers or os.cpu_count()
+    logger.info(f"Analysing {len(pending)} tracks with {workers} workers")
+
+    done = 0
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        futures = {executor.submit(analyse, source): source for source in pending}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                logger.error(f"Analysis failed for '{futures[future].name}': {e}")
+                continue
+
+            store.append(record)
+            done += 1
+            if on_result:
+                on_result(record)
+
+    logger.info(f"Analysis finished: {done}/{len(pending)} tracks")
+    return done
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("Usage: media_analysis.py <media-dir> <analysis-file> [workers]")
+
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    sources = sorted(Path(sys.argv[1]).glob('*.mp3'))
+    run_analysis(sources, AnalysisStore(sys.argv[2]), workers)
@@ -5,14 +5,27 @@ from time import sleep
 
 import Ice
 
-# Cargamos el contrato v2
-Ice.loadSlice('-I{} spotifice_v2.ice'.format(Ice.getSliceDir()))
+import tracing
+from slice_loader import load_slice
+
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
 import Spotifice  # type: ignore # noqa: E402
 
 # Credenciales del enunciado (deben estar en tu users.json)
 USERNAME = "user"
 PASSWORD = "secret"
 
+class PlaybackObserverI(Spotifice.PlaybackObserver):
+    """Recibe los cambios de estado del render sin tener que hacer polling."""
+    def status_changed(self, render, status, current=None):
+        position = ""
+        if status.position_ms is not Ice.Unset:
+            position = f" @ {status.position_ms / 1000:.1f}s"
+        print(f"  [{Ice.identityToString(render)}] {status.state} "
+              f"'{status.current_track_id}'{position} (repeat={status.repeat})")
+
+
 def get_proxy(ic, property, cls):
     proxy = ic.propertyToProxy(property)
     if not proxy:
@@ -63,13 +76,23 @@ def authenticate_and_bind(server, render):
 # ---------------------------
 
 def main(ic):
+    tracing.configure(ic.getProperties(), 'control')
     try:
+        # Catálogo y playlists con compresión Ice (ver bind_media_server)
         server = get_proxy(ic, 'MediaServer.Proxy', Spotifice.MediaServerPrx)
+        server = server.ice_compress(True)
         render = get_proxy(ic, 'MediaRender.Proxy', Spotifice.MediaRenderPrx)
 
         # Limpieza inicial
         render.stop()
 
+        # Nos suscribimos a los cambios de estado del render
+        adapter = ic.createObjectAdapter("MediaControlAdapter")
+        observer = Spotifice.PlaybackObserverPrx.uncheckedCast(
+            adapter.addWithUUID(PlaybackObserverI()))
+        adapter.activate()
+        render.subscribe(observer)
+
         # --- PASO 1: AUTENTICACIÓN Y VINCULACIÓN (HITO 2) ---
         session = authenticate_and_bind(server, render)
         if not session:
@@ -98,7 +121,11 @@ def main(ic):
         render.load_playlist(playlist_id)
         
         print("Iniciando reproducción (play)...")
-        render.play()
+        # La traza de play() empieza aquí y sigue por el render y el servidor
+        with tracing.trace('control.play') as trace:
+            render.play(context=tracing.context())
+        if trace:
+            print(f"  trace-id: {trace.trace_id}")
         sleep(5)
 
         print("Pausando...")
@@ -111,6 +138,7 @@ def main(ic):
 
         print("Parando...")
         render.stop()
+        render.unsubscribe(observer)
 
         # --- PASO 4: LIMPIEZA (HITO 2) ---
         print("\n--- 4. CERRANDO SESIÓN ---")
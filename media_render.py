@@ -1,25 +1,242 @@
 #!/usr/bin/env python3
 
+import functools
 import logging
 import sys
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 
 import Ice
 from Ice import identityToString as id2str
 
+import async_logging
+import local_stream
+import profiler_admin
+import tracing
+from async_logging import STREAM
+from catalog_cache import CatalogCache, SharedCatalogs
 from gst_player import GstPlayer
+from slice_loader import load_slice
+from stream_scheduler import IDLE_EXPIRED
+from track_cache import DEFAULT_MAX_BYTES, TrackCache
 
 # --- MODIFICADO HITO 2 ---
-# Cargamos el nuevo contrato v2
-Ice.loadSlice('-I{} spotifice_v2.ice'.format(Ice.getSliceDir()))
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
 import Spotifice  # type: ignore # noqa: E402
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("MediaRender")
 
+DEFAULT_PREFETCH = 256 * 1024
+DEFAULT_RECOVERY_TIMEOUT = 10
+DEFAULT_BURST_MS = 1500
+
+
+class RemoteStream:
+    """
+    Origen de chunks para GstPlayer que los pide a la sesión del servidor.
+    Un hilo propio va por delante de la reproducción y mantiene hasta
+    'prefetch' bytes en memoria. Si se pierde la conexión, ese mismo hilo
+    pide a 'recover' una sesión con el stream reabierto en el último byte
+    recibido; mientras tanto el audio sigue saliendo del buffer.
+    Si hay caché, guarda la pista a medida que llega. 'initial' es el
+    burst que trajo open_stream_with_burst: ya va directo al reproductor.
+    """
+    FETCH_SIZE = 16 * 1024
+    RETRY_DELAY = 0.5
+
+    def __init__(self, stream_manager, cache_writer=None, trace_context=None,
+                 prefetch=DEFAULT_PREFETCH, recover=None,
+                 recovery_timeout=DEFAULT_RECOVERY_TIMEOUT, initial=b''):
+        self.stream_manager = stream_manager
+        self.cache_writer = cache_writer
+        # Solo el primer chunk se traza: es el que marca cuándo empieza a sonar
+        self.trace_context = trace_context
+        self.prefetch = prefetch
+        self.recover = recover
+        self.recovery_timeout = recovery_timeout
+
+        self.offset = len(initial)  # bytes recibidos: punto de reanudación
+        if initial and cache_writer:
+            cache_writer.write(initial)
+        self.buffer = deque()
+        self.buffered = 0
+        self.finished = False  # fin de pista (b'') o error definitivo
+        self.failed = False
+        self.closed = False
+        self.cond = threading.Condition()
+
+        self.thread = threading.Thread(target=self.run, name="RemoteStream", daemon=True)
+        self.thread.start()
+
+    def read(self, chunk_size):
+        with self.cond:
+            self.cond.wait_for(lambda: self.buffer or self.finished or self.closed)
+            if not self.buffer:
+                return None if self.failed or self.closed else b''
+
+            chunk = self.buffer.popleft()
+            if len(chunk) > chunk_size:
+                chunk, rest = chunk[:chunk_size], chunk[chunk_size:]
+                self.buffer.appendleft(rest)
+            self.buffered -= len(chunk)
+            self.cond.notify_all()
+            return chunk
+
+    def run(self):
+        context, self.trace_context = self.trace_context, None
+        with tracing.resume(context, 'render.first_chunk'):
+            chunk = self.fetch(tracing.context())
+
+        while chunk:
+            with self.cond:
+                self.buffer.append(chunk)
+                self.buffered += len(chunk)
+                self.cond.notify_all()
+                self.cond.wait_for(lambda: self.buffered < self.prefetch or self.closed)
+                if self.closed:
+                    break
+            chunk = self.fetch()
+
+        # Pista completa (b'') o cortada por un error o un close (None)
+        self.finish_cache(completed=chunk == b'' and not self.closed)
+        with self.cond:
+            self.finished = True
+            self.failed = chunk is None
+            self.cond.notify_all()
+
+    def fetch(self, context=None):
+        deadline = None
+        while not self.closed:
+            try:
+                # Usamos stream_manager y YA NO pasamos la identidad
+                chunk = self.stream_manager.get_audio_chunk(self.FETCH_SIZE,
+                                                            context=context)
+                break
+            except Spotifice.IOError as e:
+                logger.error(e)
+                return None
+            except Spotifice.StreamError as e:
+                # El servidor lo cerró por inactividad (p. ej. una pausa
+                # larga): se reabre en el mismo punto
+                if e.reason == IDLE_EXPIRED and self.recover:
+                    logger.info("Stream expired at byte %d, reopening", self.offset,
+                                extra=STREAM)
+                    deadline = deadline or time.monotonic() + self.recovery_timeout
+                    if not self.reopen(deadline):
+                        return None
+                    continue
+                # El stream se cerró (stop) mientras esperábamos el chunk
+                logger.warning(f"Stream closed: {e.reason}")
+                return None
+            except Ice.LocalException as e:
+                if not self.recover:
+                    logger.critical(e)
+                    return None
+
+                deadline = deadline or time.monotonic() + self.recovery_timeout
+                logger.warning(f"Stream interrupted at byte {self.offset}: {e}")
+                if not self.reopen(deadline):
+                    return None
+        else:
+            return None
+
+        if chunk and self.cache_writer:
+            self.cache_writer.write(chunk)
+        self.offset += len(chunk)
+        return chunk
+
+    def reopen(self, deadline):
+        while not self.closed:
+            try:
+                self.stream_manager = self.recover(self.offset)
+                logger.info(f"Stream resumed at byte {self.offset}")
+                return True
+            except Ice.Exception as e:
+                if time.monotonic() + self.RETRY_DELAY > deadline:
+                    logger.critical(f"Could not resume stream: {e}")
+                    return False
+                logger.info("Retrying stream recovery: %s", e, extra=STREAM)
+                time.sleep(self.RETRY_DELAY)
+        return False
+
+    def finish_cache(self, completed):
+        writer, self.cache_writer = self.cache_writer, None
+        if writer and completed:
+            writer.commit()
+        elif writer:
+            writer.abort()
+
+    def close(self):
+        # El hilo de prefetch descarta la caché a medias al terminar
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class StatusPublisher(threading.Thread):
+    """
+    Envía los cambios de PlaybackStatus a los observadores suscritos, con
+    llamadas oneway desde un hilo propio para no retrasar la operación que
+    cambió el estado. Si se acumulan varios cambios solo se envía el último.
+    Un solo publicador sirve a todas las zonas del proceso: los observadores
+    y el último estado se guardan por zona.
+    """
+    def __init__(self):
+        super().__init__(name="StatusPublisher", daemon=True)
+        self.observers = {}  # zona -> {identidad del observador: proxy}
+        self.latest = {}     # zona -> último (render_identity, status) sin enviar
+        self.cond = threading.Condition()
+
+    def subscribe(self, zone, observer):
+        with self.cond:
+            self.observers.setdefault(zone, {})[observer.ice_getIdentity()] = \
+                observer.ice_oneway()
+
+    def unsubscribe(self, zone, observer):
+        with self.cond:
+            self.observers.get(zone, {}).pop(observer.ice_getIdentity(), None)
+
+    def publish(self, zone, render_identity, status):
+        with self.cond:
+            if self.observers.get(zone):
+                self.latest[zone] = (render_identity, status)
+                self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.latest)
+                latest, self.latest = self.latest, {}
+                pending = [(zone, update, list(self.observers.get(zone, {}).values()))
+                           for zone, update in latest.items()]
+
+            for zone, (render_identity, status), observers in pending:
+                for observer in observers:
+                    try:
+                        observer.status_changed(render_identity, status)
+                    except Ice.Exception as e:
+                        logger.warning(f"Dropping unreachable observer: {e}")
+                        self.unsubscribe(zone, observer)
+
+
+def synchronized(method):
+    """Serializa la operación con el resto de las que cambian el estado."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class MediaRenderI(Spotifice.MediaRender):
-    def __init__(self, player):
+    def __init__(self, player, publisher=None, catalogs=None):
+        # Una zona de reproducción. En modo host (MediaRender.Zones) varias
+        # comparten el publicador de estado, la caché del catálogo y la de
+        # pistas; cada una tiene su reproductor y su sesión con el servidor.
         self.player = player
         self.server: Spotifice.MediaServerPrx = None
         
@@ -30,6 +247,40 @@ class MediaRenderI(Spotifice.MediaRender):
         
         self.current_track = None
 
+        # Pistas y playlists ya pedidas, al día por cambios (opcional, ver
+        # MediaRender.Catalog.Refresh; 0: se piden siempre al servidor)
+        self.catalog_refresh = 0
+        self.catalogs = catalogs or SharedCatalogs()
+        self.catalog: CatalogCache = None
+
+        # Calidad pedida al servidor en open_stream (AUTO: según el usuario)
+        self.quality = Spotifice.StreamQuality.AUTO
+
+        # Aplicar la ganancia ReplayGain calculada por el servidor
+        self.replay_gain = True
+
+        # Caché local de pistas completas (opcional) y origen de los chunks
+        self.track_cache: TrackCache = None
+        self.source = None
+
+        # Buffer por delante de la reproducción y recuperación de cortes:
+        # con credenciales se puede abrir otra sesión si la anterior se pierde
+        self.prefetch = DEFAULT_PREFETCH
+        self.recovery_timeout = DEFAULT_RECOVERY_TIMEOUT
+        # Audio que pedimos junto con la apertura del stream (0: sin burst)
+        self.burst_ms = DEFAULT_BURST_MS
+        # Leer los ficheros del servidor si está en esta máquina (opcional)
+        self.local_streams = False
+        self.credentials = None
+        self.resume_token = None
+        self.proxy: Spotifice.MediaRenderPrx = None
+
+        # Observadores que reciben los cambios de estado (push)
+        if publisher is None:
+            publisher = StatusPublisher()
+            publisher.start()
+        self.publisher = publisher
+
         # Identidad del render (Ya no es crítica para el streaming en v2, pero la mantenemos por si acaso)
         self.render_identity: Ice.Identity = None
 
@@ -38,12 +289,18 @@ class MediaRenderI(Spotifice.MediaRender):
         self.repeat = False
 
         # Estado de la playlist
+        self.current_playlist_id = ''
         self.current_playlist_ids = []
         self.current_track_index = -1
 
         # Historial para 'previous'
         self.history = []
 
+        # Todo el estado anterior se toca con este lock. Es reentrante porque
+        # unas operaciones usan otras (next -> stop/play) y el fin de pista
+        # llega desde un hilo del reproductor.
+        self.lock = threading.RLock()
+
     def ensure_player_stopped(self):
         if self.state == Spotifice.PlaybackState.PLAYING:
             raise Spotifice.PlayerError(reason="Already playing")
@@ -54,6 +311,7 @@ class MediaRenderI(Spotifice.MediaRender):
 
     # --- RenderConnectivity (MODIFICADO HITO 2) ---
 
+    @synchronized
     def bind_media_server(self, media_server, stream_manager, current=None):
         # 1. Validar servidor principal (MusicLibrary/PlaylistManager)
         try:
@@ -72,11 +330,49 @@ class MediaRenderI(Spotifice.MediaRender):
             raise Spotifice.BadReference(reason=f"SecureStreamManager not reachable: {e}")
 
         # 3. Guardar ambas referencias
-        self.server = media_server
-        self.stream_manager = stream_manager
+        # Las respuestas del catálogo (muy repetitivas) viajan comprimidas;
+        # el audio ya es MP3 y comprimirlo solo gastaría CPU
+        self.server = media_server.ice_compress(True)
+        self.stream_manager = stream_manager.ice_compress(False)
+        self.resume_token = self.fetch_resume_token(self.stream_manager)
+        self.start_catalog_cache()
         
         logger.info(f"Bound to MediaServer with active session.")
 
+    def start_catalog_cache(self):
+        self.release_catalog_cache()
+        if self.catalog_refresh <= 0:
+            return
+
+        try:
+            self.catalog = self.catalogs.acquire(self.server, self.catalog_refresh)
+        except Ice.OperationNotExistException:
+            logger.warning("Server has no catalog versions, catalog cache disabled")
+
+    def release_catalog_cache(self):
+        if self.catalog:
+            self.catalogs.release(self.catalog)
+            self.catalog = None
+
+    def track_info(self, track_id):
+        if self.catalog:
+            return self.catalog.track_info(track_id)
+        return self.server.get_track_info(track_id)
+
+    def playlist(self, playlist_id):
+        if self.catalog:
+            return self.catalog.playlist(playlist_id)
+        return self.server.get_playlist(playlist_id)
+
+    @staticmethod
+    def fetch_resume_token(session):
+        try:
+            return session.get_resume_token()
+        except Ice.Exception as e:
+            logger.warning(f"No resume token for this session: {e}")
+            return None
+
+    @synchronized
     def unbind_media_server(self, current=None):
         self.stop(current)
         
@@ -91,7 +387,9 @@ class MediaRenderI(Spotifice.MediaRender):
             self.stream_manager = None
         # --------------------
 
+        self.release_catalog_cache()
         self.server = None
+        self.resume_token = None
         self.current_playlist_ids = []
         self.current_track_index = -1
         self.history = []
@@ -99,12 +397,13 @@ class MediaRenderI(Spotifice.MediaRender):
 
     # --- ContentManager ---
 
+    @synchronized
     def load_track(self, track_id, current=None):
         self.ensure_server_bound()
 
         try:
             with self.keep_playing_state(current):
-                self.current_track = self.server.get_track_info(track_id)
+                self.current_track = self.track_info(track_id)
 
                 self.current_playlist_ids = []
                 self.current_track_index = -1
@@ -112,7 +411,9 @@ class MediaRenderI(Spotifice.MediaRender):
                 if not self.history or self.history[-1] != track_id:
                     self.history.append(track_id)
 
-            logger.info(f"Current track set to: {self.current_track.title}")
+            logger.info("Current track set to: %s", self.current_track.title,
+                        extra=STREAM)
+            self.notify_status()
 
         except Spotifice.TrackError as e:
             logger.error(f"Error setting track: {e.reason}")
@@ -121,26 +422,30 @@ class MediaRenderI(Spotifice.MediaRender):
     def get_current_track(self, current=None):
         return self.current_track
 
+    @synchronized
     def load_playlist(self, playlist_id, current=None):
         self.ensure_server_bound()
         logger.info(f"Loading playlist: {playlist_id}")
 
         try:
             with self.keep_playing_state(current):
-                playlist = self.server.get_playlist(playlist_id)
+                playlist = self.playlist(playlist_id)
                 if not playlist.track_ids:
                     raise Spotifice.PlaylistError(playlist_id, "Playlist is empty")
 
+                self.current_playlist_id = playlist_id
                 self.current_playlist_ids = playlist.track_ids
                 self.current_track_index = 0
                 self.history = []
 
                 first_track_id = self.current_playlist_ids[0]
-                self.current_track = self.server.get_track_info(first_track_id)
+                self.current_track = self.track_info(first_track_id)
                 self.history.append(first_track_id)
 
                 logger.info(f"Playlist '{playlist.name}' loaded. Current track: {self.current_track.title}")
 
+            self.notify_status()
+
         except (Spotifice.PlaylistError, Spotifice.TrackError) as e:
             logger.error(f"Error loading playlist: {e.reason}")
             self.current_playlist_ids = []
@@ -160,52 +465,207 @@ class MediaRenderI(Spotifice.MediaRender):
             if was_playing:
                 self.play(current)
 
+    @synchronized
     def play(self, current=None):
-        # Guardamos identidad por si acaso, aunque en v2 ya no es crítica
-        if current:
-            self.render_identity = current.id
+        with tracing.span('render.play', current):
+            # Guardamos identidad por si acaso, aunque en v2 ya no es crítica
+            if current:
+                self.render_identity = current.id
         
-        # --- MODIFICADO HITO 2 ---
-        def get_chunk_hook(chunk_size):
-            try:
-                # Usamos stream_manager y YA NO pasamos la identidad
-                return self.stream_manager.get_audio_chunk(chunk_size)
-            except Spotifice.IOError as e:
-                logger.error(e)
-            except Ice.Exception as e:
-                logger.critical(e)
-        # -------------------------
-
-        if self.state == Spotifice.PlaybackState.PAUSED:
-            logger.info("Resuming playback...")
-            self.player.resume()
-            self.state = Spotifice.PlaybackState.PLAYING
-            return
+            if self.state == Spotifice.PlaybackState.PAUSED:
+                logger.info("Resuming playback...")
+                self.player.resume()
+                self.state = Spotifice.PlaybackState.PLAYING
+                self.notify_status()
+                return
 
-        self.ensure_player_stopped()
-        self.ensure_server_bound()
+            self.ensure_player_stopped()
+            self.ensure_server_bound()
 
-        if not self.current_track:
-            raise Spotifice.TrackError(reason="No track loaded")
+            if not self.current_track:
+                raise Spotifice.TrackError(reason="No track loaded")
+
+            self.send_playlist_context()
+            self.source = self.open_cached_track() or self.open_local_stream()
+            if self.source is None:
+                try:
+                    # --- MODIFICADO HITO 2 ---
+                    # Usamos stream_manager y YA NO pasamos la identidad
+                    with tracing.span('render.open_stream'):
+                        served, burst = self.open_stream()
+                    # -------------------------
+                except Spotifice.BadIdentity as e:
+                    logger.error(f"Error starting stream: {e.reason}")
+                    raise Spotifice.StreamError(reason="Stream setup failed")
+
+                self.source = RemoteStream(
+                    self.stream_manager, self.cache_writer(served), tracing.context(),
+                    self.prefetch,
+                    functools.partial(self.resume_stream, self.current_track.id, served),
+                    self.recovery_timeout, burst)
+            else:
+                burst = b''
+
+            with tracing.span('render.gst_start'):
+                self.player.configure(
+                    self.source.read,
+                    functools.partial(self._on_song_finished, self.source),
+                    self.track_gain(), burst)
+
+                if not self.player.confirm_play_starts():
+                    raise Spotifice.PlayerError(reason="Failed to confirm playback")
 
+            self.state = Spotifice.PlaybackState.PLAYING
+            logger.info("Playing: %s", self.current_track.title, extra=STREAM)
+            self.notify_status()
+
+    def send_playlist_context(self):
+        """
+        Indica a la sesión qué pista sonará después, para que la precargue.
+        Es oneway: no añade un viaje de ida y vuelta al play().
+        """
+        playlist_id = self.current_playlist_id if self.current_playlist_ids else ''
         try:
-            # --- MODIFICADO HITO 2 ---
-            # Usamos stream_manager y YA NO pasamos la identidad
-            self.stream_manager.open_stream(self.current_track.id)
-            # -------------------------
-        except Spotifice.BadIdentity as e:
-            logger.error(f"Error starting stream: {e.reason}")
-            raise Spotifice.StreamError(reason="Stream setup failed")
-
-        self.player.configure(get_chunk_hook, self._on_song_finished)
-        
-        if not self.player.confirm_play_starts():
-            raise Spotifice.PlayerError(reason="Failed to confirm playback")
-
-        self.state = Spotifice.PlaybackState.PLAYING
-        logger.info(f"Playing: {self.current_track.title}")
+            self.stream_manager.ice_oneway().set_playlist_context(
+                playlist_id, self.current_track_index, self.repeat)
+        except Ice.Exception as e:
+            logger.warning(f"Could not send playlist context: {e}")
+
+    def open_stream(self):
+        """
+        Abre el stream de la pista actual y, si burst_ms > 0, recibe en la
+        misma respuesta el primer trozo de audio. Con un servidor que no
+        conoce open_stream_with_burst se abre sin él.
+        """
+        track_id, context = self.current_track.id, tracing.context()
+        if self.burst_ms > 0:
+            try:
+                start = self.stream_manager.open_stream_with_burst(
+                    track_id, self.quality, self.burst_ms, context=context)
+                return start.quality, start.burst
+            except Ice.OperationNotExistException:
+                logger.warning("Server does not send an initial burst")
+                self.burst_ms = 0
+
+        stream = self.stream_manager.open_stream(track_id, self.quality, context=context)
+        return stream, b''
+
+    def open_local_stream(self):
+        """
+        Si el servidor está en esta máquina, el fichero se lee directamente
+        en lugar de recibirlo por Ice. Si el servidor no lo ofrece, se deja
+        de intentar y se sigue por el camino normal.
+        """
+        if not self.local_streams:
+            return None
 
+        try:
+            local = self.stream_manager.open_local_stream(
+                self.current_track.id, self.quality, local_stream.host_id(),
+                context=tracing.context())
+            source = local_stream.open_verified(
+                local.path, local.device, local.inode, local.size)
+        except (Spotifice.StreamError, Ice.OperationNotExistException, OSError) as e:
+            logger.warning(f"Local stream not available, using remote streaming: {e}")
+            self.local_streams = False
+            return None
+
+        logger.info("Playing '%s' from local file", self.current_track.id, extra=STREAM)
+        return source
+
+    def open_cached_track(self):
+        version = self.current_track.version
+        if not self.track_cache or not version:
+            return None
+
+        cached = self.track_cache.open(version, str(self.quality))
+        if cached:
+            logger.info("Playing '%s' from local cache", self.current_track.id,
+                        extra=STREAM)
+        return cached
+
+    def cache_writer(self, served_quality):
+        version = self.current_track.version
+        if not self.track_cache or not version:
+            return None
+
+        # Se pidió una calidad concreta y llegó otra (la variante aún no
+        # existía): guardarla bajo la pedida la serviría aunque ya exista
+        if self.quality not in (Spotifice.StreamQuality.AUTO, served_quality):
+            logger.info("Not caching '%s': asked %s, served %s", self.current_track.id,
+                        self.quality, served_quality, extra=STREAM)
+            return None
+
+        return self.track_cache.writer(
+            version, str(self.quality),
+            served_quality == Spotifice.StreamQuality.ORIGINAL)
+
+    def resume_stream(self, track_id, quality, offset):
+        """
+        Reabre el stream en 'offset' tras perder la conexión; lo llama el hilo
+        de RemoteStream. Si la sesión ya no existe (servidor reiniciado u otra
+        réplica) se abre una nueva con las credenciales del render.
+        """
+        session = self.stream_manager
+        if session is None:
+            raise Spotifice.BadReference(reason="No session bound")
+        try:
+            session.ice_ping()
+        except Ice.LocalException:
+            session = self.reauthenticate()
+
+        # Pedimos la misma calidad: el offset solo vale para los mismos bytes
+        if session.open_stream(track_id, quality) != quality:
+            raise Spotifice.StreamError(reason=f"Server can not resume {quality} stream")
+        session.seek(offset)
+        return session
+
+    def reauthenticate(self):
+        """
+        Recupera la sesión con el token de reanudación (barato: el servidor
+        no comprueba la contraseña) y, si no vale, con las credenciales.
+        """
+        server = self.server
+        if not server or not self.proxy:
+            raise Spotifice.BadReference(reason="Can not open a new session")
+
+        session = None
+        if self.resume_token:
+            try:
+                session = server.resume(self.proxy, self.resume_token)
+                logger.info("Session resumed with token")
+            except (Spotifice.AuthError, Ice.OperationNotExistException) as e:
+                logger.warning(f"Resume token not accepted: {e}")
+
+        if session is None:
+            if not self.credentials:
+                raise Spotifice.BadReference(reason="Can not open a new session")
+            username, password = self.credentials
+            session = server.authenticate(self.proxy, username, password)
+            logger.info(f"New session opened for user '{username}'")
+
+        session = session.ice_compress(False)
+        self.stream_manager = session
+        self.resume_token = self.fetch_resume_token(session)
+        return session
+
+    def close_source(self):
+        if self.source:
+            self.source.close()
+            self.source = None
+
+    def track_gain(self):
+        gain = self.current_track.gain_db
+        # 0 dB: sin analizar (o nada que corregir)
+        if not self.replay_gain or not gain:
+            return None
+        return gain
+
+    @synchronized
     def stop(self, current=None):
+        # Primero la fuente: que su hilo no intente recuperar un stream cerrado
+        self.close_source()
+
         # --- MODIFICADO HITO 2 ---
         # Usamos stream_manager
         if self.stream_manager:
@@ -217,10 +677,12 @@ class MediaRenderI(Spotifice.MediaRender):
 
         if not self.player.stop():
             raise Spotifice.PlayerError(reason="Failed to confirm stop")
-        
+
         self.state = Spotifice.PlaybackState.STOPPED
         logger.info("Stopped")
+        self.notify_status()
 
+    @synchronized
     def pause(self, current=None):
         if self.state != Spotifice.PlaybackState.PLAYING:
             logger.warning("Pause called but not playing.")
@@ -229,19 +691,45 @@ class MediaRenderI(Spotifice.MediaRender):
         self.player.pause()
         self.state = Spotifice.PlaybackState.PAUSED
         logger.info("Paused")
+        self.notify_status()
 
+    @synchronized
     def get_status(self, current=None):
         track_id = self.current_track.id if self.current_track else ""
-        return Spotifice.PlaybackStatus(
+        status = Spotifice.PlaybackStatus(
             state=self.state,
             current_track_id=track_id,
             repeat=self.repeat
         )
 
+        position = self.player.get_position_ms()
+        if position is not None and self.state != Spotifice.PlaybackState.STOPPED:
+            status.position_ms = position
+        return status
+
+    @synchronized
     def set_repeat(self, value, current=None):
         self.repeat = value
         logger.info(f"Repeat set to {self.repeat}")
+        if self.stream_manager:
+            self.send_playlist_context()
+        self.notify_status()
+
+    def subscribe(self, observer, current=None):
+        if not observer:
+            raise Spotifice.BadReference(reason="PlaybackObserver proxy cannot be null")
+
+        self.publisher.subscribe(self, observer)
+        logger.info(f"Observer subscribed: {id2str(observer.ice_getIdentity())}")
+
+    def unsubscribe(self, observer, current=None):
+        if observer:
+            self.publisher.unsubscribe(self, observer)
 
+    def notify_status(self):
+        self.publisher.publish(self, self.render_identity, self.get_status())
+
+    @synchronized
     def next(self, current=None):
         if self.current_track_index == -1:
             logger.warning("Next called without a playlist loaded.")
@@ -258,16 +746,18 @@ class MediaRenderI(Spotifice.MediaRender):
             return False
 
         track_id = self.current_playlist_ids[self.current_track_index]
-        logger.info(f"Advancing to next track: {track_id}")
+        logger.info("Advancing to next track: %s", track_id, extra=STREAM)
 
         with self.keep_playing_state(current):
             self.ensure_server_bound()
-            self.current_track = self.server.get_track_info(track_id)
+            self.current_track = self.track_info(track_id)
             if not self.history or self.history[-1] != track_id:
                 self.history.append(track_id)
-        
+
+        self.notify_status()
         return True
 
+    @synchronized
     def previous(self, current=None):
         if len(self.history) < 2:
             logger.info("No previous track in history.")
@@ -276,7 +766,7 @@ class MediaRenderI(Spotifice.MediaRender):
         self.history.pop()
         prev_track_id = self.history.pop()
 
-        logger.info(f"Going to previous track: {prev_track_id}")
+        logger.info("Going to previous track: %s", prev_track_id, extra=STREAM)
         
         self.current_track_index = -1 
         if prev_track_id in self.current_playlist_ids:
@@ -284,12 +774,20 @@ class MediaRenderI(Spotifice.MediaRender):
 
         with self.keep_playing_state(current):
             self.ensure_server_bound()
-            self.current_track = self.server.get_track_info(prev_track_id)
+            self.current_track = self.track_info(prev_track_id)
             self.history.append(prev_track_id)
 
-    def _on_song_finished(self):
-        logger.info("Hook: Song finished.")
-        
+        self.notify_status()
+
+    @synchronized
+    def _on_song_finished(self, source):
+        # Si entretanto se paró o cambió de pista, este aviso ya no aplica
+        if source is not self.source:
+            logger.info("Hook: Ignoring end of a stale track.")
+            return
+
+        logger.info("Hook: Song finished.", extra=STREAM)
+
         # --- MODIFICADO HITO 2 ---
         # Usamos stream_manager para cerrar
         if self.stream_manager:
@@ -298,7 +796,8 @@ class MediaRenderI(Spotifice.MediaRender):
             except Exception:
                 pass
         # -------------------------
-        
+        self.close_source()
+
         simulated_current = Ice.Current(id=self.render_identity)
 
         if self.repeat and not self.current_playlist_ids:
@@ -315,18 +814,87 @@ class MediaRenderI(Spotifice.MediaRender):
 
         logger.info("Hook: Playback finished.")
         self.state = Spotifice.PlaybackState.STOPPED
+        self.notify_status()
+
+
+def configure_zone(servant, properties):
+    """Ajustes de MediaRender.* comunes a todas las zonas."""
+    quality = properties.getPropertyWithDefault('MediaRender.StreamQuality', 'AUTO')
+    servant.quality = getattr(Spotifice.StreamQuality, quality.upper(), None)
+    if not isinstance(servant.quality, Spotifice.StreamQuality):
+        logger.warning(f"Unknown MediaRender.StreamQuality '{quality}', using AUTO")
+        servant.quality = Spotifice.StreamQuality.AUTO
+    servant.replay_gain = properties.getPropertyAsIntWithDefault(
+        'MediaRender.ReplayGain', 1) > 0
+
+    servant.prefetch = properties.getPropertyAsIntWithDefault(
+        'MediaRender.Prefetch', DEFAULT_PREFETCH)
+    servant.recovery_timeout = properties.getPropertyAsIntWithDefault(
+        'MediaRender.Recovery.Timeout', DEFAULT_RECOVERY_TIMEOUT)
+    servant.burst_ms = properties.getPropertyAsIntWithDefault(
+        'MediaRender.Burst', DEFAULT_BURST_MS)
+    servant.local_streams = properties.getPropertyAsInt('MediaRender.LocalStreams') > 0
+    servant.catalog_refresh = properties.getPropertyAsInt('MediaRender.Catalog.Refresh')
+    username = properties.getProperty('MediaRender.Username')
+    if username:
+        servant.credentials = (username, properties.getProperty('MediaRender.Password'))
+
+
+def zone_sink(properties, zone):
+    return properties.getPropertyWithDefault(
+        f'MediaRender.Zone{zone}.Sink', GstPlayer.DEFAULT_SINK)
 
 
 def main(ic, player):
-    servant = MediaRenderI(player)
+    """
+    Sirve MediaRender.Zones zonas (1 por defecto) en este proceso, todas en
+    el mismo adaptador: la zona N es 'mediaRenderN' (o MediaRender.ZoneN.Identity)
+    y suena por MediaRender.ZoneN.Sink. 'player' es el de la zona 1.
+    """
+    properties = ic.getProperties()
+    async_logging.configure(properties, 'render')
+    tracing.configure(properties, 'render')
+    profiler_admin.install(ic, 'render')
+
+    # Lo que comparten las zonas: caché de pistas, catálogo y publicador
+    track_cache = None
+    cache_dir = properties.getProperty('MediaRender.Cache.Dir')
+    if cache_dir:
+        track_cache = TrackCache(cache_dir, properties.getPropertyAsIntWithDefault(
+            'MediaRender.Cache.MaxBytes', DEFAULT_MAX_BYTES))
+    catalogs = SharedCatalogs()
+    publisher = StatusPublisher()
+    publisher.start()
+
+    zones = max(1, properties.getPropertyAsIntWithDefault('MediaRender.Zones', 1))
+    players = [player]
+    for zone in range(2, zones + 1):
+        players.append(GstPlayer(zone_sink(properties, zone), name=f"GstPlayer-{zone}"))
+        players[-1].start()
+
+    # Las operaciones de una zona esperan al reproductor (play, stop): con
+    # varias zonas el adaptador necesita hilos para que no se bloqueen entre sí
+    if zones > 1 and not properties.getProperty('MediaRenderAdapter.ThreadPool.SizeMax'):
+        properties.setProperty('MediaRenderAdapter.ThreadPool.Size', '2')
+        properties.setProperty('MediaRenderAdapter.ThreadPool.SizeMax', str(2 * zones))
 
     adapter = ic.createObjectAdapter("MediaRenderAdapter")
-    proxy = adapter.add(servant, ic.stringToIdentity("mediaRender1"))
-    logger.info(f"MediaRender: {proxy}")
+    for zone, zone_player in enumerate(players, 1):
+        servant = MediaRenderI(zone_player, publisher, catalogs)
+        configure_zone(servant, properties)
+        servant.track_cache = track_cache
+
+        servant.render_identity = ic.stringToIdentity(properties.getPropertyWithDefault(
+            f'MediaRender.Zone{zone}.Identity', f'mediaRender{zone}'))
+        proxy = adapter.add(servant, servant.render_identity)
+        servant.proxy = Spotifice.MediaRenderPrx.uncheckedCast(proxy)
+        logger.info(f"MediaRender: {proxy}")
 
     adapter.activate()
     ic.waitForShutdown()
 
+    for zone_player in players[1:]:
+        zone_player.shutdown()
     logger.info("Shutdown")
 
 
@@ -336,15 +904,18 @@ if __name__ == "__main__":
     #    sys.exit("Usage: ...")
 
     # Si es el Render:
-    player = GstPlayer()
-    player.start()
+    player = None
     
     try:
         # 2. USA sys.argv (sin el [1])
         with Ice.initialize(sys.argv) as communicator:
+            # La salida de la zona 1 también puede venir de la configuración
+            player = GstPlayer(zone_sink(communicator.getProperties(), 1))
+            player.start()
             main(communicator, player) # O solo main(communicator) si es el server
     except KeyboardInterrupt:
         logger.info("Interrupted")
     finally:
         # Solo en el Render
-        player.shutdown()
\ No newline at end of file
+        if player:
+            player.shutdown()
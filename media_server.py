@@ -1,37 +1,101 @@
 #!/usr/bin/env python3
 
+import hashlib  # --- NUEVO HITO 2 ---
+import itertools
+import json  # --- NUEVO HITO 1 ---
 import logging
+import multiprocessing
+import re
+import secrets  # --- NUEVO HITO 2 ---
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import json  # --- NUEVO HITO 1 ---
-import hashlib  # --- NUEVO HITO 2 ---
-import secrets  # --- NUEVO HITO 2 ---
 
 import Ice
 from Ice import identityToString as id2str
 
+import async_logging
+import local_stream
+import profiler_admin
+import tracing
+from artwork import DEFAULT_DISK_BYTES, DEFAULT_MEMORY_BYTES, DEFAULT_SIZES, ArtworkCache
+from async_logging import CATALOG, SESSION, STREAM
+from catalog_cache import DEFAULT_REFRESH, CatalogCache
+from catalog_log import (
+    ADDED,
+    DEFAULT_MAX_CHANGES,
+    MODIFIED,
+    PLAYLIST,
+    REMOVED,
+    TRACK,
+    CatalogLog,
+)
+from catalog_snapshot import read_snapshot, write_snapshot
+from content_hash import HashCache
+from media_analysis import AnalysisStore, run_analysis
+from playlist_store import PlaylistWriter, parse_timestamp, stream_playlist
+from session_token import DEFAULT_TTL, TokenError, TokenSigner
+from shared_reader import (
+    DEFAULT_HEAD_SIZE,
+    DEFAULT_HEADS_MAX_BYTES,
+    DEFAULT_WINDOW,
+    HeadCache,
+    SharedReaderPool,
+)
+from slice_loader import load_slice
+from stream_scheduler import (
+    DEFAULT_BITRATE,
+    DEFAULT_IDLE_TIMEOUT,
+    IDLE_EXPIRED,
+    StreamScheduler,
+    mp3_bitrate,
+)
+from track_table import TrackTable
+from transcoder import VariantCache
+
 # --- MODIFICADO HITO 1 ---
-# Cargamos el nuevo contrato v1
-Ice.loadSlice('-I{} spotifice_v2.ice'.format(Ice.getSliceDir()))
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
 import Spotifice  # type: ignore # noqa: E402
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("MediaServer")
 
+# Tope del audio que se envía en la respuesta de open_stream_with_burst
+MAX_BURST = 1024 * 1024
+# Tope de los bytes que se devuelven en cada get_audio_chunk
+MAX_CHUNK = 1024 * 1024
+# Bytes que le quedan a un stream cuando se precarga la pista siguiente
+DEFAULT_WARM_AHEAD = 1024 * 1024
+
 
 class StreamedFile:
-    def __init__(self, track_info, media_dir):
+    def __init__(self, track_info, filepath, readers, quality=None):
         self.track = track_info
-        filepath = media_dir / track_info.filename
+        self.filepath = filepath
+        self.quality = quality
+        self.size = filepath.stat().st_size
+        # Ya se pidió precargar la pista siguiente
+        self.warmed = False
 
+        # Las sesiones que sirven el mismo fichero comparten un único lector
         try:
-            self.file = open(filepath, 'rb')
+            self.file = readers.attach(filepath)
         except Exception as e:
             raise Spotifice.IOError(track_info.filename, f"Error opening media file: {e}")
 
     def read(self, size):
         return self.file.read(size)
 
+    def seek(self, offset):
+        self.file.seek(offset)
+
+    @property
+    def remaining(self):
+        return self.size - self.file.offset
+
     def close(self):
         try:
             if self.file:
@@ -43,24 +107,37 @@ class StreamedFile:
         return f"<StreamState '{self.track.id}'>"
 
 class SecureStreamManagerI(Spotifice.SecureStreamManager):
-    def __init__(self, username, user_data, media_dir, tracks):
+    def __init__(self, username, user_data, library):
         """
         Representa una sesión autenticada.
         Maneja el streaming para UN único usuario.
         """
         self.username = username
         self.user_data = user_data
-        self.media_dir = media_dir
-        self.tracks = tracks
+        self.library = library
+        self.tracks = library.tracks
         
         # HITO 2: Usamos una variable simple, no un diccionario.
         # Solo gestionamos un fichero a la vez para este usuario.
         self.current_stream: StreamedFile = None
+        # Plaza en el planificador de streaming (si está activo)
+        self.ticket = None
+        # Protege current_stream y ticket: el pool de Ice puede despachar
+        # varias peticiones de la misma sesión a la vez
+        self.lock = threading.Lock()
+        # Playlist que está sonando (id, posición, repetir): indica qué
+        # pista abrirá después para precargarla
+        self.context = ('', -1, False)
+        # Cambia con cada apertura o cierre: una apertura que esperaba plaza
+        # en el planificador y ya no es la última pedida se descarta
+        self.generation = 0
+        # El último stream se cerró por inactividad (ver expire_stream)
+        self.expired = False
 
     # --- Interfaz Session ---
 
     def get_user_info(self, current=None):
-        logger.info(f"Retrieving info for user '{self.username}'")
+        logger.info("Retrieving info for user '%s'", self.username, extra=SESSION)
         return Spotifice.UserInfo(
             username=self.username,
             fullname=self.user_data.get('fullname', ''),
@@ -70,125 +147,576 @@ class SecureStreamManagerI(Spotifice.SecureStreamManager):
         )
 
     def close(self, current=None):
-        logger.info(f"Closing session for user '{self.username}'")
+        logger.info("Closing session for user '%s'", self.username, extra=SESSION)
         self.close_stream(current)
         # Nos eliminamos del adaptador para liberar memoria
         current.adapter.remove(current.id)
+        # Un token de esta sesión ya no debe poder reabrirla
+        self.library.revoke_session(current.id.name)
+
+    def get_resume_token(self, current=None):
+        return self.library.tokens.issue(
+            self.username, current.id.name, self.library.home)
 
     # --- Interfaz SecureStreamManager (Adaptada del Hito 1) ---
 
-    def open_stream(self, track_id, current=None):
-        # 1. Validación de pista (igual que antes)
+    def open_stream(self, track_id, quality, current=None):
+        with tracing.span('server.open_stream', current):
+            # 1. Validación de pista (igual que antes)
+            if track_id not in self.tracks:
+                raise Spotifice.TrackError(track_id, "Track not found")
+
+            # 2. Si ya había uno abierto, lo cerramos primero (lógica nueva)
+            generation = self.reset_stream()
+
+            # 3. Elegimos la variante: AUTO depende de si el usuario es premium
+            track = self.tracks[track_id]
+            if quality == Spotifice.StreamQuality.AUTO:
+                quality = self.library.default_quality(self.user_data)
+            filepath, served = self.library.stream_path(track, quality)
+
+            scheduler = self.library.scheduler
+            if not scheduler:
+                self.start_stream(track, filepath, served, generation=generation)
+                return served
+
+            # 4. Con planificador, el stream espera plaza sin ocupar un hilo (AMD)
+            future = Ice.Future()
+
+            def admitted(ticket):
+                try:
+                    self.start_stream(track, filepath, served, ticket, generation)
+                    future.set_result(served)
+                except Exception as e:
+                    ticket.release()
+                    future.set_exception(e)
+
+            def rejected(reason):
+                logger.warning(f"Stream rejected for user '{self.username}': {reason}")
+                future.set_exception(Spotifice.StreamError(reason=reason))
+
+            scheduler.admit(
+                self.user_data.get('is_premium', False),
+                self.library.stream_bitrate(track, filepath),
+                admitted, rejected)
+            return future
+
+    def open_stream_with_burst(self, track_id, quality, burst_ms, current=None):
+        """
+        Como open_stream, pero la respuesta trae ya los primeros 'burst_ms'
+        milisegundos de audio: el render los entrega a GStreamer de golpe y
+        decodebin negocia el formato sin esperar a otra petición.
+        """
+        result = self.open_stream(track_id, quality, current)
+        if not isinstance(result, Ice.Future):
+            return self.read_burst(result, burst_ms)
+
+        future = Ice.Future()
+
+        def opened(f):
+            try:
+                future.set_result(self.read_burst(f.result(), burst_ms))
+            except Exception as e:
+                future.set_exception(e)
+
+        result.add_done_callback(opened)
+        return future
+
+    def read_burst(self, served, burst_ms):
+        with self.lock:
+            stream, ticket = self.current_stream, self.ticket
+            if not stream:
+                raise Spotifice.StreamError(reason="No stream open")
+
+            bitrate = self.library.stream_bitrate(stream.track, stream.filepath)
+            size = min(bitrate // 8 * max(burst_ms, 0) // 1000, MAX_BURST)
+            try:
+                data = stream.read(size)
+            except Exception as e:
+                raise Spotifice.IOError(stream.track.filename, f"Error reading file: {e}")
+
+        # Se descuenta del cupo, pero sin retraso: cabe en la ráfaga del bucket
+        if ticket:
+            ticket.consume(len(data))
+        return Spotifice.StreamStart(served, data)
+
+    def open_local_stream(self, track_id, quality, host_id, current=None):
+        """
+        Camino rápido para un render en esta misma máquina: en vez de enviar
+        el audio por Ice se le indica el fichero, que lee directamente. La
+        sesión, la pista y la variante se siguen comprobando aquí, y solo se
+        ofrece si la conexión es local y el render dice ser de este host.
+        """
+        if not self.library.local_streams:
+            raise Spotifice.StreamError(reason="Local streams disabled")
+        same_host = host_id == local_stream.host_id()
+        if not same_host or not local_stream.is_local_connection(current):
+            raise Spotifice.StreamError(reason="Render is not on this host")
         if track_id not in self.tracks:
             raise Spotifice.TrackError(track_id, "Track not found")
 
-        # 2. Si ya había uno abierto, lo cerramos primero (lógica nueva)
         self.close_stream(current)
+        track = self.tracks[track_id]
+        if quality == Spotifice.StreamQuality.AUTO:
+            quality = self.library.default_quality(self.user_data)
+        filepath, served = self.library.stream_path(track, quality)
 
-        # 3. Abrimos el nuevo fichero (sin usar render_id)
         try:
-            self.current_stream = StreamedFile(self.tracks[track_id], self.media_dir)
-            logger.info(f"Stream opened for track '{track_id}' (User: {self.username})")
+            st = filepath.stat()
+        except OSError as e:
+            raise Spotifice.IOError(track.filename, f"Error opening media file: {e}")
+
+        logger.info("Local stream for track '%s' at %s (User: %s)",
+                    track.id, served, self.username, extra=STREAM)
+        return Spotifice.LocalStream(
+            served, str(filepath.resolve()), st.st_dev, st.st_ino, st.st_size)
+
+    def start_stream(self, track, filepath, served, ticket=None, generation=None):
+        # Abrimos el nuevo fichero (sin usar render_id), salvo que mientras
+        # esperaba plaza se haya cerrado la sesión o pedido otro stream
+        if generation is not None and generation != self.generation:
+            raise Spotifice.StreamError(reason="Stream request superseded")
+        try:
+            stream = StreamedFile(track, filepath, self.library.readers, served)
         except Exception as e:
             # Capturamos error al abrir fichero
-            raise Spotifice.IOError(track_id, f"Could not open file: {e}")
+            raise Spotifice.IOError(track.id, f"Could not open file: {e}")
+
+        if not self.swap_stream(stream, ticket, generation=generation):
+            stream.close()
+            raise Spotifice.StreamError(reason="Stream request superseded")
+        if ticket:
+            ticket.on_idle = lambda: self.expire_stream(stream)
+        logger.info("Stream opened for track '%s' at %s (User: %s)",
+                    track.id, served, self.username, extra=STREAM)
 
     def close_stream(self, current=None):
-        # Lógica simplificada: solo miramos la variable local
-        if self.current_stream:
-            self.current_stream.close()
-            track_id = self.current_stream.track.id
-            self.current_stream = None
-            logger.info(f"Stream closed for track '{track_id}' (User: {self.username})")
+        self.reset_stream()
 
-    def get_audio_chunk(self, chunk_size, current=None):
-        # Comprobación simple
-        if not self.current_stream:
-            raise Spotifice.StreamError(reason="No stream open")
+    def expire_stream(self, stream):
+        """
+        El cliente dejó de pedir audio (caído o desconectado): se cierra el
+        stream para que su plaza en el planificador vuelva a estar libre.
+        """
+        if self.swap_stream(expected=stream):
+            self.expired = True
+            logger.warning("Stream for track '%s' expired (User: %s)",
+                           stream.track.id, self.username, extra=STREAM)
 
+    def reset_stream(self):
+        """
+        Cierra el stream actual y anula las aperturas que aún esperan plaza.
+        Devuelve la generación que debe llevar la próxima apertura.
+        """
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        self.swap_stream()
+        return generation
+
+    def swap_stream(self, stream=None, ticket=None, expected=None, generation=None):
+        """
+        Sustituye el stream de la sesión (y su plaza en el planificador).
+        Si se indica 'expected', solo lo hace si ese sigue siendo el actual;
+        si se indica 'generation', solo si no ha habido otra apertura o cierre
+        (si no, libera 'ticket' y devuelve False).
+        El cierre del anterior se hace fuera del lock: liberar la plaza puede
+        dar paso a otra sesión, que tomará su propio lock.
+        """
+        with self.lock:
+            if expected is not None and self.current_stream is not expected:
+                return False
+            stale = generation is not None and generation != self.generation
+            if stale:
+                old_stream, old_ticket = None, ticket
+            else:
+                old_stream, old_ticket = self.current_stream, self.ticket
+                self.current_stream, self.ticket = stream, ticket
+                self.expired = False
+
+        if old_ticket:
+            old_ticket.release()
+        if old_stream:
+            old_stream.close()
+            logger.info("Stream closed for track '%s' (User: %s)",
+                        old_stream.track.id, self.username, extra=STREAM)
+        return not stale
+
+    def seek(self, offset, current=None):
+        """Recoloca el stream en 'offset' (p. ej. al reanudarlo en otra réplica)."""
+        if offset < 0:
+            raise Spotifice.StreamError(reason=f"Invalid offset: {offset}")
+
+        with self.lock:
+            if not self.current_stream:
+                raise Spotifice.StreamError(reason="No stream open")
+            self.current_stream.seek(offset)
+
+        logger.info("Stream seek to %d (User: %s)", offset, self.username, extra=STREAM)
+
+    def set_playlist_context(self, playlist_id, index, repeat, current=None):
         try:
-            data = self.current_stream.read(chunk_size)
+            if playlist_id and self.library.find_playlist(playlist_id) is None:
+                raise Spotifice.PlaylistError(playlist_id, "Playlist not found")
+        except Ice.LocalException as e:
+            # Sin supervisor no se puede comprobar: solo afecta a la precarga
+            logger.warning(f"Could not check playlist '{playlist_id}': {e}")
+        self.context = (playlist_id, index, repeat)
+
+    def get_audio_chunk(self, chunk_size, current=None):
+        with tracing.span('server.get_audio_chunk', current):
+            with self.lock:
+                stream, ticket = self.current_stream, self.ticket
+                # Comprobación simple
+                if not stream:
+                    reason = IDLE_EXPIRED if self.expired else "No stream open"
+                    raise Spotifice.StreamError(reason=reason)
+
+                try:
+                    data = stream.read(min(max(chunk_size, 0), MAX_CHUNK))
+                except Exception as e:
+                    raise Spotifice.IOError(stream.track.filename,
+                                            f"Error reading file: {e}")
+
             if not data:
-                logger.info(f"Track finished: {self.current_stream.track.id}")
-                self.close_stream(current)
-            return data
+                logger.info("Track finished: %s", stream.track.id, extra=STREAM)
+                self.swap_stream(expected=stream)
+                return data
+
+            # Cerca del final: que la pista siguiente no se abra en frío
+            if not stream.warmed and stream.remaining <= self.library.warm_ahead:
+                stream.warmed = True
+                self.library.warm_next(self.context, stream)
+
+            # Si la sesión va más rápido que su cupo, retrasamos la respuesta
+            delay = ticket.consume(len(data)) if ticket else 0
+            if not delay:
+                return data
+
+            future = Ice.Future()
+            self.library.scheduler.delays.call_later(delay, future.set_result, data)
+            return future
+
 
-        except Exception as e:
-            raise Spotifice.IOError(
-                self.current_stream.track.filename, f"Error reading file: {e}")
-        
 class MediaServerI(Spotifice.MediaServer):
     # --- MODIFICADO HITO 1 ---
     # El constructor ahora también acepta el directorio de playlists
-    def __init__(self, media_dir, playlists_dir, users_file):
+    def __init__(self, media_dir, playlists_dir, users_file,
+                 hash_cache_file=None, scan_workers=None, read_window=DEFAULT_WINDOW,
+                 snapshot=None):
         self.media_dir = Path(media_dir)
-        self.tracks = {}
-        
+        # El catálogo se construye al arrancar, en columnas (ver TrackTable);
+        # después solo cambian los datos del análisis
+        self.tracks = TrackTable(Spotifice.TrackInfo)
+
+        # Versión del catálogo y cambios recientes (get_changes_since)
+        self.catalog_log = CatalogLog()
+
+        # Hash de contenido de cada pista: las copias idénticas con distinto
+        # nombre comparten un único fichero canónico (TrackInfo.filename)
+        self.hash_cache = HashCache(hash_cache_file)
+        self.scan_workers = scan_workers
+
+        # Lectores compartidos para las sesiones que escuchan la misma pista
+        self.readers = SharedReaderPool(read_window)
+        # Precarga de la pista siguiente (opcional, ver enable_prefetch)
+        self.warm_ahead = 0
+
+        # Renders en la misma máquina leen los ficheros directamente
+        self.local_streams = False
 
         # --- NUEVO HITO 1 ---
         self.playlists_dir = Path(playlists_dir)
         self.playlists = {}  # Diccionario para almacenar las playlists cargadas
         # ---------------------
+
+        # Las ediciones se guardan en disco en segundo plano (write-behind)
+        self.playlist_files = {}
+        self.playlists_lock = threading.Lock()
+        self.playlist_writer = PlaylistWriter()
+        self.playlist_writer.start()
         self.users_file = Path(users_file)
         self.users = {}
-        # Cargamos primero la música
-        self.load_media()
+
+        # Variantes de menor bitrate (opcional, ver enable_variants)
+        self.variants: VariantCache = None
+        self.quality_bitrates = {}
+
+        # Carátulas redimensionadas (opcional, ver create_servant)
+        self.artwork: ArtworkCache = None
+
+        # Duraciones y ReplayGain (opcional, ver enable_analysis)
+        self.analysis: AnalysisStore = None
+
+        # Reparto del ancho de banda entre sesiones (opcional)
+        self.scheduler: StreamScheduler = None
+
+        # Sesiones repartidas entre procesos worker (opcional, ver WorkerPool)
+        self.workers: WorkerPool = None
+        # En un worker: playlists al día, pedidas al supervisor (su copia
+        # local es la del arranque). Ver enable_supervisor_catalog.
+        self.supervisor_catalog: CatalogCache = None
+        self.supervisor_lock = threading.Lock()
+
+        # Tokens de reanudación (ver create_servant). Sin secreto configurado
+        # solo valen mientras viva el proceso; 'home' es el worker de la sesión
+        self.tokens = TokenSigner(secrets.token_bytes(32))
+        self.home = ''
+        self.revoked = {}  # sesiones cerradas -> caducidad de sus tokens
+        self.sessions_lock = threading.Lock()
+
+        # Cargamos primero la música (un worker la toma del snapshot)
+        if snapshot:
+            self.load_snapshot(snapshot)
+        else:
+            self.load_media()
         # Y después las playlists (para poder validar los tracks)
         self.load_playlists()  # --- NUEVO HITO 1 ---
         self.load_users()      # --- NUEVO HITO 2 ---
 
+    def shutdown(self):
+        # Guardamos las ediciones de playlists que queden pendientes
+        self.playlist_writer.close()
+        if self.workers:
+            self.workers.shutdown()
+        if self.supervisor_catalog:
+            self.supervisor_catalog.stop()
+        if self.variants:
+            self.variants.shutdown()
+        if self.artwork:
+            self.artwork.shutdown()
+        if self.scheduler:
+            self.scheduler.shutdown()
+        self.readers.shutdown()
+
     def ensure_track_exists(self, track_id):
         if track_id not in self.tracks:
             raise Spotifice.TrackError(track_id, "Track not found")
 
+    def enable_variants(self, variants, generate=True):
+        """
+        Activa la escalera de bitrates: LOW, MEDIUM y HIGH se asignan, en ese
+        orden, a los bitrates de la caché. Las variantes que falten se generan
+        en segundo plano; mientras tanto se sirve el fichero original.
+        """
+        self.variants = variants
+        self.quality_bitrates = dict(zip(
+            (Spotifice.StreamQuality.LOW,
+             Spotifice.StreamQuality.MEDIUM,
+             Spotifice.StreamQuality.HIGH),
+            variants.bitrates))
+
+        if generate:
+            sources = {self.media_dir / name for name in self.tracks.distinct_filenames()}
+            variants.generate(sorted(sources))
+
+    def enable_prefetch(self, heads, ahead):
+        """
+        Cuando a un stream le quedan 'ahead' bytes, se lee en segundo plano
+        el principio de la pista que probablemente sonará después.
+        """
+        self.readers = SharedReaderPool(self.readers.window, heads)
+        self.warm_ahead = ahead
+
+    def enable_supervisor_catalog(self, supervisor, refresh=DEFAULT_REFRESH):
+        """
+        Modo worker: las playlists se piden al supervisor, que es quien las
+        edita. La caché arranca con la primera consulta, cuando el supervisor
+        ya atiende peticiones.
+        """
+        self.supervisor_catalog = CatalogCache(supervisor, refresh)
+
+    def find_playlist(self, playlist_id):
+        """La playlist al día, o None si no existe."""
+        catalog = self.supervisor_catalog
+        if not catalog:
+            return self.playlists.get(playlist_id)
+
+        try:
+            with self.supervisor_lock:
+                if catalog.version is None:
+                    catalog.start()
+            return catalog.playlist(playlist_id)
+        except Spotifice.PlaylistError:
+            return None
+
+    def predict_next(self, context, track_id):
+        playlist_id, index, repeat = context
+        if not playlist_id:
+            return track_id if repeat else None
+
+        try:
+            playlist = self.find_playlist(playlist_id)
+        except Ice.Exception as e:
+            logger.warning(f"Could not fetch playlist '{playlist_id}': {e}")
+            return None
+        if not playlist or not playlist.track_ids:
+            return None
+        if index + 1 < len(playlist.track_ids):
+            return playlist.track_ids[index + 1]
+        return playlist.track_ids[0] if repeat else None
+
+    def warm_next(self, context, stream):
+        """
+        Solo encola la precarga: en modo worker predecir puede consultar al
+        supervisor, y eso no debe ocurrir dentro de get_audio_chunk.
+        """
+        self.readers.warm_predicted(lambda: self.next_path(context, stream))
+
+    def next_path(self, context, stream):
+        track_id = self.predict_next(context, stream.track.id)
+        if track_id is None or track_id not in self.tracks:
+            return None
+        filepath, _ = self.stream_path(self.tracks[track_id], stream.quality)
+        return filepath
+
+    def enable_analysis(self, store, run=True, workers=0):
+        """
+        Publica en TrackInfo los resultados ya analizados y, si 'run', analiza
+        en segundo plano las pistas pendientes sin retrasar el arranque.
+        """
+        self.analysis = store
+        sources = sorted(self.media_dir / name
+                         for name in self.tracks.distinct_filenames())
+        for source in sources:
+            if store.is_fresh(source):
+                self.apply_analysis(store.get(source.name), publish=False)
+
+        if run:
+            threading.Thread(
+                target=run_analysis, args=(sources, store, workers, self.apply_analysis),
+                daemon=True).start()
+
+    def apply_analysis(self, record, publish=True):
+        self.tracks.set_analysis(
+            record['filename'], record['duration_ms'], record['gain_db'], record['peak'])
+        # Lo analizado al arrancar ya está en la versión inicial del catálogo
+        if publish:
+            for track_id in self.tracks.ids_for(record['filename']):
+                self.catalog_log.record(TRACK, track_id, MODIFIED)
+
+    def default_quality(self, user_data):
+        if user_data.get('is_premium', False):
+            return Spotifice.StreamQuality.ORIGINAL
+        return Spotifice.StreamQuality.MEDIUM
+
+    def stream_path(self, track, quality):
+        """Devuelve el fichero a servir y la calidad que realmente tiene."""
+        source = self.media_dir / track.filename
+        bitrate = self.quality_bitrates.get(quality)
+        if not self.variants or bitrate is None:
+            return source, Spotifice.StreamQuality.ORIGINAL
+
+        variant = self.variants.lookup(source, bitrate)
+        if variant is None:
+            logger.info("No %dk variant for '%s' yet, serving original",
+                        bitrate, track.id, extra=STREAM)
+            return source, Spotifice.StreamQuality.ORIGINAL
+
+        return variant, quality
+
+    @staticmethod
+    def stream_bitrate(track, filepath):
+        """
+        Bitrate real (bits/s) del fichero servido: tamaño entre duración si
+        la pista está analizada, o el de la cabecera MP3 si no.
+        """
+        if track.duration_ms > 0:
+            return filepath.stat().st_size * 8 * 1000 // track.duration_ms
+
+        try:
+            return mp3_bitrate(filepath) or DEFAULT_BITRATE
+        except OSError:
+            return DEFAULT_BITRATE
+
     def load_media(self):
-        for filepath in sorted(Path(self.media_dir).iterdir()):
-            if not filepath.is_file() or filepath.suffix.lower() != ".mp3":
+        filepaths = [
+            filepath for filepath in sorted(Path(self.media_dir).iterdir())
+            if filepath.is_file() and filepath.suffix.lower() == ".mp3"]
+
+        # El hash de cada fichero se calcula en paralelo (o sale de la caché)
+        with ThreadPoolExecutor(self.scan_workers) as executor:
+            digests = list(executor.map(self.track_digest, filepaths))
+        self.hash_cache.save()
+
+        canonical = {}
+        for filepath, digest in zip(filepaths, digests):
+            if digest is None:
                 continue
+            filename = canonical.setdefault(digest, filepath.name)
+            if filename != filepath.name:
+                logger.info(f"Track '{filepath.name}' is a duplicate of '{filename}'")
 
-            self.tracks[filepath.name] = self.track_info(filepath)
+            self.tracks.append(filepath.name, filepath.stem, filename, version=digest)
 
-        logger.info(f"Load media:  {len(self.tracks)} tracks")
+        logger.info(f"Load media:  {len(self.tracks)} tracks, "
+                    f"{len(canonical)} distinct files")
+
+    def track_digest(self, filepath):
+        """Hash de contenido de la pista, o None si no se puede leer (se omite)."""
+        try:
+            return self.hash_cache.digest(filepath)
+        except OSError as e:
+            logger.warning(f"Skipping unreadable track '{filepath.name}': {e}")
+            return None
+
+    def load_snapshot(self, path):
+        """Catálogo ya escaneado por el supervisor (modo multiproceso)."""
+        for record in read_snapshot(path):
+            self.tracks.append(**record)
+
+        logger.info(f"Load media:  {len(self.tracks)} tracks from snapshot '{path}'")
+
+    def save_snapshot(self, path):
+        write_snapshot(path, self.tracks.records())
 
     # --- MÉTODO TOTALMENTE NUEVO HITO 1 ---
     def load_playlists(self):
         """
         Carga las definiciones de las playlists desde los ficheros JSON.
         Valida que las pistas existan en self.tracks.
+        Los ficheros se leen en streaming, pista a pista, sin cargarlos enteros.
         """
         logger.info(f"Loading playlists from '{self.playlists_dir}'...")
         try:
             for filepath in self.playlists_dir.glob('*.playlist'):
                 logger.info(f"Processing playlist: {filepath.name}")
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-
-                    # --- Validación Hito 1 ---
-                    # El enunciado pide omitir pistas que no existan.
-                    valid_track_ids = []
-                    for track_id in data.get('track_ids', []):
-                        if track_id in self.tracks:
-                            valid_track_ids.append(track_id)
-                        else:
-                            logger.warning(
-                                f"Track '{track_id}' in playlist '{data.get('id')}' not found. Skipping.")
-
-                    # El struct Playlist define created_at como 'long' (int).
-                    # El JSON de ejemplo tiene un string ("25-05-2011").
-                    # Para evitar errores de tipo, lo dejaremos en 0 por ahora.
-                    playlist = Spotifice.Playlist(
-                        id=data.get('id', ''),
-                        name=data.get('name', ''),
-                        description=data.get('description', ''),
-                        owner=data.get('owner', ''),
-                        created_at=0,  # Placeholder por el tipo 'long'
-                        track_ids=valid_track_ids  # Usamos la lista validada
-                    )
-                    
-                    if playlist.id:
-                        self.playlists[playlist.id] = playlist
+                data = {}
+
+                # --- Validación Hito 1 ---
+                # El enunciado pide omitir pistas que no existan.
+                valid_track_ids = []
+                for key, value in stream_playlist(filepath):
+                    if key != 'track_id':
+                        data[key] = value
+                    elif value in self.tracks:
+                        valid_track_ids.append(value)
                     else:
-                        logger.warning(f"Skipping playlist {filepath.name} with no ID.")
+                        logger.warning(f"Track '{value}' in playlist '{filepath.name}' "
+                                       "not found. Skipping.")
+
+                # El struct Playlist define created_at como 'long' (timestamp)
+                # y el JSON trae una fecha en texto ("25-05-2011").
+                try:
+                    created_at = parse_timestamp(data.get('created_at'))
+                except ValueError as e:
+                    logger.warning(f"Playlist {filepath.name}: {e}")
+                    created_at = 0
+
+                playlist = Spotifice.Playlist(
+                    id=data.get('id', ''),
+                    name=data.get('name', ''),
+                    description=data.get('description', ''),
+                    owner=data.get('owner', ''),
+                    created_at=created_at,
+                    track_ids=valid_track_ids  # Usamos la lista validada
+                )
+
+                if playlist.id:
+                    self.playlists[playlist.id] = playlist
+                    self.playlist_files[playlist.id] = filepath
+                else:
+                    logger.warning(f"Skipping playlist {filepath.name} with no ID.")
 
         except Exception as e:
             logger.error(f"Failed to load playlists: {e}")
@@ -239,7 +767,14 @@ class MediaServerI(Spotifice.MediaServer):
         """
         Valida las credenciales y crea una sesión segura.
         """
-        logger.info(f"Authentication request for user: '{username}'")
+        logger.info("Authentication request for user: '%s'", username, extra=SESSION)
+
+        # En modo multiproceso la sesión la crea (y la sirve) un worker
+        if self.workers:
+            session = self.workers.authenticate(media_render, username, password)
+            if session:
+                return session
+            logger.warning("No worker available, serving session locally")
 
         # --- VALIDACIÓN NUEVA (Uso de media_render) ---
         # El contrato dice que podemos lanzar BadReference
@@ -266,31 +801,140 @@ class MediaServerI(Spotifice.MediaServer):
             logger.warning(f"Invalid password for user '{username}'.")
             raise Spotifice.AuthError(username, "Invalid credentials")
 
-        logger.info(f"User '{username}' authenticated successfully.")
+        logger.info("User '%s' authenticated successfully.", username, extra=SESSION)
 
         # 3. Crear la sesión (SecureStreamManagerI)
-        session_servant = SecureStreamManagerI(username, user_data, self.media_dir, self.tracks)
+        session_servant = SecureStreamManagerI(username, user_data, self)
 
         # 4. Registrar el sirviente dinámicamente
         proxy = current.adapter.addWithUUID(session_servant)
+        proxy = self.pinned_proxy(current.adapter, proxy)
+        # La sesión transporta audio ya comprimido (MP3): sin compresión Ice,
+        # aunque el cliente la use para el catálogo
+        proxy = proxy.ice_compress(False)
 
         return Spotifice.SecureStreamManagerPrx.checkedCast(proxy)
     # ---------------------
 
+    def resume(self, media_render, token, current=None):
+        """
+        Reanuda una sesión con un token de get_resume_token, sin volver a
+        comprobar la contraseña. Si la sesión sigue viva se devuelve tal cual,
+        con su stream y su posición; si no (p. ej. el servidor se reinició) se
+        crea otra con la misma identidad.
+        """
+        try:
+            claims = self.tokens.verify(token)
+        except TokenError as e:
+            logger.warning(f"Resume rejected: {e}")
+            raise Spotifice.AuthError(reason="Invalid resume token")
+
+        username = claims['user']
+        # La sesión vive en un worker: la reanuda él
+        if self.workers and claims['home']:
+            session = self.workers.resume(int(claims['home']), media_render, token)
+            if session:
+                return session
+            logger.warning("No worker available, resuming session locally")
+
+        if not media_render:
+            raise Spotifice.BadReference(reason="MediaRender proxy cannot be null")
+        if username not in self.users or claims['session'] in self.revoked:
+            raise Spotifice.AuthError(username, "Invalid resume token")
+
+        identity = Ice.Identity(name=claims['session'])
+        if current.adapter.find(identity) is None:
+            try:
+                current.adapter.add(
+                    SecureStreamManagerI(username, self.users[username], self), identity)
+                logger.info("Session of user '%s' recreated from token", username,
+                            extra=SESSION)
+            except Ice.AlreadyRegisteredException:
+                pass  # otra petición la ha recreado a la vez
+        else:
+            logger.info("Session of user '%s' resumed", username, extra=SESSION)
+
+        proxy = self.pinned_proxy(current.adapter, current.adapter.createProxy(identity))
+        return Spotifice.SecureStreamManagerPrx.uncheckedCast(proxy.ice_compress(False))
+
+    def revoke_session(self, name):
+        """
+        Los tokens de la sesión cerrada dejan de valer en este proceso.
+        En modo supervisor la lista no se comparte: si el worker que cerró
+        la sesión no responde, resume la recrea en otro a partir del token
+        hasta que caduque (MediaServer.Resume.TTL).
+        """
+        now = time.time()
+        with self.sessions_lock:
+            revoked = {k: v for k, v in self.revoked.items() if v > now}
+            revoked[name] = now + self.tokens.ttl
+            self.revoked = revoked
+
     @staticmethod
-    def track_info(filepath):
-        return Spotifice.TrackInfo(
-            id=filepath.name,
-            title=filepath.stem,
-            filename=filepath.name)
+    def pinned_proxy(adapter, proxy):
+        """
+        Dentro de un replica-group de IceGrid el proxy por defecto apunta al
+        grupo y el Locator podría resolverlo a otra réplica, donde la sesión
+        no existe. Lo fijamos al adaptador concreto que la ha creado.
+        """
+        properties = adapter.getCommunicator().getProperties()
+        if not properties.getProperty(f"{adapter.getName()}.AdapterId"):
+            return proxy
+        return adapter.createIndirectProxy(proxy.ice_getIdentity())
 
     # ---- MusicLibrary (sin cambios) ----
     def get_all_tracks(self, current=None):
-        return list(self.tracks.values())
+        return self.tracks.values()
 
     def get_track_info(self, track_id, current=None):
         self.ensure_track_exists(track_id)
         return self.tracks[track_id]
+
+    def get_track_columns(self, current=None):
+        ids, titles, durations = self.tracks.columns()
+        return Spotifice.TrackColumns(ids, titles, durations)
+
+    def get_artwork(self, track_id, size, known_version, current=None):
+        """
+        Carátula de la pista con su lado mayor como mucho 'size' píxeles.
+        Si el cliente ya tiene 'known_version' solo se devuelven los datos
+        de la imagen, sin los bytes.
+        """
+        self.ensure_track_exists(track_id)
+        if not self.artwork:
+            return Spotifice.Artwork()
+
+        track = self.tracks[track_id]
+        try:
+            variant = self.artwork.variant(track.filename, size)
+        except OSError as e:
+            raise Spotifice.IOError(track.filename, f"Error reading artwork: {e}")
+        if variant is None:
+            return Spotifice.Artwork()
+
+        artwork = Spotifice.Artwork(
+            variant.mime, variant.width, variant.height, variant.version, b'')
+        if known_version == variant.version:
+            return artwork
+
+        # Si hay que generar la miniatura, se responde al terminar (AMD)
+        try:
+            result = self.artwork.load(variant)
+        except (OSError, ValueError, IndexError) as e:
+            raise Spotifice.IOError(track.filename, f"Error reading artwork: {e}")
+        future = Ice.Future()
+
+        def loaded(f):
+            try:
+                artwork.data = f.result()
+                future.set_result(artwork)
+            except Exception as e:
+                logger.error(f"Artwork for '{track_id}' failed: {e}")
+                future.set_exception(
+                    Spotifice.IOError(track.filename, f"Error resizing artwork: {e}"))
+
+        result.add_done_callback(loaded)
+        return future
     # ------------------------------------
 
     # ELIMINADO: open_stream, close_stream, get_audio_chunk
@@ -301,23 +945,305 @@ class MediaServerI(Spotifice.MediaServer):
 
     def get_all_playlists(self, current=None):
         """Devuelve una lista de todas las playlists cargadas."""
-        logger.info("Serving all playlists")
+        logger.info("Serving all playlists", extra=CATALOG)
         return list(self.playlists.values())
 
     def get_playlist(self, playlist_id, current=None):
         """Devuelve una playlist específica por su ID."""
-        logger.info(f"Serving playlist '{playlist_id}'")
+        logger.info("Serving playlist '%s'", playlist_id, extra=CATALOG)
         try:
             return self.playlists[playlist_id]
         except KeyError:
             # Si no se encuentra, lanzamos la excepción definida en el .ice
             logger.error(f"Playlist not found: {playlist_id}")
             raise Spotifice.PlaylistError(playlist_id, "Playlist not found")
+
+    def create_playlist(self, name, description, owner, current=None):
+        if not name:
+            raise Spotifice.PlaylistError(reason="Playlist name cannot be empty")
+
+        with self.playlists_lock:
+            base_id = re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-') or 'playlist'
+            playlist_id = base_id
+            while playlist_id in self.playlists:
+                playlist_id = f"{base_id}-{secrets.token_hex(2)}"
+
+            playlist = Spotifice.Playlist(
+                id=playlist_id,
+                name=name,
+                description=description,
+                owner=owner,
+                created_at=int(time.time()),
+                track_ids=[])
+
+            self.playlist_files[playlist_id] = self.new_playlist_file(playlist_id)
+            self.save_playlist(playlist)
+
+        logger.info(f"Playlist '{playlist_id}' created")
+        return playlist
+
+    def new_playlist_file(self, playlist_id):
+        """
+        Fichero para una playlist nueva. Los nombres de los ficheros que ya
+        hay no tienen por qué coincidir con sus ids (portal2-vol1.playlist
+        guarda 'Portal2-vol1'), así que se comprueba contra los ficheros
+        conocidos y el disco, y se añade un sufijo si está ocupado.
+        Se llama con playlists_lock tomado.
+        """
+        used = {path.name.lower() for path in self.playlist_files.values()}
+        path = self.playlists_dir / f"{playlist_id}.playlist"
+        suffix = 1
+        while path.name.lower() in used or path.exists():
+            suffix += 1
+            path = self.playlists_dir / f"{playlist_id}-{suffix}.playlist"
+        return path
+
+    def append_tracks(self, playlist_id, track_ids, current=None):
+        for track_id in track_ids:
+            self.ensure_track_exists(track_id)
+
+        with self.playlists_lock:
+            playlist = self.get_playlist(playlist_id)
+            self.save_playlist(playlist, playlist.track_ids + list(track_ids))
+
+    def remove_track(self, playlist_id, index, current=None):
+        with self.playlists_lock:
+            playlist = self.get_playlist(playlist_id)
+            track_ids = list(playlist.track_ids)
+            self.ensure_playlist_index(playlist, index)
+
+            del track_ids[index]
+            self.save_playlist(playlist, track_ids)
+
+    def move_track(self, playlist_id, from_index, to_index, current=None):
+        with self.playlists_lock:
+            playlist = self.get_playlist(playlist_id)
+            track_ids = list(playlist.track_ids)
+            self.ensure_playlist_index(playlist, from_index)
+            self.ensure_playlist_index(playlist, to_index)
+
+            track_ids.insert(to_index, track_ids.pop(from_index))
+            self.save_playlist(playlist, track_ids)
+
+    @staticmethod
+    def ensure_playlist_index(playlist, index):
+        if not 0 <= index < len(playlist.track_ids):
+            raise Spotifice.PlaylistError(playlist.id, f"Index out of range: {index}")
+
+    def save_playlist(self, playlist, track_ids=None):
+        """
+        Las playlists no se modifican en sitio: se sustituye el objeto entero,
+        de modo que quien ya tenga la versión anterior no ve cambios a medias.
+        Lo mismo con el diccionario, para que las lecturas no necesiten lock.
+        El guardado en disco lo hace PlaylistWriter sin bloquear la petición.
+        Se llama con playlists_lock tomado.
+        """
+        if track_ids is not None:
+            playlist = Spotifice.Playlist(
+                id=playlist.id,
+                name=playlist.name,
+                description=playlist.description,
+                owner=playlist.owner,
+                created_at=playlist.created_at,
+                track_ids=track_ids)
+
+        change = MODIFIED if playlist.id in self.playlists else ADDED
+        self.playlists = {**self.playlists, playlist.id: playlist}
+        self.catalog_log.record(PLAYLIST, playlist.id, change)
+        self.playlist_writer.schedule(self.playlist_files[playlist.id], playlist)
     # ------------------------------------------
 
+    # ---- CatalogSync ----
+    def get_catalog_version(self, current=None):
+        log = self.catalog_log
+        return Spotifice.CatalogVersion(log.epoch, log.version)
 
-def main(ic):
-    properties = ic.getProperties()
+    def get_changes_since(self, epoch, version, current=None):
+        """
+        Solo lo que cambió desde 'version'. Si el registro ya no llega tan
+        atrás (o la versión es de otro proceso) se pide recarga completa.
+        """
+        log = self.catalog_log
+        catalog_version, changes = log.changes_since(epoch, version)
+        result = Spotifice.CatalogChanges(
+            log.epoch, catalog_version, changes is None, [], [], [], [], [], [])
+        if changes is None:
+            logger.info("Catalog version %d is unknown, full resync", version,
+                        extra=CATALOG)
+            return result
+
+        playlists = self.playlists
+        for (kind, item_id), change in sorted(changes.items()):
+            if kind == TRACK:
+                item = self.tracks.get(item_id)
+                added, modified, removed = (
+                    result.tracks_added, result.tracks_modified, result.tracks_removed)
+            else:
+                item = playlists.get(item_id)
+                added, modified, removed = (result.playlists_added,
+                                            result.playlists_modified,
+                                            result.playlists_removed)
+
+            if change == REMOVED or item is None:
+                removed.append(item_id)
+            else:
+                (added if change == ADDED else modified).append(item)
+
+        logger.info("Serving %d catalog changes since %d", len(changes), version,
+                    extra=CATALOG)
+        return result
+    # ---------------------
+
+
+class WorkerPool:
+    """
+    Modo supervisor: N procesos worker, cada uno con su propio communicator,
+    su adaptador en el puerto base_port + i y su GIL. Todos cargan el mismo
+    snapshot del catálogo, de solo lectura. El supervisor sigue sirviendo
+    catálogo y playlists, y reparte las sesiones (el streaming) por turnos.
+    """
+    READY_TIMEOUT = 30
+
+    def __init__(self, ic, count, snapshot, base_port, host=None, supervisor=''):
+        self.ic = ic
+        self.count = count
+        # Proxy del supervisor, al que los workers piden las playlists
+        self.supervisor = supervisor
+        self.snapshot = snapshot
+        self.base_port = base_port
+        self.host = host
+        self.context = multiprocessing.get_context('spawn')
+        self.stop_event = self.context.Event()
+        self.processes = []
+        self.proxies = []
+        self.turn = itertools.count()
+
+    def worker_properties(self, index):
+        properties = self.ic.getProperties()
+        props = properties.getPropertiesForPrefix('')
+
+        endpoints = f"tcp -p {self.base_port + index}"
+        if self.host:
+            endpoints = f"tcp -h {self.host} -p {self.base_port + index}"
+
+        # Los topes del planificador se reparten entre los workers
+        for name in ('MaxStreams', 'MaxBandwidth'):
+            value = properties.getPropertyAsInt(f'MediaServer.Scheduler.{name}')
+            if value:
+                props[f'MediaServer.Scheduler.{name}'] = str(-(-value // self.count))
+
+        props.update({
+            'MediaServer.Workers': '0',
+            'MediaServer.Workers.Index': str(index),
+            'MediaServer.Workers.Supervisor': self.supervisor,
+            'MediaServer.Analysis.Run': '0',
+            'MediaServerWorkerAdapter.Endpoints': endpoints,
+        })
+
+        # El admin (faceta Profiler) de cada worker va en su propio puerto
+        admin_port = properties.getPropertyAsInt('MediaServer.Workers.AdminBasePort')
+        props['Ice.Admin.Endpoints'] = ''
+        if admin_port:
+            props['Ice.Admin.Endpoints'] = f"tcp -h 127.0.0.1 -p {admin_port + index}"
+            props['Ice.Admin.InstanceName'] = f"MediaServerWorker{index}"
+        return props
+
+    def start(self):
+        for index in range(self.count):
+            process = self.context.Process(
+                target=run_worker, name=f"MediaServerWorker{index}",
+                args=(self.worker_properties(index), index, str(self.snapshot),
+                      self.stop_event))
+            process.start()
+            self.processes.append(process)
+
+            proxy = self.ic.stringToProxy(
+                f"worker{index}:tcp -h 127.0.0.1 -p {self.base_port + index}")
+            self.proxies.append(Spotifice.MediaServerPrx.uncheckedCast(proxy))
+
+        for index, proxy in enumerate(self.proxies):
+            self.wait_ready(index, proxy)
+        logger.info(f"{self.count} workers ready")
+
+    def wait_ready(self, index, proxy):
+        deadline = time.monotonic() + self.READY_TIMEOUT
+        while True:
+            try:
+                proxy.ice_timeout(500).ice_ping()
+                return
+            except Ice.LocalException:
+                if not self.processes[index].is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError(f"Worker {index} failed to start")
+                time.sleep(0.1)
+
+    def authenticate(self, media_render, username, password):
+        """
+        Crea la sesión en el siguiente worker. Si un worker no responde se
+        prueba con el siguiente; los errores del contrato (credenciales,
+        render inalcanzable) se propagan tal cual. None si no queda ninguno.
+        """
+        first = next(self.turn)
+        for i in range(self.count):
+            index = (first + i) % self.count
+            try:
+                return self.proxies[index].authenticate(media_render, username, password)
+            except Ice.LocalException as e:
+                logger.error(f"Worker {index} unavailable: {e}")
+        return None
+
+    def resume(self, home, media_render, token):
+        """
+        Reanuda en el worker 'home', que es el que tiene la sesión; si no
+        responde, otro worker la recrea a partir del token.
+        """
+        for i in range(self.count):
+            index = (home + i) % self.count
+            try:
+                return self.proxies[index].resume(media_render, token)
+            except Ice.LocalException as e:
+                logger.error(f"Worker {index} unavailable: {e}")
+        return None
+
+    def shutdown(self):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                logger.warning(f"Killing worker {process.name}")
+                process.terminate()
+                process.join()
+
+
+def run_worker(props, index, snapshot, stop_event):
+    init_data = Ice.InitializationData()
+    init_data.properties = Ice.createProperties()
+    for key, value in props.items():
+        init_data.properties.setProperty(key, value)
+
+    try:
+        with Ice.initialize(init_data) as ic:
+            async_logging.configure(ic.getProperties(), f'server-worker{index}')
+            tracing.configure(ic.getProperties(), f'server-worker{index}')
+            profiler_admin.install(ic, f'server-worker{index}')
+            servant = create_servant(ic.getProperties(), snapshot)
+            supervisor = ic.getProperties().getProperty('MediaServer.Workers.Supervisor')
+            if supervisor:
+                servant.enable_supervisor_catalog(
+                    Spotifice.MediaServerPrx.uncheckedCast(ic.stringToProxy(supervisor)),
+                    ic.getProperties().getPropertyAsIntWithDefault(
+                        'MediaServer.Workers.CatalogRefresh', DEFAULT_REFRESH))
+            adapter = ic.createObjectAdapter("MediaServerWorkerAdapter")
+            proxy = adapter.add(servant, ic.stringToIdentity(f"worker{index}"))
+            logger.info(f"MediaServer worker {index}: {proxy}")
+
+            adapter.activate()
+            stop_event.wait()
+            servant.shutdown()
+    except KeyboardInterrupt:
+        pass
+
+
+def create_servant(properties, snapshot=None):
     media_dir = properties.getPropertyWithDefault(
         'MediaServer.Content', 'media')
 
@@ -331,16 +1257,120 @@ def main(ic):
         'MediaServer.UsersFile', 'users.json')
     
     # Pasamos ambos directorios al constructor
-    servant = MediaServerI(Path(media_dir), Path(playlists_dir), Path(users_file))
+    servant = MediaServerI(
+        Path(media_dir), Path(playlists_dir), Path(users_file),
+        properties.getProperty('MediaServer.HashCache') or None,
+        properties.getPropertyAsInt('MediaServer.ScanWorkers') or None,
+        properties.getPropertyAsIntWithDefault('MediaServer.ReadWindow', DEFAULT_WINDOW),
+        snapshot)
     # -------------------------
 
+    # Tamaño del registro de cambios del catálogo (antes de que empiecen a llegar)
+    servant.catalog_log = CatalogLog(properties.getPropertyAsIntWithDefault(
+        'MediaServer.Catalog.MaxChanges', DEFAULT_MAX_CHANGES))
+
+    # Caché de variantes transcodificadas (desactivada si no hay directorio).
+    # Solo el supervisor las genera; los workers se limitan a buscarlas.
+    variants_dir = properties.getProperty('MediaServer.Transcode.CacheDir')
+    if variants_dir:
+        bitrates = properties.getPropertyWithDefault(
+            'MediaServer.Transcode.Bitrates', '64,128,256')
+        servant.enable_variants(VariantCache(
+            Path(variants_dir),
+            [int(b) for b in bitrates.split(',')],
+            properties.getPropertyAsInt('MediaServer.Transcode.Workers')),
+            generate=snapshot is None)
+
+    # Análisis de duración y sonoridad (desactivado si no hay fichero)
+    analysis_file = properties.getProperty('MediaServer.Analysis.File')
+    if analysis_file:
+        servant.enable_analysis(
+            AnalysisStore(Path(analysis_file)),
+            properties.getPropertyAsIntWithDefault('MediaServer.Analysis.Run', 1) > 0,
+            properties.getPropertyAsInt('MediaServer.Analysis.Workers'))
+
+    # Carátulas (desactivadas si no hay directorio para las miniaturas)
+    artwork_dir = properties.getProperty('MediaServer.Artwork.CacheDir')
+    if artwork_dir:
+        sizes = properties.getProperty('MediaServer.Artwork.Sizes')
+        servant.artwork = ArtworkCache(
+            Path(media_dir), Path(artwork_dir),
+            [int(s) for s in sizes.split(',')] if sizes else DEFAULT_SIZES,
+            properties.getPropertyAsIntWithDefault(
+                'MediaServer.Artwork.MemoryBytes', DEFAULT_MEMORY_BYTES),
+            properties.getPropertyAsIntWithDefault(
+                'MediaServer.Artwork.DiskBytes', DEFAULT_DISK_BYTES),
+            properties.getPropertyAsIntWithDefault('MediaServer.Artwork.Workers', 1))
+
+    # Lectura directa de ficheros para renders del mismo host (desactivada)
+    servant.local_streams = properties.getPropertyAsInt('MediaServer.LocalStreams') > 0
+
+    # Precarga del principio de la pista siguiente (MaxBytes=0: desactivada)
+    heads_max_bytes = properties.getPropertyAsIntWithDefault(
+        'MediaServer.Prefetch.MaxBytes', DEFAULT_HEADS_MAX_BYTES)
+    if heads_max_bytes > 0:
+        servant.enable_prefetch(
+            HeadCache(properties.getPropertyAsIntWithDefault(
+                'MediaServer.Prefetch.HeadSize', DEFAULT_HEAD_SIZE), heads_max_bytes),
+            properties.getPropertyAsIntWithDefault(
+                'MediaServer.Prefetch.Ahead', DEFAULT_WARM_AHEAD))
+
+    # Tokens de reanudación firmados con un secreto común a los procesos
+    secret = properties.getProperty('MediaServer.Resume.Secret')
+    servant.tokens = TokenSigner(
+        secret or secrets.token_bytes(32),
+        properties.getPropertyAsIntWithDefault('MediaServer.Resume.TTL', DEFAULT_TTL))
+    servant.home = properties.getProperty('MediaServer.Workers.Index')
+
+    # Planificador de streaming (desactivado salvo que se pida)
+    if properties.getPropertyAsInt('MediaServer.Scheduler') > 0:
+        def option(name, default):
+            return float(properties.getPropertyWithDefault(
+                f'MediaServer.Scheduler.{name}', str(default)))
+
+        servant.scheduler = StreamScheduler(
+            properties.getPropertyAsInt('MediaServer.Scheduler.MaxStreams'),
+            properties.getPropertyAsInt('MediaServer.Scheduler.MaxBandwidth'),
+            option('Burst', 10), option('Speed', 2), option('PremiumSpeed', 4),
+            option('PremiumReserve', 0.2), option('QueueTimeout', 5),
+            option('IdleTimeout', DEFAULT_IDLE_TIMEOUT))
+
+    return servant
+
+
+def main(ic):
+    properties = ic.getProperties()
+    async_logging.configure(properties, 'server')
+    tracing.configure(properties, 'server')
+    profiler_admin.install(ic, 'server')
+
+    # Modo supervisor (desactivado si no se piden workers)
+    workers = properties.getPropertyAsInt('MediaServer.Workers')
+    if workers > 0 and not properties.getProperty('MediaServer.Resume.Secret'):
+        # Los workers heredan el secreto: los tokens valen en cualquiera
+        properties.setProperty('MediaServer.Resume.Secret', secrets.token_hex(32))
+
+    servant = create_servant(properties)
+    # El proxy se conoce antes de arrancar los workers, que lo necesitan
     adapter = ic.createObjectAdapter("MediaServerAdapter")
     proxy = adapter.add(servant, ic.stringToIdentity("mediaServer1"))
     logger.info(f"MediaServer: {proxy}")
 
+    if workers > 0:
+        snapshot = Path(properties.getPropertyWithDefault(
+            'MediaServer.Workers.Snapshot', 'cache/catalog.json'))
+        servant.save_snapshot(snapshot)
+        servant.workers = WorkerPool(
+            ic, workers, snapshot,
+            properties.getPropertyAsIntWithDefault('MediaServer.Workers.BasePort', 10100),
+            properties.getProperty('MediaServer.Workers.Host') or None,
+            ic.proxyToString(proxy))
+        servant.workers.start()
+
     adapter.activate()
     ic.waitForShutdown()
 
+    servant.shutdown()
     logger.info("Shutdown")
 
 
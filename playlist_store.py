@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from time import monotonic
+
+logger = logging.getLogger("PlaylistStore")
+
+CHUNK_SIZE = 64 * 1024
+WRITE_DELAY = 0.5
+
+_decoder = json.JSONDecoder()
+
+
+def parse_timestamp(value):
+    """
+    Convierte el 'created_at' de los ficheros (ISO 8601 o dd-mm-aaaa) al
+    timestamp 'long' del contrato. Las fechas sin zona se toman en UTC.
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not value:
+        return 0
+
+    for parse in (datetime.fromisoformat, lambda v: datetime.strptime(v, '%d-%m-%Y')):
+        try:
+            date = parse(value)
+        except ValueError:
+            continue
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return int(date.timestamp())
+
+    raise ValueError(f"Unknown date format: '{value}'")
+
+
+def format_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class _JsonReader:
+    """Lector JSON incremental: mantiene en memoria solo un trozo del fichero."""
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def accept(self, char):
+        if self.peek() != char:
+            return False
+        self.pos += 1
+        return True
+
+    def expect(self, char):
+        if not self.accept(char):
+            raise ValueError(f"Expected '{char}' in playlist file")
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+
+            # Un número al final del trozo podría continuar en el siguiente
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+
+            self.pos = end
+            return value
+
+
+def stream_playlist(path, chunk_size=CHUNK_SIZE):
+    """
+    Recorre un fichero .playlist sin cargarlo entero. Genera pares
+    (clave, valor) para los campos y ('track_id', id) para cada pista.
+    """
+    with open(path, 'r') as f:
+        reader = _JsonReader(f, chunk_size)
+        reader.expect('{')
+        if reader.accept('}'):
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(':')
+
+            if key == 'track_ids' and reader.accept('['):
+                if not reader.accept(']'):
+                    while True:
+                        yield 'track_id', reader.value()
+                        if not reader.accept(','):
+                            break
+                    reader.expect(']')
+            else:
+                yield key, reader.value()
+
+            if not reader.accept(','):
+                break
+        reader.expect('}')
+
+
+def write_playlist(path, playlist):
+    """Escritura atómica: fichero temporal en el mismo directorio + rename."""
+    data = {
+        'id': playlist.id,
+        'name': playlist.name,
+        'description': playlist.description,
+        'owner': playlist.owner,
+        'created_at': format_timestamp(playlist.created_at),
+        'track_ids': list(playlist.track_ids),
+    }
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class PlaylistWriter(threading.Thread):
+    """
+    Persistencia write-behind: las ediciones se aplican en memoria y aquí
+    solo se apunta qué playlist hay que guardar. Las ediciones que llegan
+    durante WRITE_DELAY se agrupan en una única escritura por fichero.
+    """
+    def __init__(self, delay=WRITE_DELAY):
+        super().__init__(name="PlaylistWriter", daemon=True)
+        self.delay = delay
+        self.pending = {}
+        self.writing = False
+        self.urgent = False
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def schedule(self, path, playlist):
+        with self.cond:
+            self.pending[path] = playlist
+            self.cond.notify_all()
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+
+                # Esperamos un poco para agrupar ráfagas de ediciones
+                deadline = monotonic() + self.delay
+                while not (self.closed or self.urgent):
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+
+                batch, self.pending = self.pending, {}
+                self.writing = True
+                self.urgent = False
+
+            for path, playlist in batch.items():
+                try:
+                    write_playlist(path, playlist)
+                except Exception as e:
+                    logger.error(f"Failed to save playlist '{playlist.id}': {e}")
+
+            with self.cond:
+                self.writing = False
+                self.cond.notify_all()
+
+    def flush(self, timeout=None):
+        with self.cond:
+            self.urgent = True
+            self.cond.notify_all()
+            return self.cond.wait_for(
+                lambda: not self.pending and not self.writing, timeout)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.join()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Controla la faceta 'Profiler' de un servidor o render en marcha.
+Uso:
+  profile_ctl.py <config> <propiedad-proxy> start [intervalo-ms]
+  profile_ctl.py <config> <propiedad-proxy> stop
+  profile_ctl.py <config> <propiedad-proxy> mem-start [frames]
+  profile_ctl.py <config> <propiedad-proxy> mem-snapshot
+  profile_ctl.py <config> <propiedad-proxy> mem-stop
+  profile_ctl.py mem-diff <antes.tracemalloc> <después.tracemalloc> [sesiones]
+
+mem-diff compara dos snapshots; tomados antes y después de abrir N sesiones,
+da la memoria retenida por sesión.
+"""
+
+import sys
+import tracemalloc
+
+TOP_STATS = 20
+
+
+def mem_diff(before, after, sessions=1):
+    old = tracemalloc.Snapshot.load(before)
+    new = tracemalloc.Snapshot.load(after)
+    stats = new.compare_to(old, 'lineno')
+
+    total = sum(stat.size_diff for stat in stats)
+    print(f"Total: {total / 1024:+.1f} KiB "
+          f"({total / sessions / 1024:+.1f} KiB per session)")
+    for stat in stats[:TOP_STATS]:
+        print(stat)
+
+
+def main(config, property, command, arg=None):
+    import Ice
+
+    from slice_loader import load_slice
+
+    load_slice()
+    import Spotifice  # type: ignore
+
+    with Ice.initialize(config) as ic:
+        profiler = Spotifice.ProfilerPrx.checkedCast(ic.propertyToProxy(property))
+        try:
+            match command:
+                case 'start':
+                    profiler.start_sampling(int(arg or 0))
+                case 'stop':
+                    print(profiler.stop_sampling())
+                case 'mem-start':
+                    profiler.start_memory_tracing(int(arg or 0))
+                case 'mem-snapshot':
+                    print(profiler.take_memory_snapshot())
+                case 'mem-stop':
+                    profiler.stop_memory_tracing()
+                case _:
+                    sys.exit(__doc__)
+        except Spotifice.ProfilerError as e:
+            sys.exit(f"Error: {e.reason}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == 'mem-diff':
+        mem_diff(sys.argv[2], sys.argv[3], int(sys.argv[4]) if len(sys.argv) > 4 else 1)
+    elif len(sys.argv) >= 4:
+        main(*sys.argv[1:5])
+    else:
+        sys.exit(__doc__)
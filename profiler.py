@@ -0,0 +1,135 @@
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger("Profiler")
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_FRAMES = 10
+TOP_STATS = 30
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Perfilador por muestreo de TODOS los hilos del proceso: cada 'interval'
+    segundos toma la pila de cada hilo con sys._current_frames. Incluye los
+    hilos que no crea Python, como el de streaming de GStreamer mientras
+    ejecuta on_need_data. El coste no depende de cuánto código se ejecute.
+    """
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        super().__init__(name="SamplingProfiler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                location = f"{Path(code.co_filename).name}:{frame.f_lineno}"
+                stack.append(f"{code.co_name} ({location})")
+                frame = frame.f_back
+
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write_collapsed(self, path):
+        """Formato 'collapsed stack' (flamegraph.pl, speedscope...)."""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiling:
+    """
+    Estado del perfilado de un proceso en marcha: un perfil de CPU por
+    muestreo y el trazado de memoria de tracemalloc, cada uno activable y
+    desactivable por separado. Los resultados se escriben en 'output_dir'.
+    """
+    def __init__(self, output_dir, service):
+        self.output_dir = Path(output_dir)
+        self.service = service
+        self.sampler: SamplingProfiler = None
+        self.lock = threading.Lock()
+
+    def output_path(self, suffix):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return self.output_dir / f"{self.service}-{stamp}.{suffix}"
+
+    def start_sampling(self, interval=0):
+        interval = interval or DEFAULT_INTERVAL
+        with self.lock:
+            if self.sampler:
+                raise RuntimeError("Sampling profiler already running")
+            self.sampler = SamplingProfiler(interval)
+            self.sampler.start()
+
+        logger.info(f"Sampling profiler started ({interval * 1000:.1f} ms)")
+
+    def stop_sampling(self):
+        with self.lock:
+            sampler, self.sampler = self.sampler, None
+        if not sampler:
+            raise RuntimeError("Sampling profiler not running")
+
+        sampler.stop()
+        path = self.output_path('collapsed')
+        sampler.write_collapsed(path)
+        logger.info(f"Profile written to '{path}' ({sampler.samples} samples)")
+        return path
+
+    def start_memory_tracing(self, frames=0):
+        frames = frames or DEFAULT_FRAMES
+        if tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing already running")
+        tracemalloc.start(frames)
+        logger.info(f"Memory tracing started ({frames} frames)")
+
+    def take_memory_snapshot(self):
+        """
+        Vuelca el snapshot completo (para tracemalloc.Snapshot.load) y, al
+        lado, un resumen legible de las líneas que más memoria retienen.
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing not running")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        path = self.output_path('tracemalloc')
+        snapshot.dump(str(path))
+
+        stats = snapshot.statistics('lineno')
+        with open(path.with_suffix('.txt'), 'w') as f:
+            total = sum(stat.size for stat in stats)
+            f.write(f"Total traced: {total / 1024:.1f} KiB\n")
+            for stat in stats[:TOP_STATS]:
+                f.write(f"{stat}\n")
+
+        logger.info(f"Memory snapshot written to '{path}'")
+        return path
+
+    def stop_memory_tracing(self):
+        tracemalloc.stop()
+        logger.info("Memory tracing stopped")
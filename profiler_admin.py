@@ -0,0 +1,51 @@
+import logging
+
+from profiler import Profiling
+from slice_loader import load_slice
+
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
+import Spotifice  # type: ignore # noqa: E402
+
+logger = logging.getLogger("Profiler")
+
+FACET = "Profiler"
+
+
+class ProfilerI(Spotifice.Profiler):
+    """Faceta de administración para perfilar el proceso en caliente."""
+    def __init__(self, profiling):
+        self.profiling = profiling
+
+    def start_sampling(self, interval_ms, current=None):
+        self.call(self.profiling.start_sampling, max(interval_ms, 0) / 1000)
+
+    def stop_sampling(self, current=None):
+        return str(self.call(self.profiling.stop_sampling).resolve())
+
+    def start_memory_tracing(self, frames, current=None):
+        self.call(self.profiling.start_memory_tracing, max(frames, 0))
+
+    def take_memory_snapshot(self, current=None):
+        return str(self.call(self.profiling.take_memory_snapshot).resolve())
+
+    def stop_memory_tracing(self, current=None):
+        self.profiling.stop_memory_tracing()
+
+    @staticmethod
+    def call(operation, *args):
+        try:
+            return operation(*args)
+        except (RuntimeError, OSError) as e:
+            raise Spotifice.ProfilerError(reason=str(e))
+
+
+def install(ic, service):
+    """
+    Registra la faceta 'Profiler' en el objeto admin del communicator. Solo
+    es accesible si está activado (Ice.Admin.Endpoints, o IceGrid, que lo
+    activa en los servidores que despliega).
+    """
+    properties = ic.getProperties()
+    output_dir = properties.getPropertyWithDefault('Profiler.Dir', 'cache/profiles')
+    ic.addAdminFacet(ProfilerI(Profiling(output_dir, service)), FACET)
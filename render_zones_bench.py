@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Memoria residente de N zonas de render en reposo: un proceso por zona
+frente a un solo proceso con MediaRender.Zones=N.
+Uso: render_zones_bench.py [zonas]
+"""
+
+import subprocess
+import sys
+import time
+
+import Ice
+
+BASE_PORT = 10400
+
+
+def rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def start_render(ic, port, zones):
+    process = subprocess.Popen([
+        sys.executable, 'media_render.py',
+        f'--MediaRenderAdapter.Endpoints=tcp -h 127.0.0.1 -p {port}',
+        f'--MediaRender.Zones={zones}',
+        '--Logging.Async=0'], stderr=subprocess.DEVNULL)
+
+    proxy = ic.stringToProxy(f'mediaRender{zones}:tcp -h 127.0.0.1 -p {port}')
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            proxy.ice_ping()
+            return process
+        except Ice.LocalException:
+            if time.monotonic() > deadline:
+                process.kill()
+                raise
+            time.sleep(0.2)
+
+
+def measure(ic, layout):
+    processes = [start_render(ic, BASE_PORT + i, zones) for i, zones in enumerate(layout)]
+    try:
+        return sum(rss_kb(p.pid) for p in processes)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def main(zones):
+    with Ice.initialize() as ic:
+        separate = measure(ic, [1] * zones)
+        hosted = measure(ic, [zones])
+
+    print(f"{zones} zonas en reposo")
+    print(f"{'layout':<20}{'RSS MiB':>10}{'MiB/zone':>10}")
+    for label, kb in (('process per zone', separate), ('one host process', hosted)):
+        print(f"{label:<20}{kb / 1024:>10.1f}{kb / 1024 / zones:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
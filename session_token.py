@@ -0,0 +1,59 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+DEFAULT_TTL = 3600
+
+
+class TokenError(Exception):
+    pass
+
+
+def b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class TokenSigner:
+    """
+    Tokens de reanudación de sesión: 'datos.firma', con los datos en JSON y
+    una firma HMAC-SHA256 con el secreto del servidor. Verificarlo no toca
+    el fichero de usuarios ni recalcula el hash de la contraseña; basta con
+    que todos los procesos que lo aceptan compartan el secreto.
+    """
+    def __init__(self, secret, ttl=DEFAULT_TTL):
+        self.key = secret.encode() if isinstance(secret, str) else secret
+        self.ttl = ttl
+
+    def sign(self, data):
+        return b64encode(hmac.new(self.key, data, hashlib.sha256).digest())
+
+    def issue(self, username, session_id, home='', now=None):
+        expires = int((now or time.time()) + self.ttl)
+        data = json.dumps(
+            {'user': username, 'session': session_id, 'home': home, 'exp': expires},
+            separators=(',', ':')).encode()
+        return f"{b64encode(data)}.{self.sign(data)}"
+
+    def verify(self, token, now=None):
+        """Devuelve los datos del token, o TokenError si no es válido."""
+        try:
+            encoded, signature = token.split('.')
+            data = b64decode(encoded)
+            # En bytes: compare_digest no admite cadenas con caracteres no ASCII
+            signature = signature.encode('ascii')
+        except ValueError:
+            raise TokenError("Malformed token")
+
+        if not hmac.compare_digest(signature, self.sign(data).encode()):
+            raise TokenError("Bad signature")
+
+        claims = json.loads(data)
+        if claims['exp'] < (now or time.time()):
+            raise TokenError("Expired token")
+        return claims
@@ -0,0 +1,227 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("SharedReader")
+
+DEFAULT_WINDOW = 1024 * 1024
+REGION_SIZE = 64 * 1024
+DEFAULT_HEAD_SIZE = 256 * 1024
+DEFAULT_HEADS_MAX_BYTES = 16 * 1024 * 1024
+
+
+class SharedReader:
+    """
+    Un único descriptor por fichero, compartido por todas las sesiones que lo
+    están sirviendo. Los últimos 'window' bytes leídos se guardan en memoria:
+    la sesión que va en cabeza lee del disco cada región una sola vez y las
+    que van detrás dentro de la ventana la toman del buffer. Las que se han
+    quedado más atrás leen con os.pread, sin mover la posición de nadie.
+    """
+    def __init__(self, pool, key, path, head=b''):
+        self.pool = pool
+        self.key = key
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        # El principio del fichero puede venir ya precargado (HeadCache)
+        self.buffer = bytearray(head)
+        self.base = 0  # offset del primer byte del buffer
+        self.followers = 0
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+
+    @property
+    def end(self):
+        return self.base + len(self.buffer)
+
+    def read_at(self, offset, size):
+        with self.lock:
+            if self.base <= offset <= self.end:
+                if offset + size > self.end:
+                    self.fill(offset + size - self.end, offset)
+
+                start = offset - self.base
+                return bytes(self.buffer[start:start + size])
+
+        # Fuera de la ventana: lectura directa sin tocar el buffer
+        data = os.pread(self.fd, size, offset)
+        with self.lock:
+            self.disk_bytes += len(data)
+        return data
+
+    def fill(self, needed, keep_from):
+        data = os.pread(self.fd, max(needed, REGION_SIZE), self.end)
+        self.disk_bytes += len(data)
+        self.buffer += data
+
+        # Nunca se descarta lo que está a partir de 'keep_from' (la lectura
+        # en curso), aunque el buffer pase momentáneamente de la ventana
+        excess = min(len(self.buffer) - self.pool.window, keep_from - self.base)
+        if excess > 0:
+            del self.buffer[:excess]
+            self.base += excess
+
+    def close(self):
+        os.close(self.fd)
+        self.buffer = bytearray()
+
+    def __repr__(self):
+        return f"<SharedReader '{self.path.name}' followers={self.followers}>"
+
+
+class Follower:
+    """Posición de lectura de una sesión sobre un SharedReader."""
+    def __init__(self, reader):
+        self.reader = reader
+        self.offset = 0
+
+    def read(self, size):
+        data = self.reader.read_at(self.offset, size)
+        self.offset += len(data)
+        return data
+
+    def seek(self, offset):
+        self.offset = offset
+
+    def close(self):
+        if self.reader:
+            self.reader.pool.detach(self.reader)
+            self.reader = None
+
+
+class HeadCache:
+    """
+    Principio (los primeros 'head_size' bytes) de las pistas que se espera
+    que suenen a continuación, leído en segundo plano antes de que nadie
+    las abra. La memoria total no pasa de 'max_bytes': se descartan las
+    cabeceras más antiguas. Al abrir la pista la cabecera pasa al
+    SharedReader y sale de aquí.
+    """
+    def __init__(self, head_size=DEFAULT_HEAD_SIZE, max_bytes=DEFAULT_HEADS_MAX_BYTES,
+                 readahead=DEFAULT_WINDOW):
+        self.head_size = head_size
+        self.max_bytes = max_bytes
+        self.readahead = readahead
+        self.heads = OrderedDict()
+        self.size = 0
+        self.loading = set()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(st):
+        return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+    def load(self, path):
+        st = os.stat(path)
+        key = self.key(st)
+        with self.lock:
+            if key in self.heads or key in self.loading:
+                return
+            self.loading.add(key)
+
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                head = os.pread(fd, self.head_size, 0)
+                # Lo que sigue a la cabecera, que lo vaya trayendo el kernel
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(fd, len(head), self.readahead,
+                                     os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        finally:
+            with self.lock:
+                self.loading.discard(key)
+
+        with self.lock:
+            self.heads[key] = head
+            self.size += len(head)
+            while self.size > self.max_bytes:
+                _, old = self.heads.popitem(last=False)
+                self.size -= len(old)
+        logger.info(f"Warmed head of '{path.name}' ({len(head)} bytes)")
+
+    def take(self, st):
+        with self.lock:
+            head = self.heads.pop(self.key(st), b'')
+            self.size -= len(head)
+        return head
+
+
+class SharedReaderPool:
+    """
+    Reparte los SharedReader por fichero. Dos sesiones comparten lector si
+    abren el mismo fichero (mismo dispositivo e inodo), de modo que las
+    lecturas de disco y la memoria dependen de las pistas distintas que se
+    están sirviendo y no del número de oyentes.
+    """
+    def __init__(self, window=DEFAULT_WINDOW, heads: HeadCache = None):
+        self.window = window
+        self.readers = {}
+        self.lock = threading.Lock()
+        # Precarga de la pista siguiente (opcional, ver warm)
+        self.heads = heads
+        self.warmer = None
+        if heads:
+            self.warmer = ThreadPoolExecutor(1, thread_name_prefix="HeadWarmer")
+
+    def warm(self, path):
+        """Lee en segundo plano el principio de 'path' si aún no está abierto."""
+        if not self.heads:
+            return
+        self.warmer.submit(self.warm_head, path)
+
+    def warm_predicted(self, locate):
+        """
+        Como warm, pero la ruta la calcula 'locate' ya en el hilo de precarga,
+        porque averiguarla puede bloquear. Si devuelve None no se precarga nada.
+        """
+        if not self.heads:
+            return
+        self.warmer.submit(self.warm_located, locate)
+
+    def warm_located(self, locate):
+        path = locate()
+        if path is not None:
+            self.warm_head(path)
+
+    def warm_head(self, path):
+        try:
+            st = os.stat(path)
+            with self.lock:
+                if (st.st_dev, st.st_ino) in self.readers:
+                    return
+            self.heads.load(path)
+        except OSError as e:
+            logger.warning(f"Could not warm '{path}': {e}")
+
+    def attach(self, path):
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino)
+
+        with self.lock:
+            reader = self.readers.get(key)
+            if reader is None:
+                head = self.heads.take(st) if self.heads else b''
+                reader = self.readers[key] = SharedReader(self, key, path, head)
+                logger.info(f"Shared reader opened for '{path.name}' "
+                            f"({len(head)} bytes already in memory)")
+            reader.followers += 1
+
+        return Follower(reader)
+
+    def shutdown(self):
+        if self.warmer:
+            self.warmer.shutdown(wait=False, cancel_futures=True)
+
+    def detach(self, reader):
+        with self.lock:
+            reader.followers -= 1
+            if reader.followers > 0:
+                return
+            del self.readers[reader.key]
+
+        reader.close()
+        logger.info(f"Shared reader closed for '{reader.path.name}'")
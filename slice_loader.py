@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import Ice
+
+logger = logging.getLogger("SliceLoader")
+
+BASE_DIR = Path(__file__).resolve().parent
+SLICE_FILE = 'spotifice_v4.ice'
+CACHE_DIR = BASE_DIR / '.slice_cache'
+
+
+def slice_hash(ice_file):
+    """Cambia si cambia el contrato o la versión de Ice que lo compila."""
+    digest = hashlib.sha256(ice_file.read_bytes())
+    digest.update(Ice.stringVersion().encode())
+    return digest.hexdigest()[:16]
+
+
+def compile_slice(ice_file, output_dir):
+    args = ['slice2py', f'-I{Ice.getSliceDir()}', '--output-dir', str(output_dir),
+            str(ice_file)]
+
+    # El paquete de Ice de pip trae el compilador dentro de IcePy
+    import IcePy
+    if hasattr(IcePy, 'compile'):
+        return IcePy.compile(args) == 0
+
+    try:
+        return subprocess.run(args).returncode == 0
+    except FileNotFoundError:
+        return False
+
+
+def build_cache(ice_file, target):
+    CACHE_DIR.mkdir(exist_ok=True)
+    build_dir = Path(tempfile.mkdtemp(dir=CACHE_DIR))
+    try:
+        if not compile_slice(ice_file, build_dir):
+            return False
+
+        # Otro proceso puede haber ganado la carrera: nos quedamos con el suyo
+        try:
+            os.rename(build_dir, target)
+        except OSError:
+            pass
+        return target.is_dir()
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def prune_cache(ice_file, target):
+    """Borra el código generado para versiones anteriores del mismo contrato."""
+    for path in CACHE_DIR.glob(f"{ice_file.stem}-*"):
+        if path != target and path.is_dir():
+            logger.info(f"Removing stale generated Slice code '{path.name}'")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_slice(ice_file=SLICE_FILE):
+    """
+    Deja importable el módulo 'Spotifice' del contrato 'ice_file'.
+    Usa el código generado por slice2py guardado en .slice_cache (indexado
+    por hash del .ice) y solo compila en el arranque si no existe todavía.
+    """
+    if 'Spotifice' in sys.modules:
+        return
+
+    ice_file = BASE_DIR / ice_file
+    if os.environ.get('SPOTIFICE_SLICE_CACHE', '1') != '0':
+        target = CACHE_DIR / f"{ice_file.stem}-{slice_hash(ice_file)}"
+        try:
+            if target.is_dir():
+                sys.path.insert(0, str(target))
+                return
+            if build_cache(ice_file, target):
+                prune_cache(ice_file, target)
+                sys.path.insert(0, str(target))
+                return
+        except Exception as e:
+            logger.warning(f"Could not cache generated Slice code: {e}")
+
+    Ice.loadSlice('-I{} {}'.format(Ice.getSliceDir(), ice_file))
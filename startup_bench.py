@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Mide el arranque en frío de los módulos (lo que paga la primera petición con
+activación on-demand en IceGrid): compilando el .ice en cada arranque frente
+a cargar el código generado en .slice_cache.
+Uso: startup_bench.py [repeticiones]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+MODULES = ['media_server', 'media_render', 'media_control']
+
+
+def measure(module, env, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'],
+                       cwd=BASE_DIR, env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(runs):
+    compile_env = dict(os.environ, SPOTIFICE_SLICE_CACHE='0')
+    cached_env = dict(os.environ, SPOTIFICE_SLICE_CACHE='1')
+
+    # Primer import con caché: genera .slice_cache si no existe
+    subprocess.run([sys.executable, '-c', 'import media_server'],
+                   cwd=BASE_DIR, env=cached_env, check=True)
+
+    print(f"{'module':<16}{'loadSlice':>12}{'cached':>12}")
+    for module in MODULES:
+        before = measure(module, compile_env, runs)
+        after = measure(module, cached_env, runs)
+        print(f"{module:<16}{before * 1000:>10.0f}ms{after * 1000:>10.0f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
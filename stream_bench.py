@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Mide el caudal de streaming agregado del servidor: N clientes, cada uno en
+su propio proceso para que el cliente no sea el cuello de botella, leen la
+misma pista en bucle durante unos segundos. Sirve para comparar el servidor
+con un solo proceso frente al modo supervisor (MediaServer.Workers).
+Uso: stream_bench.py <config-cliente> [clientes] [segundos]
+"""
+
+import multiprocessing
+import sys
+import time
+
+import Ice
+
+from slice_loader import load_slice
+
+load_slice()
+import Spotifice  # type: ignore # noqa: E402
+
+USERNAME = "user"
+PASSWORD = "secret"
+CHUNK_SIZE = 64 * 1024
+
+
+def client(config, seconds):
+    with Ice.initialize(config) as ic:
+        proxy = ic.propertyToProxy('MediaServer.Proxy')
+        server = Spotifice.MediaServerPrx.checkedCast(proxy)
+        # El propio servidor hace de "render" para el ping de authenticate
+        render = Spotifice.MediaRenderPrx.uncheckedCast(server)
+        session = server.authenticate(render, USERNAME, PASSWORD)
+        track_id = max(server.get_all_tracks(), key=lambda t: t.id).id
+
+        total = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            session.open_stream(track_id, Spotifice.StreamQuality.ORIGINAL)
+            while time.monotonic() < deadline:
+                chunk = session.get_audio_chunk(CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+
+        session.close()
+        return total
+
+
+def main(config, clients, seconds):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(clients) as pool:
+        start = time.monotonic()
+        totals = pool.starmap(client, [(config, seconds)] * clients)
+        elapsed = time.monotonic() - start
+
+    print(f"{clients} clientes: {sum(totals) / elapsed / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: stream_bench.py <client-config> [clients] [seconds]")
+
+    main(sys.argv[1],
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+         float(sys.argv[3]) if len(sys.argv) > 3 else 10)
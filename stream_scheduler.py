@@ -0,0 +1,272 @@
+import heapq
+import itertools
+import logging
+import threading
+from time import monotonic
+
+logger = logging.getLogger("StreamScheduler")
+
+DEFAULT_BITRATE = 320_000
+# Segundos sin pedir audio tras los que un stream pierde su plaza
+DEFAULT_IDLE_TIMEOUT = 300.0
+# Motivo del StreamError de un stream cerrado por inactividad: el render
+# lo reabre en el mismo punto en lugar de dar la pista por terminada
+IDLE_EXPIRED = "Stream expired after inactivity"
+
+STANDARD = 1
+PREMIUM = 0  # menor valor = mayor prioridad en la cola de admisión
+
+# Bitrates (kbps) de la cabecera MP3 por (versión MPEG, capa)
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_BITRATES[(2, 3)] = _MP3_BITRATES[(2, 2)]
+
+
+def mp3_bitrate(path, scan_bytes=64 * 1024):
+    """Bitrate (bits/s) de la primera trama MP3 del fichero, o None."""
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        offset = 0
+        if len(head) == 10 and head[:3] == b'ID3':
+            # Tamaño 'syncsafe' de la etiqueta ID3v2 (7 bits por byte)
+            size = 0
+            for byte in head[6:10]:
+                size = (size << 7) | (byte & 0x7f)
+            offset = 10 + size + (10 if head[5] & 0x10 else 0)
+        f.seek(offset)
+        data = f.read(scan_bytes)
+
+    for i in range(len(data) - 2):
+        if data[i] != 0xff or data[i + 1] & 0xe0 != 0xe0:
+            continue
+
+        version_bits = (data[i + 1] >> 3) & 3
+        layer_bits = (data[i + 1] >> 1) & 3
+        index = data[i + 2] >> 4
+        if version_bits == 1 or layer_bits == 0 or index in (0, 15):
+            continue
+
+        version = 1 if version_bits == 3 else 2
+        return _MP3_BITRATES[(version, 4 - layer_bits)][index] * 1000
+
+    return None
+
+
+class TokenBucket:
+    """
+    'rate' bytes por segundo con una ráfaga de hasta 'burst' bytes. Cada
+    entrega descuenta sus bytes aunque deje el saldo en negativo; la deuda
+    es el tiempo que hay que retrasarla.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, size):
+        """Descuenta 'size' bytes y devuelve los segundos de espera."""
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= size
+            return max(0.0, -self.tokens / self.rate)
+
+
+class DelayQueue(threading.Thread):
+    """Un único hilo que ejecuta las llamadas diferidas cuando vencen."""
+    def __init__(self):
+        super().__init__(name="DelayQueue", daemon=True)
+        self.heap = []
+        self.counter = itertools.count()
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def call_later(self, delay, fn, *args):
+        with self.cond:
+            heapq.heappush(self.heap, (monotonic() + delay, next(self.counter), fn, args))
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.closed:
+                    if self.heap:
+                        remaining = self.heap[0][0] - monotonic()
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+                    else:
+                        self.cond.wait()
+                if self.closed:
+                    return
+                _, _, fn, args = heapq.heappop(self.heap)
+
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"Delayed call failed: {e}")
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.join()
+
+
+class Ticket:
+    """Stream admitido: su clase, el ritmo reservado y su cubo de tokens."""
+    def __init__(self, scheduler, priority, rate, burst):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.rate = rate
+        self.bucket = TokenBucket(rate, burst)
+        self.last_used = monotonic()
+        # Qué hacer si se queda inactivo (por defecto, solo liberar la plaza)
+        self.on_idle = None
+
+    def consume(self, size):
+        self.last_used = monotonic()
+        return self.bucket.consume(size)
+
+    def release(self):
+        if self.scheduler:
+            self.scheduler.release(self)
+            self.scheduler = None
+
+
+class StreamScheduler:
+    """
+    Reparto justo del ancho de banda entre streams. Cada stream avanza como
+    mucho a 'speed' veces el bitrate real de su pista, más una ráfaga inicial
+    de 'burst' segundos de audio. Los topes globales de streams y de ancho de
+    banda deciden la admisión: lo que no cabe espera en cola por prioridad
+    hasta 'queue_timeout' segundos. Una fracción 'premium_reserve' de la
+    capacidad queda reservada a los usuarios premium, que además avanzan a
+    'premium_speed'. Un stream que pasa 'idle_timeout' segundos sin pedir
+    audio (cliente caído o desconectado) pierde su plaza.
+    """
+    def __init__(self, max_streams=0, max_bandwidth=0, burst=10.0, speed=2.0,
+                 premium_speed=4.0, premium_reserve=0.2, queue_timeout=5.0,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.max_streams = max_streams
+        self.max_bandwidth = max_bandwidth
+        self.burst = burst
+        self.speeds = {STANDARD: speed, PREMIUM: premium_speed}
+        self.premium_reserve = premium_reserve
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+
+        self.active = set()
+        self.bandwidth = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+        self.delays = DelayQueue()
+        self.delays.start()
+
+    def shutdown(self):
+        self.delays.close()
+
+    def limit(self, value, priority):
+        if not value or priority == PREMIUM:
+            return value
+        return value * (1 - self.premium_reserve)
+
+    def fits(self, priority, rate):
+        if not self.active:
+            return True
+
+        max_streams = self.limit(self.max_streams, priority)
+        if max_streams and len(self.active) + 1 > max_streams:
+            return False
+
+        max_bandwidth = self.limit(self.max_bandwidth, priority)
+        return not max_bandwidth or self.bandwidth + rate <= max_bandwidth
+
+    def admit(self, premium, bitrate, on_admit, on_reject):
+        """
+        Pide plaza para un stream de 'bitrate' bits/s. Se llama a
+        on_admit(ticket) en cuanto la hay, o a on_reject(reason) si no llega
+        antes de 'queue_timeout'. Ambas pueden ejecutarse en este mismo hilo.
+        """
+        priority = PREMIUM if premium else STANDARD
+        rate = bitrate / 8 * self.speeds[priority]
+        ticket = Ticket(self, priority, rate, bitrate / 8 * self.burst)
+
+        with self.lock:
+            ahead = any(entry[0] <= priority for entry in self.waiting)
+            if not ahead and self.fits(priority, rate):
+                self.grant(ticket)
+                admitted = True
+            elif self.queue_timeout <= 0:
+                admitted = False
+            else:
+                entry = [priority, next(self.counter), ticket, on_admit, on_reject]
+                heapq.heappush(self.waiting, entry)
+                self.delays.call_later(self.queue_timeout, self.expire, entry)
+                logger.info(f"Stream queued ({len(self.waiting)} waiting)")
+                return
+
+        if admitted:
+            on_admit(ticket)
+        else:
+            on_reject("Server busy")
+
+    def grant(self, ticket):
+        self.active.add(ticket)
+        self.bandwidth += ticket.rate
+        ticket.last_used = monotonic()
+        if self.idle_timeout > 0:
+            self.delays.call_later(self.idle_timeout, self.check_idle, ticket)
+
+    def check_idle(self, ticket):
+        if ticket.scheduler is None:
+            return  # ya liberado
+        idle = monotonic() - ticket.last_used
+        if idle < self.idle_timeout:
+            self.delays.call_later(self.idle_timeout - idle, self.check_idle, ticket)
+            return
+
+        logger.warning(f"Stream idle for {idle:.0f} s, releasing its slot")
+        (ticket.on_idle or ticket.release)()
+
+    def release(self, ticket):
+        with self.lock:
+            if ticket not in self.active:
+                return
+            self.active.discard(ticket)
+            self.bandwidth -= ticket.rate
+
+            # Se admite por orden de prioridad y llegada, sin adelantamientos
+            admitted = []
+            while self.waiting:
+                _, _, waiting, on_admit, _ = self.waiting[0]
+                if not self.fits(waiting.priority, waiting.rate):
+                    break
+                entry = heapq.heappop(self.waiting)
+                entry[4] = None  # ya no puede expirar
+                self.grant(waiting)
+                admitted.append((on_admit, waiting))
+
+        for on_admit, waiting in admitted:
+            on_admit(waiting)
+
+    def expire(self, entry):
+        with self.lock:
+            on_reject = entry[4]
+            if on_reject is None:
+                return
+            self.waiting.remove(entry)
+            heapq.heapify(self.waiting)
+
+        logger.warning("Stream rejected: queue timeout")
+        on_reject("Server busy")
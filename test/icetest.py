@@ -47,11 +47,15 @@ class IceTestCase(TestCase):
         thread = Thread(target=main, args=args)
         thread.start()
         self.addCleanup(self.server_shutdown, ic, thread)
+        return ic, thread
 
     @staticmethod
     def server_shutdown(ic, thread):
-        ic.shutdown()
-        ic.destroy()
+        try:
+            ic.shutdown()
+            ic.destroy()
+        except Ice.CommunicatorDestroyedException:
+            pass  # el test ya lo paró
 
         thread.join(3)
         if thread.is_alive():
@@ -0,0 +1,42 @@
+"""Ficheros de prueba generados: imágenes PNG y MP3 con carátula ID3."""
+import struct
+import zlib
+from pathlib import Path
+
+from artwork import syncsafe as read_syncsafe
+
+
+def png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def make_png(width, height):
+    """PNG RGB de width x height, sin más dependencias que zlib."""
+    row = b'\0' + bytes((x * 7) % 256 for x in range(3 * width))
+    return (b'\x89PNG\r\n\x1a\n'
+            + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + png_chunk(b'IDAT', zlib.compress(row * height))
+            + png_chunk(b'IEND', b''))
+
+
+def syncsafe(value):
+    return bytes((value >> shift) & 0x7f for shift in (21, 14, 7, 0))
+
+
+def apic(picture, picture_type=3, version=3):
+    body = b'\0image/png\0' + bytes([picture_type]) + b'cover\0' + picture
+    size = syncsafe(len(body)) if version == 4 else struct.pack('>I', len(body))
+    return b'APIC' + size + b'\0\0' + body
+
+
+def id3_tag(frames, version=3):
+    data = b''.join(frames)
+    return b'ID3' + bytes([version, 0, 0]) + syncsafe(len(data)) + data
+
+
+def with_picture(path, picture, version=3):
+    """Copia de test/media/1s.mp3 con 'picture' incrustada en un tag ID3."""
+    audio = Path('test/media/1s.mp3').read_bytes()
+    audio = audio[10 + read_syncsafe(audio[6:10]):]
+    path.write_bytes(id3_tag([apic(picture, version=version)], version) + audio)
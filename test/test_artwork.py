@@ -0,0 +1,203 @@
+import os
+import shutil
+import struct
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+from artwork import (
+    ArtworkCache,
+    DiskCache,
+    MemoryCache,
+    fit,
+    image_info,
+    read_embedded_picture,
+    variant_version,
+)
+
+from .media_files import apic, id3_tag, make_png, with_picture
+
+
+def fake_resize(data, width, height):
+    return f'{width}x{height}'.encode()
+
+
+class ID3PictureTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'track.mp3'
+
+    def test_v23_picture(self):
+        with_picture(self.path, b'picture')
+        self.assertEqual(read_embedded_picture(self.path), b'picture')
+
+    def test_v24_picture(self):
+        with_picture(self.path, b'picture', version=4)
+        self.assertEqual(read_embedded_picture(self.path), b'picture')
+
+    def test_v22_picture(self):
+        body = b'\0PNG\x03cover\0picture'
+        frame = b'PIC' + len(body).to_bytes(3, 'big') + body
+        self.path.write_bytes(id3_tag([frame], version=2))
+        self.assertEqual(read_embedded_picture(self.path), b'picture')
+
+    def test_front_cover_preferred(self):
+        self.path.write_bytes(id3_tag([apic(b'back', 4), apic(b'front', 3)]))
+        self.assertEqual(read_embedded_picture(self.path), b'front')
+
+    def test_utf16_description(self):
+        body = b'\x01image/jpeg\0\x03' + 'cover'.encode('utf-16') + b'\0\0picture'
+        frame = b'APIC' + struct.pack('>I', len(body)) + b'\0\0' + body
+        self.path.write_bytes(id3_tag([frame]))
+        self.assertEqual(read_embedded_picture(self.path), b'picture')
+
+    def test_no_picture(self):
+        self.assertIsNone(read_embedded_picture('test/media/1s.mp3'))
+        self.assertIsNone(read_embedded_picture('test/media/bad-file.mp3'))
+
+
+class ImageTests(TestCase):
+    def test_png_size(self):
+        self.assertEqual(image_info(make_png(30, 20)), ('image/png', 30, 20))
+
+    def test_jpeg_size(self):
+        jpeg = (b'\xff\xd8'
+                + b'\xff\xe0\x00\x10JFIF\0\x01\x02\x00\x00\x01\x00\x01\x00\x00'
+                + b'\xff\xc0\x00\x11\x08' + struct.pack('>HH', 1482, 1459)
+                + b'\x03' + bytes(9))
+        self.assertEqual(image_info(jpeg), ('image/jpeg', 1459, 1482))
+
+    def test_unknown_format(self):
+        self.assertIsNone(image_info(b'GIF89a'))
+
+    def test_fit_never_enlarges(self):
+        self.assertEqual(fit(100, 50, 256), (100, 50))
+        self.assertEqual(fit(1459, 1482, 256), (252, 256))
+
+    def test_versions_differ_by_size(self):
+        self.assertNotEqual(variant_version('abc', 64), variant_version('abc', 128))
+        self.assertGreater(variant_version('abc', 64), 0)
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_memory_lru(self):
+        cache = MemoryCache(max_bytes=10)
+        cache.put('a', b'12345')
+        cache.put('b', b'12345')
+        cache.get('a')
+        cache.put('c', b'12345')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'12345')
+
+    def test_disk_survives_restart(self):
+        DiskCache(self.dir).put(('abc', 64), b'thumb')
+        self.assertEqual(DiskCache(self.dir).get(('abc', 64)), b'thumb')
+
+    def test_disk_evicts(self):
+        cache = DiskCache(self.dir, max_bytes=10)
+        cache.put(('a', 64), b'12345')
+        cache.put(('b', 64), b'123456')
+        self.assertIsNone(cache.get(('a', 64)))
+        self.assertEqual(len(list(self.dir.glob('*.jpg'))), 1)
+
+    def test_disk_ignores_foreign_files(self):
+        (self.dir / 'notes.jpg').write_bytes(b'x')
+        (self.dir / 'abc.big.jpg').write_bytes(b'x')
+        DiskCache(self.dir).put(('abc', 64), b'thumb')
+        self.assertEqual(list(DiskCache(self.dir).entries), [('abc', 64)])
+
+
+class ArtworkCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = Path(tmp.name) / 'media'
+        self.media.mkdir()
+        shutil.copy('test/media/1s.mp3', self.media)
+        (self.media / 'Album_Cover.png').write_bytes(make_png(300, 200))
+        (self.media / 'back.png').write_bytes(make_png(10, 10))
+        self.cache_dir = Path(tmp.name) / 'artwork'
+
+    def cache(self):
+        cache = ArtworkCache(self.media, self.cache_dir, resizer=fake_resize)
+        self.addCleanup(cache.shutdown)
+        return cache
+
+    def test_folder_cover(self):
+        variant = self.cache().variant('1s.mp3', 100)
+        self.assertEqual(variant.source.path.name, 'Album_Cover.png')
+        self.assertEqual((variant.size, variant.mime, variant.width, variant.height),
+                         (128, 'image/jpeg', 128, 85))
+
+    def test_embedded_picture_wins(self):
+        with_picture(self.media / 'tagged.mp3', make_png(16, 16))
+        variant = self.cache().variant('tagged.mp3', 64)
+        self.assertTrue(variant.source.embedded)
+        # Cabe en el tamaño pedido: se sirve tal cual
+        self.assertEqual((variant.size, variant.mime), (0, 'image/png'))
+
+    def test_no_artwork(self):
+        for path in self.media.glob('*.png'):
+            path.unlink()
+        self.assertIsNone(self.cache().variant('1s.mp3', 64))
+
+    def test_large_requests_use_largest_size(self):
+        (self.media / 'Album_Cover.png').write_bytes(make_png(1000, 800))
+        variant = self.cache().variant('1s.mp3', 4096)
+        self.assertEqual((variant.size, variant.width, variant.height), (512, 512, 410))
+
+    def test_original_is_read_directly(self):
+        cache = self.cache()
+        variant = cache.variant('1s.mp3', 1000)
+        self.assertEqual((variant.size, variant.mime), (0, 'image/png'))
+        self.assertEqual(cache.load(variant).result(), make_png(300, 200))
+        self.assertIsNone(cache.executor)
+
+    def test_changed_picture_gets_new_version(self):
+        cache = self.cache()
+        with_picture(self.media / 'tagged.mp3', make_png(16, 16))
+        old = cache.variant('tagged.mp3', 64)
+
+        with_picture(self.media / 'tagged.mp3', make_png(20, 20))
+        os.utime(self.media / 'tagged.mp3', ns=(0, time.time_ns() + 10**9))
+        new = cache.variant('tagged.mp3', 64)
+        self.assertNotEqual(new.version, old.version)
+        self.assertEqual(cache.load(new).result(), make_png(20, 20))
+
+    def test_changed_folder_cover_gets_new_version(self):
+        cache = self.cache()
+        old = cache.variant('1s.mp3', 1000)
+
+        cover = self.media / 'Album_Cover.png'
+        cover.write_bytes(make_png(200, 100))
+        os.utime(cover, ns=(0, time.time_ns() + 10**9))
+        new = cache.variant('1s.mp3', 1000)
+        self.assertNotEqual(new.version, old.version)
+        self.assertEqual((new.width, new.height), (200, 100))
+
+    def test_vanished_picture_raises_oserror(self):
+        cache = self.cache()
+        with_picture(self.media / 'tagged.mp3', make_png(16, 16))
+        variant = cache.variant('tagged.mp3', 64)
+        shutil.copy('test/media/1s.mp3', self.media / 'tagged.mp3')
+        with self.assertRaises(OSError):
+            cache.load(variant)
+
+    def test_resized_once_and_stored(self):
+        cache = self.cache()
+        variant = cache.variant('1s.mp3', 64)
+        self.assertEqual(cache.load(variant).result(timeout=30), b'64x43')
+        while cache.pending:
+            time.sleep(0.01)
+
+        # Otra instancia (otro proceso) la encuentra en disco sin generarla
+        restarted = self.cache()
+        self.assertEqual(restarted.load(variant).result(), b'64x43')
+        self.assertIsNone(restarted.executor)
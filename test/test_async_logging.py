@@ -0,0 +1,128 @@
+import io
+import json
+import logging
+import os
+import threading
+from unittest import TestCase
+
+from async_logging import (
+    STREAM,
+    AsyncLogging,
+    JsonFormatter,
+    SamplingFilter,
+    TextFormatter,
+    install_filter,
+)
+
+
+class ThreadName:
+    """Argumento que recuerda en qué hilo se formateó."""
+    def __init__(self):
+        self.thread = None
+
+    def __str__(self):
+        self.thread = threading.current_thread().name
+        return "value"
+
+
+class AsyncLoggingTests(TestCase):
+    def setUp(self):
+        self.output = io.StringIO()
+        self.handler = logging.StreamHandler(self.output)
+        self.handler.setFormatter(JsonFormatter('test'))
+        self.filter = SamplingFilter()
+        self.pipeline = AsyncLogging(self.handler, self.filter)
+
+        self.logger = logging.getLogger('AsyncLoggingTests')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.pipeline.install(self.logger)
+        self.addCleanup(self.logger.removeHandler, self.pipeline.handler)
+
+    def entries(self):
+        self.pipeline.stop()
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+    def test_json_output(self):
+        self.logger.info("Stream opened for '%s'", '1s.mp3', extra=STREAM)
+        entry, = self.entries()
+        self.assertEqual(entry['msg'], "Stream opened for '1s.mp3'")
+        self.assertEqual(entry['category'], 'stream')
+        self.assertEqual(entry['service'], 'test')
+        self.assertEqual(entry['level'], 'INFO')
+
+    def test_formatting_is_off_the_calling_thread(self):
+        arg = ThreadName()
+        self.logger.info("arg: %s", arg)
+        entry, = self.entries()
+        self.assertEqual(entry['msg'], "arg: value")
+        self.assertNotEqual(arg.thread, threading.current_thread().name)
+
+    def test_sampling(self):
+        self.filter.sample_rates['stream'] = 0
+        for _ in range(10):
+            self.logger.info("sampled", extra=STREAM)
+        self.logger.info("not sampled")
+        self.assertEqual([e['msg'] for e in self.entries()], ["not sampled"])
+
+    def test_warnings_are_never_dropped(self):
+        self.filter.sample_rates['stream'] = 0
+        self.logger.warning("kept", extra=STREAM)
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_rate_limit_reports_suppressed(self):
+        self.filter.rate_limits['stream'] = 3
+        for i in range(10):
+            self.logger.info("event %d", i, extra=STREAM)
+        self.assertEqual(len(self.entries()), 3)
+
+        # La ventana siguiente informa de los descartados
+        self.filter.windows['stream'][0] -= 1
+        self.pipeline = AsyncLogging(self.handler, self.filter)
+        self.pipeline.install(self.logger)
+        self.output.truncate(0)
+        self.output.seek(0)
+        self.logger.info("next", extra=STREAM)
+        entry, = self.entries()
+        self.assertEqual(entry['suppressed'], 7)
+
+    def test_install_keeps_foreign_handlers(self):
+        log = logging.getLogger('AsyncLoggingTests.install')
+        basic = logging.StreamHandler(io.StringIO())
+        foreign = logging.FileHandler(os.devnull)
+        self.addCleanup(foreign.close)
+        for handler in basic, foreign, self.pipeline.handler:
+            log.addHandler(handler)
+
+        pipeline = AsyncLogging(self.handler)
+        pipeline.install(log)
+        self.addCleanup(pipeline.stop)
+        self.assertEqual(log.handlers, [foreign, pipeline.handler])
+
+
+class SyncSamplingTests(TestCase):
+    def test_filter_on_existing_handlers(self):
+        output = io.StringIO()
+        handler = logging.StreamHandler(output)
+        log = logging.getLogger('SyncSamplingTests')
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        self.addCleanup(log.removeHandler, handler)
+
+        sampling = SamplingFilter(rate_limits={'stream': 2})
+        install_filter(sampling, log)
+        install_filter(sampling, log)
+        self.assertEqual(handler.filters, [sampling])
+
+        for i in range(5):
+            log.info("event %d", i, extra=STREAM)
+        self.assertEqual(output.getvalue().splitlines(), ["event 0", "event 1"])
+
+
+class TextFormatterTests(TestCase):
+    def test_suppressed_count(self):
+        record = logging.LogRecord('x', logging.INFO, __file__, 1, "msg", None, None)
+        record.suppressed = 4
+        self.assertEqual(TextFormatter(logging.BASIC_FORMAT).format(record),
+                         "INFO:x:msg [4 similar suppressed]")
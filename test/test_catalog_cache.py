@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import Ice
+
+from catalog_cache import CatalogCache, SharedCatalogs
+from catalog_log import CatalogLog
+from media_server import MediaServerI
+from slice_loader import load_slice
+
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
+import Spotifice  # type: ignore # noqa: E402
+
+
+class CatalogCacheTests(TestCase):
+    """Caché del render sobre el sirviente del servidor, sin pasar por Ice."""
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        playlists = shutil.copytree('test/playlists', Path(tmp.name) / 'playlists')
+        self.server = MediaServerI(
+            Path('test/media'), playlists, Path(tmp.name) / 'users.json')
+        self.addCleanup(self.server.shutdown)
+        self.cache = CatalogCache(self.server, refresh=3600)
+        self.cache.start()
+        self.addCleanup(self.cache.stop)
+
+    def test_cached_playlist_is_updated(self):
+        self.assertEqual(len(self.cache.playlist('test_playlist').track_ids), 3)
+        self.server.remove_track('test_playlist', 0)
+        self.assertEqual(len(self.cache.playlist('test_playlist').track_ids), 3)
+
+        self.cache.refresh()
+        self.assertEqual(len(self.cache.playlist('test_playlist').track_ids), 2)
+
+    def test_analysis_updates_cached_track(self):
+        self.cache.track_info('1s.mp3')
+        self.server.apply_analysis(
+            {'filename': '1s.mp3', 'duration_ms': 1000, 'gain_db': -3.0, 'peak': 0.5})
+        self.cache.refresh()
+        self.assertEqual(self.cache.tracks['1s.mp3'].duration_ms, 1000)
+
+    def test_unrequested_entries_are_not_stored(self):
+        playlist = self.server.create_playlist('New', '', 'user')
+        self.cache.refresh()
+        self.assertNotIn(playlist.id, self.cache.playlists)
+
+    def test_truncated_log_drops_entries(self):
+        self.server.catalog_log = CatalogLog(max_changes=1)
+        known = self.server.get_catalog_version()
+        self.cache.epoch, self.cache.version = known.epoch, known.version
+        self.cache.track_info('1s.mp3')
+        self.server.create_playlist('One', '', 'user')
+        self.server.create_playlist('Two', '', 'user')
+
+        self.cache.refresh()
+        self.assertEqual(self.cache.tracks, {})
+        known = self.server.get_catalog_version()
+        self.assertEqual((self.cache.epoch, self.cache.version),
+                         (known.epoch, known.version))
+
+    def test_other_server_process_drops_entries(self):
+        # Mismo número de versión, pero de otro proceso (p. ej. tras reiniciar)
+        self.cache.track_info('1s.mp3')
+        self.server.catalog_log = CatalogLog(start=self.cache.version)
+        self.cache.refresh()
+        self.assertEqual(self.cache.tracks, {})
+        self.assertEqual(self.cache.epoch, self.server.catalog_log.epoch)
+
+    def test_unknown_track(self):
+        with self.assertRaises(Spotifice.TrackError):
+            self.cache.track_info('missing.mp3')
+
+
+class SharedCatalogsTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.ic = Ice.initialize()
+        self.addCleanup(self.ic.destroy)
+        adapter = self.ic.createObjectAdapterWithEndpoints("Catalog", "tcp -h 127.0.0.1")
+        self.addCleanup(adapter.destroy)
+        servant = MediaServerI(Path('test/media'), Path('test/playlists'),
+                               Path(tmp.name) / 'users.json')
+        self.addCleanup(servant.shutdown)
+        self.server = Spotifice.MediaServerPrx.uncheckedCast(adapter.addWithUUID(servant))
+        adapter.activate()
+
+    def test_zones_share_one_cache(self):
+        catalogs = SharedCatalogs()
+        first = catalogs.acquire(self.server, 3600)
+        second = catalogs.acquire(self.server, 3600)
+        self.assertIs(first, second)
+
+        catalogs.release(first)
+        self.assertFalse(first.stopped.is_set())
+        catalogs.release(second)
+        self.assertTrue(first.stopped.is_set())
+        third = catalogs.acquire(self.server, 3600)
+        self.addCleanup(catalogs.release, third)
+        self.assertIsNot(third, first)
@@ -0,0 +1,58 @@
+from unittest import TestCase
+
+from catalog_log import ADDED, MODIFIED, PLAYLIST, REMOVED, TRACK, CatalogLog
+
+
+class CatalogLogTests(TestCase):
+    def setUp(self):
+        self.log = CatalogLog(max_changes=4, start=100)
+
+    def changes_since(self, version):
+        return self.log.changes_since(self.log.epoch, version)
+
+    def test_versions_increase(self):
+        self.assertEqual(self.log.record(TRACK, 'a', MODIFIED), 101)
+        self.assertEqual(self.log.record(TRACK, 'b', MODIFIED), 102)
+        self.assertEqual(self.log.version, 102)
+
+    def test_no_changes(self):
+        self.assertEqual(self.changes_since(100), (100, {}))
+
+    def test_only_later_changes(self):
+        self.log.record(TRACK, 'a', MODIFIED)
+        self.log.record(PLAYLIST, 'p', ADDED)
+        self.assertEqual(self.changes_since(101), (102, {(PLAYLIST, 'p'): ADDED}))
+
+    def test_net_effect(self):
+        self.log.record(PLAYLIST, 'new', ADDED)
+        self.log.record(PLAYLIST, 'new', MODIFIED)
+        self.log.record(PLAYLIST, 'gone', MODIFIED)
+        self.log.record(PLAYLIST, 'gone', REMOVED)
+        self.assertEqual(self.changes_since(100)[1], {
+            (PLAYLIST, 'new'): ADDED,
+            (PLAYLIST, 'gone'): REMOVED,
+        })
+
+    def test_added_then_removed_is_nothing(self):
+        self.log.record(PLAYLIST, 'tmp', ADDED)
+        self.log.record(PLAYLIST, 'tmp', REMOVED)
+        self.assertEqual(self.changes_since(100)[1], {})
+
+    def test_truncated_log_requires_resync(self):
+        for name in 'abcde':
+            self.log.record(TRACK, name, MODIFIED)
+        self.assertEqual(self.changes_since(100), (105, None))
+        self.assertEqual(len(self.changes_since(101)[1]), 4)
+
+    def test_version_from_elsewhere_requires_resync(self):
+        self.assertIsNone(self.changes_since(99)[1])
+        self.assertIsNone(self.changes_since(101)[1])
+
+    def test_version_from_another_process_requires_resync(self):
+        # Otra réplica arrancada a la vez da versiones del mismo rango
+        other = CatalogLog(max_changes=4, start=100)
+        self.log.record(TRACK, 'a', MODIFIED)
+        other.record(TRACK, 'b', MODIFIED)
+        self.assertNotEqual(other.epoch, self.log.epoch)
+        self.assertEqual(self.log.changes_since(other.epoch, 101), (101, None))
+
@@ -0,0 +1,32 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from catalog_snapshot import read_snapshot, write_snapshot
+
+TRACKS = [
+    {'id': 'a.mp3', 'title': 'a', 'filename': 'a.mp3', 'version': 'abc'},
+    {'id': 'b.mp3', 'title': 'b', 'filename': 'a.mp3', 'duration_ms': 1000},
+]
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'cache' / 'catalog.json'
+
+    def test_round_trip(self):
+        write_snapshot(self.path, TRACKS)
+        self.assertEqual(read_snapshot(self.path), TRACKS)
+
+    def test_no_temporary_files_left(self):
+        write_snapshot(self.path, TRACKS)
+        self.assertEqual(list(self.path.parent.iterdir()), [self.path])
+
+    def test_unknown_format(self):
+        self.path.parent.mkdir(parents=True)
+        self.path.write_text(json.dumps({'format': 99, 'tracks': []}))
+        with self.assertRaises(ValueError):
+            read_snapshot(self.path)
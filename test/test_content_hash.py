@@ -0,0 +1,38 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from content_hash import HashCache
+
+
+class HashCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.file = self.dir / 'a.mp3'
+        self.file.write_bytes(b'audio')
+        self.cache_file = self.dir / 'hashes.json'
+
+    def test_same_content_same_digest(self):
+        copy = self.dir / 'b.mp3'
+        copy.write_bytes(b'audio')
+
+        cache = HashCache()
+        self.assertEqual(cache.digest(self.file), cache.digest(copy))
+
+    def test_persisted_digest_is_reused(self):
+        cache = HashCache(self.cache_file)
+        digest = cache.digest(self.file)
+        cache.save()
+
+        with mock.patch('hashlib.file_digest') as file_digest:
+            self.assertEqual(HashCache(self.cache_file).digest(self.file), digest)
+            file_digest.assert_not_called()
+
+    def test_modified_file_is_rehashed(self):
+        cache = HashCache(self.cache_file)
+        digest = cache.digest(self.file)
+
+        self.file.write_bytes(b'other audio')
+        self.assertNotEqual(cache.digest(self.file), digest)
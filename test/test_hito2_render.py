@@ -4,8 +4,10 @@ import secrets
 import os
 import Ice
 
-# Aseguramos cargar el contrato v2
-Ice.loadSlice('-I{} spotifice_v2.ice'.format(Ice.getSliceDir()))
+from slice_loader import load_slice
+
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
 import Spotifice  # type: ignore
 
 from gst_player import GstPlayer
@@ -5,8 +5,10 @@ import os
 import time
 import Ice
 
-# Aseguramos cargar el contrato v2
-Ice.loadSlice('-I{} spotifice_v2.ice'.format(Ice.getSliceDir()))
+from slice_loader import load_slice
+
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
 import Spotifice  # type: ignore
 
 from media_server import main as server_main
@@ -91,7 +93,7 @@ class TestAuthManager(IceTestCase):
         session = self.server.authenticate(self.mock_render, "testuser", "secret_password")
         
         # Usamos la sesión para abrir stream (ya no pide render_id)
-        session.open_stream("1s.mp3")
+        session.open_stream("1s.mp3", Spotifice.StreamQuality.AUTO)
         
         chunk = session.get_audio_chunk(1024)
         self.assertGreater(len(chunk), 0)
@@ -0,0 +1,59 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from media_analysis import AnalysisStore, run_analysis
+
+
+class AnalysisStoreTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.source = self.dir / 'track.mp3'
+        self.source.write_bytes(b'audio')
+        self.store_file = self.dir / 'analysis.jsonl'
+
+    def record(self, **kwargs):
+        st = self.source.stat()
+        record = {
+            'filename': self.source.name, 'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns, 'duration_ms': 1000,
+            'gain_db': -3.5, 'peak': 0.9}
+        record.update(kwargs)
+        return record
+
+    def test_results_persist_incrementally(self):
+        AnalysisStore(self.store_file).append(self.record())
+
+        store = AnalysisStore(self.store_file)
+        self.assertTrue(store.is_fresh(self.source))
+        self.assertEqual(store.get('track.mp3')['duration_ms'], 1000)
+
+    def test_last_record_wins(self):
+        store = AnalysisStore(self.store_file)
+        store.append(self.record(duration_ms=1))
+        store.append(self.record(duration_ms=2))
+
+        record = AnalysisStore(self.store_file).get('track.mp3')
+        self.assertEqual(record['duration_ms'], 2)
+
+    def test_truncated_line_is_ignored(self):
+        AnalysisStore(self.store_file).append(self.record())
+        with open(self.store_file, 'a') as f:
+            f.write('{"filename": "tr')
+
+        self.assertTrue(AnalysisStore(self.store_file).is_fresh(self.source))
+
+    def test_modified_source_is_stale(self):
+        store = AnalysisStore(self.store_file)
+        store.append(self.record())
+
+        self.source.write_bytes(b'longer audio')
+        self.assertFalse(store.is_fresh(self.source))
+
+    def test_fresh_tracks_are_not_reanalysed(self):
+        store = AnalysisStore(self.store_file)
+        store.append(self.record())
+
+        self.assertEqual(run_analysis([self.source], store), 0)
@@ -3,10 +3,16 @@ import json
 import hashlib
 import secrets
 import os
+import queue
+import statistics
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Cargamos contrato v2
-Ice.loadSlice('-I{} spotifice_v2.ice'.format(Ice.getSliceDir()))
+from slice_loader import load_slice
+
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
 import Spotifice  # type: ignore
 
 from gst_player import GstPlayer
@@ -18,6 +24,8 @@ class TestRender(IceTestCase):
     render_port = 10001
     server_port = 10000
     users_file = 'test/users_render_legacy.json'
+    extra_props = {}
+    server_extra_props = {}
 
     def setUp(self):
         # 1. Crear usuarios
@@ -33,16 +41,22 @@ class TestRender(IceTestCase):
             'MediaServerAdapter.Endpoints': f'tcp -p {self.server_port}',
             'MediaServer.Content': 'test/media',
             'MediaServer.Playlists': 'test/playlists',
-            'MediaServer.UsersFile': self.users_file
+            'MediaServer.UsersFile': self.users_file,
+            **self.server_extra_props
         }
         server_endpoint = f'mediaServer1:default -p {self.server_port} -t 500'
-        self.create_server(server_main, server_props)
+        self.server_props = server_props
+        self.server_ic, self.server_thread = self.create_server(server_main, server_props)
 
         player = GstPlayer()
         player.start()
         self.addCleanup(player.shutdown)
+        self.player = player
 
-        render_props = {'MediaRenderAdapter.Endpoints': f'tcp -p {self.render_port}'}
+        render_props = {
+            'MediaRenderAdapter.Endpoints': f'tcp -p {self.render_port}',
+            **self.extra_props
+        }
         render_enpoint = f'mediaRender1:default -p {self.render_port} -t 500'
         self.create_server(render_main, render_props, player)
 
@@ -57,6 +71,14 @@ class TestRender(IceTestCase):
             os.remove(self.users_file)
         super().tearDown()
 
+class StatusObserver(Spotifice.PlaybackObserver):
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def status_changed(self, render, status, current=None):
+        self.events.put((render, status))
+
+
 class PlaybackTests(TestRender):
     def test_id(self):
         self.assertEqual(self.sut.ice_id(), '::Spotifice::MediaRender')
@@ -94,4 +116,262 @@ class PlaybackTests(TestRender):
             self.sut.play()
         self.assertEqual(cm.exception.reason, "Already playing")
     
-    # ... (Puedes mantener aquí tus tests del Hito 1 si quieres, pero actualiza el bind) ...
\ No newline at end of file
+    # ... (Puedes mantener aquí tus tests del Hito 1 si quieres,
+    # pero actualiza el bind) ...
+
+
+class ObserverTests(TestRender):
+    def setUp(self):
+        super().setUp()
+        adapter = self.client_ic.createObjectAdapterWithEndpoints(
+            "ObserverAdapter", "tcp -h 127.0.0.1")
+        self.addCleanup(adapter.destroy)
+        self.observer = StatusObserver()
+        self.observer_prx = Spotifice.PlaybackObserverPrx.uncheckedCast(
+            adapter.addWithUUID(self.observer))
+        adapter.activate()
+
+    def test_status_is_pushed(self):
+        self.sut.subscribe(self.observer_prx)
+        self.sut.set_repeat(True)
+
+        render, status = self.observer.events.get(timeout=2)
+        self.assertEqual(render.name, 'mediaRender1')
+        self.assertTrue(status.repeat)
+        self.assertEqual(status.state, Spotifice.PlaybackState.STOPPED)
+
+    def test_play_is_pushed(self):
+        tracks = self.server.get_all_tracks()
+        self.sut.bind_media_server(self.server, self.session)
+        self.sut.subscribe(self.observer_prx)
+        self.sut.load_track(tracks[1].id)
+        self.sut.play()
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            _, status = self.observer.events.get(timeout=2)
+            if status.state == Spotifice.PlaybackState.PLAYING:
+                break
+        self.assertEqual(status.state, Spotifice.PlaybackState.PLAYING)
+        self.assertEqual(status.current_track_id, tracks[1].id)
+
+    def test_unsubscribed_observer_gets_nothing(self):
+        self.sut.subscribe(self.observer_prx)
+        self.sut.unsubscribe(self.observer_prx)
+        self.sut.set_repeat(True)
+
+        with self.assertRaises(queue.Empty):
+            self.observer.events.get(timeout=0.5)
+
+
+class ConcurrencyTests(TestRender):
+    extra_props = {
+        'Ice.ThreadPool.Server.Size': '4',
+        'Ice.ThreadPool.Server.SizeMax': '8',
+    }
+
+    def test_controls_hammered(self):
+        self.sut.bind_media_server(self.server, self.session)
+        self.sut.load_playlist('test_playlist')
+
+        operations = [
+            self.sut.play, self.sut.next, self.sut.stop, self.sut.pause,
+            self.sut.get_status, lambda: self.sut.set_repeat(True),
+        ]
+
+        def work(i):
+            for n in range(12):
+                try:
+                    operations[(i + n) % len(operations)]()
+                except Spotifice.PlayerError as e:
+                    self.assertEqual(e.reason, "Already playing")
+
+        with ThreadPoolExecutor(8) as executor:
+            for future in [executor.submit(work, i) for i in range(8)]:
+                future.result()
+
+        self.sut.stop()
+        status = self.sut.get_status()
+        self.assertEqual(status.state, Spotifice.PlaybackState.STOPPED)
+        self.assertIn(status.current_track_id, ['1s.mp3', '2s.mp3', '4s.mp3'])
+
+
+
+class FirstAudioTests(TestRender):
+    runs = 5
+
+    def first_audio(self, render, player):
+        start = time.monotonic()
+        render.play()
+        first_audio = player.wait_first_audio()
+        self.assertIsNotNone(first_audio)
+        render.stop()
+        return first_audio - start
+
+    def test_burst_is_not_slower(self):
+        """
+        Desde play() hasta el primer buffer decodificado, mediana de varias,
+        con ráfaga (este render) y sin ella (otro render del mismo servidor).
+        Las medidas se alternan para que ambos sufran el mismo ruido.
+        """
+        player = GstPlayer()
+        player.start()
+        self.addCleanup(player.shutdown)
+        port = self.render_port + 1
+        self.create_server(render_main, {
+            'MediaRenderAdapter.Endpoints': f'tcp -p {port}',
+            'MediaRender.Burst': '0',
+        }, player)
+        no_burst = self.create_proxy(
+            f'mediaRender1:default -p {port} -t 500', Spotifice.MediaRenderPrx)
+
+        no_burst_session = self.server.authenticate(no_burst, "user", "secret")
+        renders = [(self.sut, self.player, self.session),
+                   (no_burst, player, no_burst_session)]
+        times = [[], []]
+        for render, _, session in renders:
+            render.bind_media_server(self.server, session)
+            render.load_track('4s.mp3')
+        for _ in range(self.runs):
+            for i, (render, render_player, _) in enumerate(renders):
+                times[i].append(self.first_audio(render, render_player))
+
+        with_burst, without_burst = map(statistics.median, times)
+        print(f"\nFirst audio (median of {self.runs}): "
+              f"burst {with_burst * 1000:.0f} ms, no burst {without_burst * 1000:.0f} ms")
+        # Margen para el ruido de la máquina; lo que se comprueba es que no empeora
+        self.assertLessEqual(with_burst, without_burst * 1.5 + 0.05)
+
+
+class LocalStreamTests(TestRender):
+    extra_props = {'MediaRender.LocalStreams': '1'}
+    server_extra_props = {'MediaServer.LocalStreams': '1'}
+
+    def play_to_end(self):
+        self.sut.bind_media_server(self.server, self.session)
+        self.sut.load_track('1s.mp3')
+        self.sut.play()
+
+        start = time.monotonic()
+        while self.sut.get_status().state != Spotifice.PlaybackState.STOPPED:
+            self.assertLess(time.monotonic() - start, 5)
+            time.sleep(0.1)
+
+    def test_plays_local_file(self):
+        self.play_to_end()
+
+
+class LocalStreamRefusedTests(LocalStreamTests):
+    server_extra_props = {}
+
+    def test_plays_local_file(self):
+        # El servidor no lo ofrece: se reproduce por el camino normal
+        self.play_to_end()
+
+
+class ZoneTests(TestRender):
+    extra_props = {
+        'MediaRender.Zones': '2',
+        'MediaRender.Zone2.Sink': 'fakesink sync=true',
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.zone2 = self.create_proxy(
+            f'mediaRender2:default -p {self.render_port} -t 500',
+            Spotifice.MediaRenderPrx)
+        self.session2 = self.server.authenticate(self.zone2, "user", "secret")
+
+    def test_zones_play_independently(self):
+        self.sut.bind_media_server(self.server, self.session)
+        self.zone2.bind_media_server(self.server, self.session2)
+        self.sut.load_track('4s.mp3')
+        self.zone2.load_track('2s.mp3')
+        self.sut.play()
+        self.zone2.play()
+
+        self.sut.stop()
+        status = self.zone2.get_status()
+        self.assertEqual(status.state, Spotifice.PlaybackState.PLAYING)
+        self.assertEqual(status.current_track_id, '2s.mp3')
+        self.assertEqual(self.sut.get_status().state, Spotifice.PlaybackState.STOPPED)
+
+    def test_observers_are_per_zone(self):
+        adapter = self.client_ic.createObjectAdapterWithEndpoints(
+            "ObserverAdapter", "tcp -h 127.0.0.1")
+        self.addCleanup(adapter.destroy)
+        observer = StatusObserver()
+        adapter.activate()
+        self.zone2.subscribe(Spotifice.PlaybackObserverPrx.uncheckedCast(
+            adapter.addWithUUID(observer)))
+
+        self.sut.set_repeat(True)
+        self.zone2.set_repeat(True)
+        render, _ = observer.events.get(timeout=2)
+        self.assertEqual(render.name, 'mediaRender2')
+        with self.assertRaises(queue.Empty):
+            observer.events.get(timeout=0.5)
+
+
+class FailoverTests(TestRender):
+    cache_dir = tempfile.mkdtemp(prefix='render-cache-')
+    extra_props = {
+        'MediaRender.Prefetch': '4096',
+        'MediaRender.Username': 'user',
+        'MediaRender.Password': 'secret',
+        'MediaRender.Cache.Dir': cache_dir,
+    }
+
+    def test_server_killed_mid_stream(self):
+        self.sut.bind_media_server(self.server, self.session)
+        self.sut.load_track('4s.mp3')
+        start = time.monotonic()
+        self.sut.play()
+
+        # Matamos el servidor a mitad de pista y lo levantamos de nuevo
+        time.sleep(1)
+        self.server_shutdown(self.server_ic, self.server_thread)
+        self.create_server(server_main, self.server_props)
+
+        while self.sut.get_status().state != Spotifice.PlaybackState.STOPPED:
+            self.assertLess(time.monotonic() - start, 15)
+            time.sleep(0.2)
+
+        # Suena la pista entera y la copia en caché (bytes exactos) se completa
+        self.assertGreater(time.monotonic() - start, 3.5)
+        version = self.server.get_track_info('4s.mp3').version
+        cached = [name for name in os.listdir(self.cache_dir) if name.startswith(version)]
+        self.assertTrue(any(name.endswith('.mp3') for name in cached))
+
+
+class UnknownQualityTests(TestRender):
+    extra_props = {'MediaRender.StreamQuality': 'HIHG'}
+
+    def test_falls_back_to_auto(self):
+        # El render arranca igualmente y reproduce
+        self.sut.bind_media_server(self.server, self.session)
+        self.sut.load_track('1s.mp3')
+        self.sut.play()
+        self.assertIsNotNone(self.player.wait_first_audio())
+
+
+class QualityCacheTests(TestRender):
+    cache_dir = tempfile.mkdtemp(prefix='render-cache-')
+    # El servidor no tiene variantes: a una petición LOW responde con el original
+    extra_props = {
+        'MediaRender.StreamQuality': 'LOW',
+        'MediaRender.Cache.Dir': cache_dir,
+    }
+
+    def test_other_quality_is_not_cached(self):
+        self.sut.bind_media_server(self.server, self.session)
+        self.sut.load_track('1s.mp3')
+        start = time.monotonic()
+        self.sut.play()
+        while self.sut.get_status().state != Spotifice.PlaybackState.STOPPED:
+            self.assertLess(time.monotonic() - start, 10)
+            time.sleep(0.2)
+
+        version = self.server.get_track_info('1s.mp3').version
+        self.assertFalse([name for name in os.listdir(self.cache_dir)
+                          if name.startswith(version)])
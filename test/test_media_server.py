@@ -3,18 +3,35 @@ import json
 import hashlib
 import secrets
 import os
+import shutil
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import TestCase, mock
 
-# Cargamos contrato v2
-Ice.loadSlice('-I{} spotifice_v2.ice'.format(Ice.getSliceDir()))
+import local_stream
+from content_hash import HashCache
+from media_server import MediaServerI, SecureStreamManagerI
+from media_server import main as server_main
+from shared_reader import HeadCache
+from slice_loader import load_slice
+from stream_scheduler import IDLE_EXPIRED
+
+from .media_files import make_png, with_picture
+
+# Cargamos el contrato actual (ver slice_loader.SLICE_FILE)
+load_slice()
 import Spotifice  # type: ignore
 
-from media_server import main as server_main
 from .icetest import IceTestCase
 
 class TestServer(IceTestCase):
     server_port = 10000
     users_file = 'test/users_server_legacy.json'
+    playlists_dir = 'test/playlists'
+    media_dir = 'test/media'
+    extra_props = {}
 
     def setUp(self):
         # 1. Crear usuarios para que los tests puedan loguearse
@@ -28,9 +45,10 @@ class TestServer(IceTestCase):
 
         server_props = {
             'MediaServerAdapter.Endpoints': f'tcp -p {self.server_port}',
-            'MediaServer.Content': 'test/media',
-            'MediaServer.Playlists': 'test/playlists',
-            'MediaServer.UsersFile': self.users_file
+            'MediaServer.Content': self.media_dir,
+            'MediaServer.Playlists': self.playlists_dir,
+            'MediaServer.UsersFile': self.users_file,
+            **self.extra_props
         }
         server_endpoint = f'mediaServer1:default -p {self.server_port} -t 500'
         self.create_server(server_main, server_props)
@@ -53,11 +71,45 @@ class MusicLibraryTests(TestServer):
         track = self.sut.get_track_info('1s.mp3')
         self.assertEqual(track.id, '1s.mp3')
 
+    def test_no_artwork(self):
+        artwork = self.sut.get_artwork('1s.mp3', 64, 0)
+        self.assertEqual(artwork.version, 0)
+
+    def test_get_track_columns(self):
+        columns = self.sut.get_track_columns()
+        tracks = self.sut.get_all_tracks()
+        self.assertEqual(columns.ids, [t.id for t in tracks])
+        self.assertEqual(columns.titles, [t.title for t in tracks])
+        self.assertEqual(list(columns.durations_ms), [t.duration_ms for t in tracks])
+
+    def test_unknown_fields_are_empty(self):
+        track = self.sut.get_track_info('1s.mp3')
+        self.assertEqual(track.duration_ms, 0)
+        self.assertEqual(len(track.version), 64)
+
     def test_get_track_info_wrong_track(self):
         with self.assertRaises(Spotifice.TrackError) as cm:
             self.sut.get_track_info('bad-track-id')
         self.assertEqual(cm.exception.reason, 'Track not found')
 
+class DuplicateMediaTests(TestServer):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media_dir = shutil.copytree('test/media', f'{tmp.name}/media')
+        shutil.copy('test/media/1s.mp3', f'{self.media_dir}/copy-of-1s.mp3')
+        super().setUp()
+
+    def test_duplicate_is_listed_as_track(self):
+        tracks = self.sut.get_all_tracks()
+        self.assertEqual(len(tracks), 5)
+
+    def test_duplicate_shares_storage(self):
+        track = self.sut.get_track_info('copy-of-1s.mp3')
+        self.assertEqual(track.id, 'copy-of-1s.mp3')
+        self.assertEqual(track.filename, '1s.mp3')
+
+
 class StreamManagerTests(TestServer):
     def setUp(self):
         super().setUp()
@@ -68,14 +120,14 @@ class StreamManagerTests(TestServer):
         track_id = 'bad-track-id'
         # Ahora llamamos a open_stream en la SESIÓN, no en el servidor
         with self.assertRaises(Spotifice.TrackError) as cm:
-            self.session.open_stream(track_id)
+            self.session.open_stream(track_id, Spotifice.StreamQuality.AUTO)
         self.assertEqual(cm.exception.reason, 'Track not found')
 
     def test_get_audio_chunk(self):
         track_id = self.sut.get_all_tracks()[0].id
         
         # Usamos la sesión
-        self.session.open_stream(track_id)
+        self.session.open_stream(track_id, Spotifice.StreamQuality.AUTO)
         chunk = self.session.get_audio_chunk(1024)
 
         self.assertGreater(len(chunk), 0)
@@ -83,8 +135,587 @@ class StreamManagerTests(TestServer):
             expected = f.read(len(chunk))
             self.assertEqual(chunk, expected)
 
+    def test_open_stream_without_variants_serves_original(self):
+        served = self.session.open_stream('1s.mp3', Spotifice.StreamQuality.LOW)
+        self.assertEqual(served, Spotifice.StreamQuality.ORIGINAL)
+
+    def test_open_stream_with_burst(self):
+        start = self.session.open_stream_with_burst(
+            '4s.mp3', Spotifice.StreamQuality.AUTO, 1000)
+        self.assertEqual(start.quality, Spotifice.StreamQuality.ORIGINAL)
+
+        # Un segundo de audio (56 kbps) y el stream sigue justo detrás
+        self.assertEqual(len(start.burst), 56000 // 8)
+        with open('test/media/4s.mp3', 'rb') as f:
+            self.assertEqual(start.burst, f.read(len(start.burst)))
+            self.assertEqual(self.session.get_audio_chunk(1024), f.read(1024))
+
+    def test_local_streams_disabled_by_default(self):
+        with self.assertRaises(Spotifice.StreamError) as cm:
+            self.session.open_local_stream(
+                '1s.mp3', Spotifice.StreamQuality.AUTO, local_stream.host_id())
+        self.assertEqual(cm.exception.reason, 'Local streams disabled')
+
+    def test_session_proxy_is_not_compressed(self):
+        self.assertIs(self.session.ice_getCompress(), False)
+
+    def test_compressed_catalog(self):
+        tracks = self.sut.ice_compress(True).get_all_tracks()
+        self.assertEqual(len(tracks), 4)
+
     def test_get_audio_chunk_not_open_stream(self):
         # Usamos la sesión
         with self.assertRaises(Spotifice.StreamError) as cm:
             self.session.get_audio_chunk(1024)
-        self.assertEqual(cm.exception.reason, 'No stream open')
\ No newline at end of file
+        self.assertEqual(cm.exception.reason, 'No stream open')
+
+class ResumeTests(TestServer):
+    def setUp(self):
+        super().setUp()
+        self.session = self.sut.authenticate(self.mock_render, "user", "secret")
+
+    def test_resume_keeps_stream_position(self):
+        self.session.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+        first = self.session.get_audio_chunk(1024)
+
+        token = self.session.get_resume_token()
+        resumed = self.sut.resume(self.mock_render, token)
+        self.assertEqual(resumed.ice_getIdentity(), self.session.ice_getIdentity())
+
+        with open('test/media/1s.mp3', 'rb') as f:
+            f.seek(len(first))
+            self.assertEqual(resumed.get_audio_chunk(1024), f.read(1024))
+
+    def test_closed_session_can_not_be_resumed(self):
+        token = self.session.get_resume_token()
+        self.session.close()
+
+        # Un token de una sesión cerrada no sirve para reabrirla
+        with self.assertRaises(Spotifice.AuthError):
+            self.sut.resume(self.mock_render, token)
+
+    def test_bad_token(self):
+        token = self.session.get_resume_token()
+        with self.assertRaises(Spotifice.AuthError) as cm:
+            self.sut.resume(self.mock_render, token[:-2] + 'xx')
+        self.assertEqual(cm.exception.reason, 'Invalid resume token')
+
+
+class ArtworkTests(TestServer):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = shutil.copytree('test/media', Path(tmp.name) / 'media')
+        (media / 'cover.png').write_bytes(make_png(300, 200))
+        with_picture(media / 'tagged.mp3', make_png(16, 16))
+        self.media_dir = str(media)
+        artwork_dir = Path(tmp.name) / 'artwork'
+        self.extra_props = {'MediaServer.Artwork.CacheDir': str(artwork_dir)}
+        super().setUp()
+
+    def test_resized_cover(self):
+        artwork = self.sut.get_artwork('1s.mp3', 128, 0)
+        self.assertEqual((artwork.mime_type, artwork.width, artwork.height),
+                         ('image/jpeg', 128, 85))
+        self.assertTrue(artwork.data.startswith(b'\xff\xd8'))
+
+    def test_embedded_cover_served_as_is(self):
+        artwork = self.sut.get_artwork('tagged.mp3', 128, 0)
+        self.assertEqual(artwork.mime_type, 'image/png')
+        self.assertEqual(artwork.data, make_png(16, 16))
+
+    def test_known_version_skips_data(self):
+        first = self.sut.get_artwork('1s.mp3', 64, 0)
+        again = self.sut.get_artwork('1s.mp3', 64, first.version)
+        self.assertEqual(again.version, first.version)
+        self.assertEqual(len(again.data), 0)
+
+    def test_unknown_track(self):
+        with self.assertRaises(Spotifice.TrackError):
+            self.sut.get_artwork('missing.mp3', 64, 0)
+
+
+class LocalStreamTests(TestServer):
+    extra_props = {'MediaServer.LocalStreams': '1'}
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.sut.authenticate(self.mock_render, "user", "secret")
+
+    def test_local_file_is_offered(self):
+        local = self.session.open_local_stream(
+            '2s.mp3', Spotifice.StreamQuality.AUTO, local_stream.host_id())
+        self.assertEqual(local.quality, Spotifice.StreamQuality.ORIGINAL)
+
+        with local_stream.open_verified(
+                local.path, local.device, local.inode, local.size) as f:
+            data = f.read()
+        with open('test/media/2s.mp3', 'rb') as f:
+            self.assertEqual(data, f.read())
+
+    def test_other_host_is_refused(self):
+        with self.assertRaises(Spotifice.StreamError) as cm:
+            self.session.open_local_stream(
+                '2s.mp3', Spotifice.StreamQuality.AUTO, 'other-host')
+        self.assertEqual(cm.exception.reason, 'Render is not on this host')
+
+    def test_replaced_file_is_detected(self):
+        local = self.session.open_local_stream(
+            '2s.mp3', Spotifice.StreamQuality.AUTO, local_stream.host_id())
+        with self.assertRaises(OSError):
+            local_stream.open_verified(
+                local.path, local.device, local.inode + 1, local.size)
+
+
+class SchedulerTests(TestServer):
+    extra_props = {
+        'MediaServer.Scheduler': '1',
+        'MediaServer.Scheduler.MaxStreams': '1',
+        'MediaServer.Scheduler.QueueTimeout': '0',
+        'MediaServer.Scheduler.Burst': '1',
+        'MediaServer.Scheduler.Speed': '1',
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.session = self.sut.authenticate(self.mock_render, "user", "secret")
+
+    def test_reject_when_full(self):
+        other = self.sut.authenticate(self.mock_render, "user", "secret")
+        self.session.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+
+        with self.assertRaises(Spotifice.StreamError) as cm:
+            other.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+        self.assertEqual(cm.exception.reason, 'Server busy')
+
+        self.session.close_stream()
+        other.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+
+    def test_stream_paced_to_bitrate(self):
+        # 2 s de audio con 1 s de ráfaga: el resto llega a tiempo real
+        self.session.open_stream('2s.mp3', Spotifice.StreamQuality.AUTO)
+        start = time.monotonic()
+        while self.session.get_audio_chunk(4096):
+            pass
+        self.assertGreater(time.monotonic() - start, 0.5)
+
+
+class SchedulerQueueTests(TestServer):
+    extra_props = {
+        'MediaServer.Scheduler': '1',
+        'MediaServer.Scheduler.MaxStreams': '1',
+        'MediaServer.Scheduler.QueueTimeout': '2',
+    }
+
+    def test_closed_session_does_not_keep_slot(self):
+        playing = self.sut.authenticate(self.mock_render, "user", "secret")
+        playing.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+
+        # Su apertura queda en cola y la sesión se cierra mientras espera
+        queued = self.sut.authenticate(self.mock_render, "user", "secret")
+        pending = queued.open_streamAsync('1s.mp3', Spotifice.StreamQuality.AUTO)
+        time.sleep(0.2)
+        queued.close()
+
+        # La plaza que le llega ahora se devuelve: la siguiente entra sin esperar
+        playing.close_stream()
+        with self.assertRaises(Spotifice.StreamError):
+            pending.result()
+        other = self.sut.authenticate(self.mock_render, "user", "secret")
+        start = time.monotonic()
+        other.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_reopen_supersedes_queued_request(self):
+        playing = self.sut.authenticate(self.mock_render, "user", "secret")
+        playing.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+
+        session = self.sut.authenticate(self.mock_render, "user", "secret")
+        older = session.open_streamAsync('1s.mp3', Spotifice.StreamQuality.AUTO)
+        time.sleep(0.2)
+        newer = session.open_streamAsync('2s.mp3', Spotifice.StreamQuality.AUTO)
+        time.sleep(0.2)
+
+        playing.close_stream()
+        with self.assertRaises(Spotifice.StreamError):
+            older.result()
+        newer.result()
+        # Sigue sonando la última pista pedida
+        audio = Path('test/media/2s.mp3').read_bytes()
+        self.assertEqual(session.get_audio_chunk(4096), audio[:4096])
+
+
+class LoadMediaTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.media = self.dir / 'media'
+        self.media.mkdir()
+        for name in ('1s.mp3', '2s.mp3'):
+            shutil.copy(f'test/media/{name}', self.media)
+
+    def test_unreadable_track_is_skipped(self):
+        digest = HashCache.digest
+
+        def unreadable(cache, filepath):
+            if filepath.name == '2s.mp3':
+                raise PermissionError(13, 'Permission denied', str(filepath))
+            return digest(cache, filepath)
+
+        with mock.patch.object(HashCache, 'digest', unreadable):
+            server = MediaServerI(self.media, 'test/playlists', self.dir / 'users.json')
+        self.addCleanup(server.shutdown)
+        self.assertEqual(len(server.tracks), 1)
+        self.assertIn('1s.mp3', server.tracks)
+
+
+class SchedulerIdleTests(TestServer):
+    extra_props = {
+        'MediaServer.Scheduler': '1',
+        'MediaServer.Scheduler.MaxStreams': '1',
+        'MediaServer.Scheduler.QueueTimeout': '0',
+        'MediaServer.Scheduler.IdleTimeout': '0.5',
+    }
+
+    def test_abandoned_stream_frees_slot(self):
+        # El cliente abre, lee un poco y desaparece sin cerrar
+        abandoned = self.sut.authenticate(self.mock_render, "user", "secret")
+        abandoned.open_stream('4s.mp3', Spotifice.StreamQuality.AUTO)
+        abandoned.get_audio_chunk(4096)
+
+        time.sleep(1.5)
+        other = self.sut.authenticate(self.mock_render, "user", "secret")
+        other.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+
+        with self.assertRaises(Spotifice.StreamError) as cm:
+            abandoned.get_audio_chunk(4096)
+        self.assertEqual(cm.exception.reason, IDLE_EXPIRED)
+
+
+class PrefetchTests(TestCase):
+    """Precarga de la pista siguiente, directamente sobre los sirvientes."""
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.library = MediaServerI(
+            Path('test/media'), Path('test/playlists'), Path(tmp.name) / 'users.json')
+        self.addCleanup(self.library.shutdown)
+        self.library.enable_prefetch(HeadCache(head_size=4096), ahead=8192)
+        self.session = SecureStreamManagerI('user', {}, self.library)
+
+    def stream(self, track_id):
+        self.session.open_stream(track_id, Spotifice.StreamQuality.AUTO)
+        while self.session.get_audio_chunk(1024):
+            pass
+        self.library.readers.warmer.shutdown(wait=True)
+
+    def warmed(self, track_id):
+        return self.library.readers.heads.take(os.stat(f'test/media/{track_id}'))
+
+    def test_next_track_is_warmed(self):
+        self.session.set_playlist_context('test_playlist', 0, False)
+        self.stream('1s.mp3')
+        with open('test/media/2s.mp3', 'rb') as f:
+            self.assertEqual(self.warmed('2s.mp3'), f.read(4096))
+
+    def test_end_of_playlist(self):
+        self.session.set_playlist_context('test_playlist', 2, False)
+        self.stream('4s.mp3')
+        self.assertEqual(self.library.readers.heads.size, 0)
+
+    def test_repeat_wraps_around(self):
+        self.session.set_playlist_context('test_playlist', 2, True)
+        self.stream('4s.mp3')
+        self.assertEqual(len(self.warmed('1s.mp3')), 4096)
+
+    def test_unknown_playlist(self):
+        with self.assertRaises(Spotifice.PlaylistError):
+            self.session.set_playlist_context('missing', 0, False)
+
+
+class PlaylistManagerTests(TestServer):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.playlists_dir = shutil.copytree('test/playlists', f'{tmp.name}/playlists')
+        super().setUp()
+
+    def test_created_at_is_parsed(self):
+        playlist = self.sut.get_playlist('test_playlist')
+        self.assertEqual(playlist.created_at, 1735689600)
+
+    def test_create_and_append(self):
+        playlist = self.sut.create_playlist('My Mix', 'desc', 'user')
+        self.sut.append_tracks(playlist.id, ['1s.mp3', '4s.mp3'])
+
+        playlist = self.sut.get_playlist(playlist.id)
+        self.assertEqual(playlist.name, 'My Mix')
+        self.assertEqual(playlist.track_ids, ['1s.mp3', '4s.mp3'])
+
+    def test_new_playlist_does_not_overwrite_other_files(self):
+        # test.playlist guarda 'test_playlist', no una playlist con id 'test'
+        playlist = self.sut.create_playlist('test', '', 'user')
+        self.sut.append_tracks(playlist.id, ['2s.mp3'])
+
+        path = f'{self.playlists_dir}/test-2.playlist'
+        for _ in range(20):
+            if os.path.exists(path):
+                break
+            time.sleep(0.1)
+
+        with open(f'{self.playlists_dir}/test.playlist') as f:
+            self.assertEqual(json.load(f)['id'], 'test_playlist')
+        with open(path) as f:
+            self.assertEqual(json.load(f)['id'], playlist.id)
+        self.assertEqual(len(self.sut.get_playlist('test_playlist').track_ids), 3)
+
+    def test_append_unknown_track(self):
+        with self.assertRaises(Spotifice.TrackError):
+            self.sut.append_tracks('test_playlist', ['bad-track-id'])
+
+    def test_remove_and_move(self):
+        self.sut.remove_track('test_playlist', 0)
+        self.sut.move_track('test_playlist', 1, 0)
+
+        playlist = self.sut.get_playlist('test_playlist')
+        self.assertEqual(playlist.track_ids, ['4s.mp3', '2s.mp3'])
+
+    def test_remove_out_of_range(self):
+        with self.assertRaises(Spotifice.PlaylistError):
+            self.sut.remove_track('test_playlist', 10)
+
+    def test_edits_are_persisted(self):
+        playlist = self.sut.create_playlist('Saved', '', 'user')
+        self.sut.append_tracks(playlist.id, ['2s.mp3'])
+
+        path = f'{self.playlists_dir}/{playlist.id}.playlist'
+        for _ in range(20):
+            if os.path.exists(path):
+                break
+            time.sleep(0.1)
+
+        with open(path) as f:
+            self.assertEqual(json.load(f)['track_ids'], ['2s.mp3'])
+
+
+class CatalogSyncTests(TestServer):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.playlists_dir = shutil.copytree('test/playlists', f'{tmp.name}/playlists')
+        super().setUp()
+
+    def test_no_changes(self):
+        known = self.sut.get_catalog_version()
+        changes = self.sut.get_changes_since(known.epoch, known.version)
+        self.assertEqual((changes.epoch, changes.version), (known.epoch, known.version))
+        self.assertFalse(changes.full_resync)
+        self.assertEqual(changes.playlists_modified, [])
+
+    def test_playlist_changes(self):
+        known = self.sut.get_catalog_version()
+        playlist = self.sut.create_playlist('Delta', '', 'user')
+        self.sut.remove_track('test_playlist', 0)
+
+        changes = self.sut.get_changes_since(known.epoch, known.version)
+        self.assertEqual([p.id for p in changes.playlists_added], [playlist.id])
+        self.assertEqual([p.id for p in changes.playlists_modified], ['test_playlist'])
+        self.assertEqual(len(changes.playlists_modified[0].track_ids), 2)
+        self.assertEqual(changes.tracks_modified, [])
+
+        later = self.sut.get_changes_since(changes.epoch, changes.version)
+        self.assertEqual(later.playlists_added, [])
+
+    def test_unknown_version_requires_resync(self):
+        epoch = self.sut.get_catalog_version().epoch
+        self.assertTrue(self.sut.get_changes_since(epoch, 0).full_resync)
+
+    def test_other_epoch_requires_resync(self):
+        known = self.sut.get_catalog_version()
+        changes = self.sut.get_changes_since(known.epoch + 1, known.version)
+        self.assertTrue(changes.full_resync)
+        self.assertEqual(changes.epoch, known.epoch)
+
+
+class CatalogSyncTruncatedTests(TestServer):
+    extra_props = {'MediaServer.Catalog.MaxChanges': '1'}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.playlists_dir = shutil.copytree('test/playlists', f'{tmp.name}/playlists')
+        super().setUp()
+
+    def test_truncated_log_requires_resync(self):
+        known = self.sut.get_catalog_version()
+        self.sut.create_playlist('One', '', 'user')
+        self.sut.create_playlist('Two', '', 'user')
+        changes = self.sut.get_changes_since(known.epoch, known.version)
+        self.assertTrue(changes.full_resync)
+
+
+class ConcurrencyTests(TestServer):
+    extra_props = {
+        'Ice.ThreadPool.Server.Size': '8',
+        'Ice.ThreadPool.Server.SizeMax': '16',
+    }
+    workers = 16
+    rounds = 20
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.playlists_dir = shutil.copytree('test/playlists', f'{tmp.name}/playlists')
+        super().setUp()
+
+        with open('test/media/2s.mp3', 'rb') as f:
+            self.expected = f.read()
+
+    def run_workers(self, work):
+        with ThreadPoolExecutor(self.workers) as executor:
+            for future in [executor.submit(work, i) for i in range(self.workers)]:
+                future.result()
+
+    def stream(self, session, track_id='2s.mp3', chunk_size=1000):
+        session.open_stream(track_id, Spotifice.StreamQuality.AUTO)
+        data = b''
+        while chunk := session.get_audio_chunk(chunk_size):
+            data += chunk
+        return data
+
+    def test_sessions_in_parallel(self):
+        def work(i):
+            session = self.sut.authenticate(self.mock_render, "user", "secret")
+            for _ in range(self.rounds // 4):
+                self.assertEqual(self.stream(session), self.expected)
+                self.sut.get_all_tracks()
+            session.close()
+
+        self.run_workers(work)
+
+    def test_shared_session_hammered(self):
+        # Muchos hilos sobre la MISMA sesión: cada llamada debe ver un
+        # estado coherente (un chunk o un error del contrato, nunca otra cosa)
+        session = self.sut.authenticate(self.mock_render, "user", "secret")
+
+        def work(i):
+            for n in range(self.rounds):
+                try:
+                    if n % 5 == 0:
+                        session.open_stream('4s.mp3', Spotifice.StreamQuality.AUTO)
+                    elif n % 7 == 0:
+                        session.close_stream()
+                    else:
+                        session.get_audio_chunk(512)
+                except Spotifice.StreamError as e:
+                    self.assertEqual(e.reason, 'No stream open')
+
+        self.run_workers(work)
+        self.assertEqual(self.stream(session), self.expected)
+
+    def test_concurrent_playlist_edits(self):
+        playlist = self.sut.create_playlist('Stress', '', 'user')
+
+        def work(i):
+            for _ in range(self.rounds):
+                self.sut.append_tracks(playlist.id, ['1s.mp3'])
+                self.sut.get_all_playlists()
+
+        self.run_workers(work)
+        playlist = self.sut.get_playlist(playlist.id)
+        self.assertEqual(len(playlist.track_ids), self.workers * self.rounds)
+
+
+class WorkerTests(TestServer):
+    base_port = 10110
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.extra_props = {
+            'MediaServer.Workers': '2',
+            'MediaServer.Workers.BasePort': str(self.base_port),
+            'MediaServer.Workers.Snapshot': f'{tmp.name}/catalog.json',
+        }
+        self.playlists_dir = shutil.copytree('test/playlists', f'{tmp.name}/playlists')
+        super().setUp()
+
+    def worker_port(self, session):
+        return session.ice_getEndpoints()[0].getInfo().port
+
+    def test_sessions_are_spread_across_workers(self):
+        sessions = [self.sut.authenticate(self.mock_render, "user", "secret")
+                    for _ in range(4)]
+        ports = {self.worker_port(session) for session in sessions}
+        self.assertEqual(ports, {self.base_port, self.base_port + 1})
+
+    def test_worker_streams(self):
+        session = self.sut.authenticate(self.mock_render, "user", "secret")
+        session.open_stream('1s.mp3', Spotifice.StreamQuality.AUTO)
+
+        data = b''
+        while chunk := session.get_audio_chunk(4096):
+            data += chunk
+        with open('test/media/1s.mp3', 'rb') as f:
+            self.assertEqual(data, f.read())
+
+    def test_worker_rejects_bad_password(self):
+        with self.assertRaises(Spotifice.AuthError):
+            self.sut.authenticate(self.mock_render, "user", "wrong")
+
+    def test_playlist_created_after_start(self):
+        session = self.sut.authenticate(self.mock_render, "user", "secret")
+        playlist = self.sut.create_playlist('Late', '', 'user')
+        self.sut.append_tracks(playlist.id, ['1s.mp3', '2s.mp3'])
+
+        # El worker no la tiene en su copia del arranque: la pide al supervisor
+        session.set_playlist_context(playlist.id, 0, False)
+        with self.assertRaises(Spotifice.PlaylistError):
+            session.set_playlist_context('missing', 0, False)
+
+    def test_resume_is_routed_to_worker(self):
+        sessions = [self.sut.authenticate(self.mock_render, "user", "secret")
+                    for _ in range(2)]
+        for session in sessions:
+            resumed = self.sut.resume(self.mock_render, session.get_resume_token())
+            self.assertEqual(resumed.ice_getIdentity(), session.ice_getIdentity())
+            self.assertEqual(self.worker_port(resumed), self.worker_port(session))
+
+
+class ProfilerTests(TestServer):
+    admin_port = 10020
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.extra_props = {
+            'Ice.Admin.Endpoints': f'tcp -h 127.0.0.1 -p {self.admin_port}',
+            'Ice.Admin.InstanceName': 'TestServer',
+            'Profiler.Dir': tmp.name,
+        }
+        super().setUp()
+        self.profiler = self.create_proxy(
+            f'TestServer/admin -f Profiler:tcp -h 127.0.0.1 -p {self.admin_port}',
+            Spotifice.ProfilerPrx)
+
+    def test_sampling_profile(self):
+        self.profiler.start_sampling(1)
+        for _ in range(20):
+            self.sut.get_all_tracks()
+        path = self.profiler.stop_sampling()
+
+        with open(path) as f:
+            self.assertTrue(f.read())
+
+    def test_stop_without_start(self):
+        with self.assertRaises(Spotifice.ProfilerError):
+            self.profiler.stop_sampling()
+
+    def test_memory_snapshot(self):
+        self.profiler.start_memory_tracing(5)
+        self.sut.authenticate(self.mock_render, "user", "secret")
+        path = self.profiler.take_memory_snapshot()
+        self.profiler.stop_memory_tracing()
+        self.assertTrue(os.path.exists(path))
+
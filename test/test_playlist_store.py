@@ -0,0 +1,71 @@
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import TestCase
+
+from playlist_store import PlaylistWriter, parse_timestamp, stream_playlist
+
+
+class StreamPlaylistTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'big.playlist'
+
+    def write(self, data):
+        self.path.write_text(json.dumps(data, indent=4))
+
+    def test_small_chunks(self):
+        fields = {
+            'id': 'big', 'name': 'Big "one"', 'created_at': '25-05-2011',
+            'count': 1234567890123, 'extra': {'nested': [1, 2]}}
+        track_ids = [f'track-{i}.mp3' for i in range(500)]
+        self.write(dict(fields, track_ids=track_ids))
+
+        for chunk_size in (1, 3, 64):
+            events = list(stream_playlist(self.path, chunk_size))
+            self.assertEqual([v for k, v in events if k == 'track_id'], track_ids)
+            self.assertEqual({k: v for k, v in events if k != 'track_id'}, fields)
+
+    def test_empty_playlist(self):
+        self.write({'id': 'empty', 'track_ids': []})
+        self.assertEqual(list(stream_playlist(self.path, 2)), [('id', 'empty')])
+
+    def test_truncated_file(self):
+        self.path.write_text('{"id": "x", "track_ids": ["a.mp3", "b.m')
+        with self.assertRaises(ValueError):
+            list(stream_playlist(self.path, 4))
+
+
+class TimestampTests(TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_timestamp('25-05-2011'), 1306281600)
+        self.assertEqual(parse_timestamp('2025-01-01'), 1735689600)
+        self.assertEqual(parse_timestamp('2025-01-01T00:00:00Z'), 1735689600)
+        self.assertEqual(parse_timestamp(''), 0)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            parse_timestamp('yesterday')
+
+
+class PlaylistWriterTests(TestCase):
+    def test_batched_atomic_write(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / 'p.playlist'
+
+        writer = PlaylistWriter(delay=5)
+        writer.start()
+        for n in range(3):
+            writer.schedule(path, SimpleNamespace(
+                id='p', name='P', description='', owner='o', created_at=0,
+                track_ids=['a.mp3'] * n))
+
+        self.assertFalse(path.exists())
+        self.assertTrue(writer.flush(2))
+        writer.close()
+
+        self.assertEqual(json.loads(path.read_text())['track_ids'], ['a.mp3'] * 2)
+        self.assertEqual(list(Path(tmp.name).iterdir()), [path])
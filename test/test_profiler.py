@@ -0,0 +1,62 @@
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import TestCase
+
+from profiler import Profiling
+
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.profiling = Profiling(Path(tmp.name), 'test')
+
+    def test_sampling_covers_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_worker, args=(stop,), name="Busy")
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(stop.set)
+
+        self.profiling.start_sampling(0.001)
+        time.sleep(0.2)
+        path = self.profiling.stop_sampling()
+
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        busy = [line for line in lines if line.startswith('Busy;')]
+        self.assertTrue(any('busy_worker' in line for line in busy))
+        stack, count = busy[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+
+    def test_sampling_twice_fails(self):
+        self.profiling.start_sampling()
+        self.addCleanup(self.profiling.stop_sampling)
+        with self.assertRaises(RuntimeError):
+            self.profiling.start_sampling()
+
+    def test_stop_without_start_fails(self):
+        with self.assertRaises(RuntimeError):
+            self.profiling.stop_sampling()
+
+    def test_memory_snapshot(self):
+        self.profiling.start_memory_tracing(5)
+        self.addCleanup(self.profiling.stop_memory_tracing)
+        data = [bytearray(1024) for _ in range(100)]
+
+        path = self.profiling.take_memory_snapshot()
+        self.assertGreater(len(tracemalloc.Snapshot.load(str(path)).traces), 0)
+        self.assertIn('Total traced', path.with_suffix('.txt').read_text())
+        del data
+
+    def test_memory_snapshot_needs_tracing(self):
+        with self.assertRaises(RuntimeError):
+            self.profiling.take_memory_snapshot()
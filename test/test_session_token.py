@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from session_token import TokenError, TokenSigner
+
+
+class TokenSignerTests(TestCase):
+    def setUp(self):
+        self.signer = TokenSigner('secret', ttl=60)
+
+    def test_round_trip(self):
+        token = self.signer.issue('user', 'session-1', '2')
+        claims = self.signer.verify(token)
+        self.assertEqual(claims['user'], 'user')
+        self.assertEqual(claims['session'], 'session-1')
+        self.assertEqual(claims['home'], '2')
+
+    def test_other_secret_rejected(self):
+        token = TokenSigner('other').issue('user', 'session-1')
+        with self.assertRaises(TokenError):
+            self.signer.verify(token)
+
+    def test_tampered_claims_rejected(self):
+        token = self.signer.issue('user', 'session-1')
+        forged = self.signer.issue('admin', 'session-1')
+        with self.assertRaises(TokenError):
+            self.signer.verify(forged.split('.')[0] + '.' + token.split('.')[1])
+
+    def test_expired(self):
+        token = self.signer.issue('user', 'session-1', now=1000)
+        self.assertEqual(self.signer.verify(token, now=1059)['user'], 'user')
+        with self.assertRaises(TokenError):
+            self.signer.verify(token, now=1061)
+
+    def test_malformed(self):
+        for token in ('', 'abc', 'a.b.c', '!!!.xyz', 'YQ.é', 'é.YQ'):
+            with self.assertRaises(TokenError):
+                self.signer.verify(token)
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase
+
+from shared_reader import REGION_SIZE, HeadCache, SharedReaderPool
+
+AUDIO = os.urandom(5 * REGION_SIZE + 123)
+
+
+class SharedReaderTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'track.mp3'
+        self.path.write_bytes(AUDIO)
+
+    def read_all(self, follower, size=4096):
+        data = b''
+        while chunk := follower.read(size):
+            data += chunk
+        return data
+
+    def test_followers_share_one_reader(self):
+        pool = SharedReaderPool(window=2 * REGION_SIZE)
+        a = pool.attach(self.path)
+        b = pool.attach(self.path)
+        self.assertIs(a.reader, b.reader)
+
+        # Lecturas intercaladas, casi en la misma posición
+        received = [b'', b'']
+        while True:
+            chunks = [a.read(4096), b.read(4096)]
+            if not any(chunks):
+                break
+            received[0] += chunks[0]
+            received[1] += chunks[1]
+
+        self.assertEqual(received, [AUDIO, AUDIO])
+        self.assertEqual(a.reader.disk_bytes, len(AUDIO))
+
+    def test_laggard_outside_window(self):
+        pool = SharedReaderPool(window=REGION_SIZE)
+        leader = pool.attach(self.path)
+        laggard = pool.attach(self.path)
+
+        self.assertEqual(self.read_all(leader), AUDIO)
+        self.assertEqual(self.read_all(laggard, 1000), AUDIO)
+
+    def test_memory_bounded_by_window(self):
+        pool = SharedReaderPool(window=REGION_SIZE)
+        follower = pool.attach(self.path)
+        self.read_all(follower)
+        self.assertLessEqual(len(follower.reader.buffer), REGION_SIZE)
+
+    def test_read_larger_than_window(self):
+        pool = SharedReaderPool(window=2 * REGION_SIZE)
+        follower = pool.attach(self.path)
+        split = 4096 + 3 * REGION_SIZE
+        head = follower.read(4096)
+        self.assertEqual(head + follower.read(3 * REGION_SIZE), AUDIO[:split])
+        self.assertEqual(self.read_all(follower), AUDIO[split:])
+
+    def test_window_smaller_than_region(self):
+        pool = SharedReaderPool(window=32768)
+        a = pool.attach(self.path)
+        b = pool.attach(self.path)
+        self.assertEqual(self.read_all(a, 8192), AUDIO)
+        self.assertEqual(self.read_all(b, 50000), AUDIO)
+        # Pasada la lectura, el buffer vuelve a caber en la ventana
+        self.assertLessEqual(len(a.reader.buffer), REGION_SIZE + 32768)
+
+    def test_reader_closed_with_last_follower(self):
+        pool = SharedReaderPool()
+        a = pool.attach(self.path)
+        b = pool.attach(self.path)
+
+        a.close()
+        self.assertEqual(len(pool.readers), 1)
+        b.close()
+        self.assertEqual(pool.readers, {})
+
+    def test_distinct_files_get_distinct_readers(self):
+        other = self.path.with_name('other.mp3')
+        other.write_bytes(AUDIO)
+
+        pool = SharedReaderPool()
+        a = pool.attach(self.path)
+        b = pool.attach(other)
+        self.assertIsNot(a.reader, b.reader)
+
+
+class HeadCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.path = self.dir / 'next.mp3'
+        self.path.write_bytes(AUDIO)
+
+    def test_warmed_head_is_not_read_again(self):
+        pool = SharedReaderPool(heads=HeadCache(head_size=REGION_SIZE))
+        pool.heads.load(self.path)
+
+        follower = pool.attach(self.path)
+        data = b''
+        while chunk := follower.read(4096):
+            data += chunk
+        self.assertEqual(data, AUDIO)
+        self.assertEqual(follower.reader.disk_bytes, len(AUDIO) - REGION_SIZE)
+        self.assertEqual(pool.heads.size, 0)
+
+    def test_memory_is_bounded(self):
+        heads = HeadCache(head_size=REGION_SIZE, max_bytes=2 * REGION_SIZE)
+        paths = []
+        for i in range(4):
+            paths.append(self.dir / f'{i}.mp3')
+            paths[-1].write_bytes(AUDIO)
+            heads.load(paths[-1])
+
+        self.assertEqual(heads.size, 2 * REGION_SIZE)
+        # Se conservan las más recientes
+        self.assertEqual(heads.take(os.stat(paths[0])), b'')
+        self.assertEqual(heads.take(os.stat(paths[3])), AUDIO[:REGION_SIZE])
+
+    def test_modified_file_is_not_served_stale(self):
+        heads = HeadCache(head_size=REGION_SIZE)
+        heads.load(self.path)
+        os.utime(self.path, ns=(0, 0))
+        self.assertEqual(heads.take(os.stat(self.path)), b'')
+
+    def test_warm_skips_open_files(self):
+        pool = SharedReaderPool(heads=HeadCache(head_size=REGION_SIZE))
+        pool.attach(self.path)
+        pool.warm(self.path)
+        pool.warmer.shutdown(wait=True)
+        self.assertEqual(pool.heads.size, 0)
+
+    def test_prediction_runs_on_warmer(self):
+        pool = SharedReaderPool(heads=HeadCache(head_size=REGION_SIZE))
+        threads = []
+
+        def locate():
+            threads.append(threading.current_thread())
+            return self.path
+
+        pool.warm_predicted(locate)
+        pool.warmer.shutdown(wait=True)
+        self.assertNotEqual(threads, [threading.current_thread()])
+        self.assertEqual(pool.heads.size, REGION_SIZE)
@@ -0,0 +1,129 @@
+import threading
+import time
+from unittest import TestCase
+
+from stream_scheduler import StreamScheduler, TokenBucket, mp3_bitrate
+
+BITRATE = 8000  # 1000 bytes/s
+
+
+class TokenBucketTests(TestCase):
+    def test_burst_is_free(self):
+        bucket = TokenBucket(rate=1000, burst=5000)
+        self.assertEqual(bucket.consume(5000), 0)
+
+    def test_debt_becomes_delay(self):
+        bucket = TokenBucket(rate=1000, burst=0)
+        self.assertAlmostEqual(bucket.consume(500), 0.5, places=2)
+        self.assertAlmostEqual(bucket.consume(500), 1.0, places=2)
+
+
+class StreamSchedulerTests(TestCase):
+    def create(self, **kwargs):
+        scheduler = StreamScheduler(**kwargs)
+        self.addCleanup(scheduler.shutdown)
+        return scheduler
+
+    def admit(self, scheduler, premium=False):
+        result = {}
+        event = threading.Event()
+
+        def on_admit(ticket):
+            result['ticket'] = ticket
+            event.set()
+
+        def on_reject(reason):
+            result['reason'] = reason
+            event.set()
+
+        scheduler.admit(premium, BITRATE, on_admit, on_reject)
+        return result, event
+
+    def test_rate_follows_bitrate_and_class(self):
+        scheduler = self.create(speed=2, premium_speed=4)
+        standard, _ = self.admit(scheduler)
+        premium, _ = self.admit(scheduler, premium=True)
+        self.assertEqual(standard['ticket'].rate, 2000)
+        self.assertEqual(premium['ticket'].rate, 4000)
+
+    def test_idle_ticket_is_released(self):
+        scheduler = self.create(max_streams=1, idle_timeout=0.2)
+        first, _ = self.admit(scheduler)
+        second, event = self.admit(scheduler)
+        self.assertEqual(second, {})
+
+        # El primero no vuelve a pedir audio: su plaza pasa al segundo
+        self.assertTrue(event.wait(2))
+        self.assertIn('ticket', second)
+        self.assertNotIn(first['ticket'], scheduler.active)
+
+    def test_active_ticket_is_kept(self):
+        scheduler = self.create(max_streams=1, idle_timeout=0.3)
+        first, _ = self.admit(scheduler)
+        for _ in range(6):
+            time.sleep(0.1)
+            first['ticket'].consume(10)
+        self.assertIn(first['ticket'], scheduler.active)
+
+    def test_reject_when_full(self):
+        scheduler = self.create(max_streams=1, queue_timeout=0)
+        self.admit(scheduler)
+        result, _ = self.admit(scheduler)
+        self.assertEqual(result, {'reason': 'Server busy'})
+
+    def test_queued_until_release(self):
+        scheduler = self.create(max_streams=1)
+        first, _ = self.admit(scheduler)
+        second, event = self.admit(scheduler)
+        self.assertEqual(second, {})
+
+        first['ticket'].release()
+        self.assertTrue(event.wait(1))
+        self.assertIn('ticket', second)
+
+    def test_queue_timeout(self):
+        scheduler = self.create(max_streams=1, queue_timeout=0.1)
+        self.admit(scheduler)
+        result, event = self.admit(scheduler)
+        self.assertTrue(event.wait(1))
+        self.assertEqual(result, {'reason': 'Server busy'})
+
+    def test_premium_reserve(self):
+        scheduler = self.create(max_streams=5, premium_reserve=0.2, queue_timeout=0)
+        for _ in range(4):
+            self.assertIn('ticket', self.admit(scheduler)[0])
+
+        self.assertIn('reason', self.admit(scheduler)[0])
+        self.assertIn('ticket', self.admit(scheduler, premium=True)[0])
+
+    def test_premium_served_first(self):
+        scheduler = self.create(max_streams=1)
+        first, _ = self.admit(scheduler)
+        standard, _ = self.admit(scheduler)
+        premium, event = self.admit(scheduler, premium=True)
+
+        first['ticket'].release()
+        self.assertTrue(event.wait(1))
+        self.assertIn('ticket', premium)
+        self.assertEqual(standard, {})
+
+    def test_bandwidth_cap(self):
+        scheduler = self.create(max_bandwidth=3000, speed=2, queue_timeout=0)
+        self.assertIn('ticket', self.admit(scheduler)[0])
+        self.assertIn('reason', self.admit(scheduler)[0])
+
+    def test_delayed_calls(self):
+        scheduler = self.create()
+        event = threading.Event()
+        start = time.monotonic()
+        scheduler.delays.call_later(0.1, event.set)
+        self.assertTrue(event.wait(1))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+
+class Mp3BitrateTests(TestCase):
+    def test_header_bitrate(self):
+        self.assertEqual(mp3_bitrate('test/media/1s.mp3'), 56000)
+
+    def test_not_mp3(self):
+        self.assertIsNone(mp3_bitrate('test/media/bad-file.mp3'))
@@ -0,0 +1,97 @@
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import TestCase
+
+from trace_report import build_tree, format_trace, load_spans
+from tracing import SPAN_ID, TRACE_ID, Tracer
+
+
+class TracerTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def tracer(self, name, **kwargs):
+        tracer = Tracer(self.dir / f'{name}.jsonl', service=name, **kwargs)
+        self.addCleanup(tracer.close)
+        return tracer
+
+    def records(self, name):
+        with open(self.dir / f'{name}.jsonl') as f:
+            return [json.loads(line) for line in f]
+
+    def test_propagation_across_processes(self):
+        client = self.tracer('client')
+        server = self.tracer('server')
+
+        with client.trace('play') as root:
+            # Lo que viajaría en el contexto de la petición de Ice
+            current = SimpleNamespace(ctx=client.context())
+            with server.span('open_stream', current):
+                with server.span('read'):
+                    pass
+
+        [play] = self.records('client')
+        open_stream, read = sorted(self.records('server'), key=lambda r: r['name'])
+        self.assertEqual(play['span_id'], root.span_id)
+        self.assertEqual(open_stream['trace_id'], root.trace_id)
+        self.assertEqual(open_stream['parent_id'], root.span_id)
+        self.assertEqual(read['parent_id'], open_stream['span_id'])
+
+    def test_no_context_without_trace(self):
+        server = self.tracer('server')
+        with server.span('get_audio_chunk', SimpleNamespace(ctx={})) as span:
+            self.assertIsNone(span)
+        self.assertEqual(server.context(), {})
+        self.assertEqual(self.records('server'), [])
+
+    def test_unsampled_trace_sends_nothing(self):
+        client = self.tracer('client', sample_rate=0)
+        with client.trace('play') as span:
+            self.assertIsNone(span)
+            self.assertEqual(client.context(), {})
+
+    def test_resume_in_other_thread(self):
+        tracer = self.tracer('render')
+        with tracer.trace('play'):
+            context = tracer.context()
+
+        with tracer.resume(context, 'first_chunk'):
+            pass
+
+        play, first = self.records('render')
+        self.assertEqual(first['parent_id'], context[SPAN_ID])
+        self.assertEqual(first['trace_id'], context[TRACE_ID])
+
+    def test_error_is_recorded(self):
+        tracer = self.tracer('render')
+        with self.assertRaises(RuntimeError):
+            with tracer.trace('play'):
+                raise RuntimeError("boom")
+        self.assertEqual(self.records('render')[0]['error'], "RuntimeError: boom")
+
+
+class TraceReportTests(TestCase):
+    def test_timeline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            client = Tracer(Path(tmp) / 'a.jsonl', service='client')
+            server = Tracer(Path(tmp) / 'b.jsonl', service='server')
+            with client.trace('play') as root:
+                with server.span('open_stream', SimpleNamespace(ctx=client.context())):
+                    pass
+            client.close()
+            server.close()
+
+            traces = load_spans([Path(tmp) / 'a.jsonl', Path(tmp) / 'b.jsonl'])
+
+        spans = traces[root.trace_id]
+        roots, children = build_tree(spans)
+        self.assertEqual([r['name'] for r in roots], ['play'])
+        self.assertEqual([c['name'] for c in children[root.span_id]], ['open_stream'])
+
+        report = format_trace(root.trace_id, spans)
+        self.assertIn('client', report)
+        self.assertIn('  open_stream', report)
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from track_cache import TrackCache
+
+AUDIO = b'some mp3 bytes' * 100
+VERSION = hashlib.sha256(AUDIO).hexdigest()
+
+
+class TrackCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def store(self, cache, version=VERSION, data=AUDIO, quality='AUTO', original=True):
+        writer = cache.writer(version, quality, original)
+        writer.write(data[:10])
+        writer.write(data[10:])
+        writer.commit()
+
+    def read(self, cache, version=VERSION, quality='AUTO'):
+        f = cache.open(version, quality)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def test_miss(self):
+        self.assertIsNone(self.read(TrackCache(self.dir)))
+
+    def test_hit_after_complete_stream(self):
+        cache = TrackCache(self.dir)
+        self.store(cache)
+        self.assertEqual(self.read(cache), AUDIO)
+
+    def test_entries_survive_restart(self):
+        self.store(TrackCache(self.dir))
+        self.assertEqual(self.read(TrackCache(self.dir)), AUDIO)
+
+    def test_aborted_stream_is_not_cached(self):
+        cache = TrackCache(self.dir)
+        writer = cache.writer(VERSION, 'AUTO', True)
+        writer.write(AUDIO[:10])
+        writer.abort()
+
+        self.assertIsNone(self.read(cache))
+        self.assertEqual(list(self.dir.iterdir()), [])
+
+    def test_original_must_match_version(self):
+        cache = TrackCache(self.dir)
+        self.store(cache, data=b'truncated')
+        self.assertIsNone(self.read(cache))
+
+    def test_corrupt_entry_is_dropped(self):
+        cache = TrackCache(self.dir)
+        self.store(cache)
+        next(self.dir.glob('*.mp3')).write_bytes(b'bit rot')
+
+        self.assertIsNone(self.read(cache))
+        self.assertEqual(cache.size, 0)
+
+    def test_unexpected_file_is_ignored(self):
+        self.store(TrackCache(self.dir))
+        (self.dir / 'stray.mp3').write_bytes(b'junk')
+
+        self.assertEqual(self.read(TrackCache(self.dir)), AUDIO)
+        self.assertTrue((self.dir / 'stray.mp3').exists())
+
+    def test_other_process_part_is_kept(self):
+        writer = TrackCache(self.dir).writer(VERSION, 'AUTO', True)
+        writer.write(AUDIO[:10])
+        self.addCleanup(writer.abort)
+
+        TrackCache(self.dir)
+        self.assertTrue(writer.path.exists())
+
+    def test_stale_parts_are_removed(self):
+        dead = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True).stdout.strip()
+        orphan = self.dir / f"{VERSION}.AUTO.{dead}-1.part"
+        orphan.write_bytes(b'half')
+        old = self.dir / f"{VERSION}.AUTO.{os.getpid()}-2.part"
+        old.write_bytes(b'half')
+        os.utime(old, (0, 0))
+
+        TrackCache(self.dir)
+        self.assertFalse(orphan.exists())
+        self.assertFalse(old.exists())
+
+    def test_lru_eviction(self):
+        cache = TrackCache(self.dir, max_bytes=len(AUDIO) * 2)
+        self.store(cache, version='a', original=False)
+        self.store(cache, version='b', original=False)
+        self.read(cache, version='a')
+        self.store(cache, version='c', original=False)
+
+        self.assertIsNotNone(self.read(cache, version='a'))
+        self.assertIsNone(self.read(cache, version='b'))
+        self.assertIsNotNone(self.read(cache, version='c'))
@@ -0,0 +1,68 @@
+import hashlib
+from collections import namedtuple
+from unittest import TestCase
+
+from track_table import FIELDS, TrackTable
+
+Track = namedtuple('Track', FIELDS)
+VERSION = hashlib.sha256(b'a').hexdigest()
+
+
+class TrackTableTests(TestCase):
+    def setUp(self):
+        self.table = TrackTable(Track)
+        self.table.append('a.mp3', 'a', 'a.mp3', version=VERSION)
+        self.table.append('copy.mp3', 'copy', 'a.mp3', version=VERSION)
+        self.table.append('b.mp3', 'b', 'b.mp3')
+
+    def test_lookup(self):
+        self.assertEqual(len(self.table), 3)
+        self.assertIn('b.mp3', self.table)
+        self.assertNotIn('c.mp3', self.table)
+        self.assertEqual(self.table['a.mp3'],
+                         Track('a.mp3', 'a', 'a.mp3', 0, 0.0, 0.0, VERSION))
+        self.assertEqual(self.table['b.mp3'].version, '')
+        self.assertIsNone(self.table.get('c.mp3'))
+
+    def test_strings_are_shared(self):
+        track = self.table['a.mp3']
+        self.assertIs(track.id, track.filename)
+
+    def test_analysis_applies_to_copies(self):
+        self.table.set_analysis('a.mp3', 1000, -3.5, 0.5)
+        for track_id in ('a.mp3', 'copy.mp3'):
+            track = self.table[track_id]
+            self.assertEqual((track.duration_ms, track.gain_db, track.peak),
+                             (1000, -3.5, 0.5))
+        self.assertEqual(self.table['b.mp3'].duration_ms, 0)
+
+    def test_columns(self):
+        self.table.set_analysis('b.mp3', 2000)
+        ids, titles, durations = self.table.columns()
+        self.assertEqual(ids, ['a.mp3', 'copy.mp3', 'b.mp3'])
+        self.assertEqual(titles, ['a', 'copy', 'b'])
+        self.assertEqual(list(durations), [0, 0, 2000])
+
+    def test_columns_are_copies(self):
+        ids, _, _ = self.table.columns()
+        self.table.append('c.mp3', 'c', 'c.mp3')
+        self.assertEqual(len(ids), 3)
+
+    def test_values_follow_analysis(self):
+        first = self.table.values()
+        self.table.set_analysis('b.mp3', 2000)
+        self.assertEqual(self.table.values()[2].duration_ms, 2000)
+        self.assertEqual(first[2].duration_ms, 0)
+
+    def test_records_round_trip(self):
+        self.table.set_analysis('b.mp3', 2000, -1.0)
+        copy = TrackTable(Track)
+        for record in self.table.records():
+            copy.append(**record)
+        self.assertEqual(copy.values(), self.table.values())
+        self.assertEqual(self.table.records()[2],
+                         {'id': 'b.mp3', 'title': 'b', 'filename': 'b.mp3',
+                          'duration_ms': 2000, 'gain_db': -1.0})
+
+    def test_distinct_filenames(self):
+        self.assertEqual(sorted(self.table.distinct_filenames()), ['a.mp3', 'b.mp3'])
@@ -0,0 +1,45 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from transcoder import VariantCache
+
+
+class VariantCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = Path(tmp.name) / 'media'
+        self.media.mkdir()
+        self.source = self.media / 'track.mp3'
+        self.source.write_bytes(b'original')
+        self.sut = VariantCache(Path(tmp.name) / 'cache', bitrates=(64,))
+        self.sut.cache_dir.mkdir()
+
+    def test_lookup_missing_variant(self):
+        self.assertIsNone(self.sut.lookup(self.source, 64))
+
+    def test_lookup_ready_variant(self):
+        variant = self.sut.variant_path(self.source, 64)
+        variant.write_bytes(b'variant')
+        self.assertEqual(self.sut.lookup(self.source, 64), variant)
+
+    def test_variant_invalidated_when_source_changes(self):
+        self.sut.variant_path(self.source, 64).write_bytes(b'variant')
+
+        self.source.write_bytes(b'modified source')
+        os.utime(self.source, ns=(0, 1))
+        self.assertIsNone(self.sut.lookup(self.source, 64))
+
+    def test_prune_removes_stale_variants(self):
+        stale = self.sut.variant_path(self.source, 64)
+        stale.write_bytes(b'variant')
+        other = self.sut.cache_dir / 'other.1-1.64k.mp3'
+        other.write_bytes(b'other')
+
+        self.source.write_bytes(b'modified source')
+        self.sut.prune(self.source)
+
+        self.assertFalse(stale.exists())
+        self.assertTrue(other.exists())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Reconstruye la línea de tiempo de cada petición a partir de los ficheros de
+trazas (Tracing.File) del cliente, el render y el servidor.
+Uso: trace_report.py [--trace ID] [--slowest N] <fichero.jsonl>...
+
+Los instantes de inicio vienen del reloj de cada proceso: entre máquinas
+distintas los desfases incluyen la diferencia entre sus relojes.
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+
+def load_spans(paths):
+    traces = defaultdict(list)
+    for path in paths:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                traces[span['trace_id']].append(span)
+    return traces
+
+
+def build_tree(spans):
+    """Devuelve las raíces y los hijos de cada span, ordenados por inicio."""
+    ids = {span['span_id'] for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in sorted(spans, key=lambda s: s['start']):
+        if span['parent_id'] in ids:
+            children[span['parent_id']].append(span)
+        else:
+            # Sin padre conocido: raíz, o su padre no se registró
+            roots.append(span)
+    return roots, children
+
+
+def trace_duration(spans):
+    start = min(s['start'] for s in spans)
+    end = max(s['start'] + s['duration_ms'] / 1000 for s in spans)
+    return (end - start) * 1000
+
+
+def format_trace(trace_id, spans):
+    roots, children = build_tree(spans)
+    origin = min(s['start'] for s in spans)
+    lines = [f"trace {trace_id} ({roots[0]['name']}) {trace_duration(spans):.1f} ms"]
+
+    def walk(span, depth):
+        offset = (span['start'] - origin) * 1000
+        error = f"  !! {span['error']}" if 'error' in span else ""
+        lines.append(
+            f"  {offset:>+9.1f} ms {span['duration_ms']:>9.1f} ms  "
+            f"{span['service']:<16}{'  ' * depth}{span['name']}{error}")
+        for child in children[span['span_id']]:
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--trace', help="mostrar solo esta traza")
+    parser.add_argument('--slowest', type=int, help="mostrar las N trazas más lentas")
+    args = parser.parse_args()
+
+    traces = load_spans(args.files)
+    if args.trace:
+        if args.trace not in traces:
+            sys.exit(f"Trace '{args.trace}' not found")
+        traces = {args.trace: traces[args.trace]}
+
+    order = sorted(traces, key=lambda t: min(s['start'] for s in traces[t]))
+    if args.slowest:
+        order = sorted(traces, key=lambda t: trace_duration(traces[t]), reverse=True)
+        order = order[:args.slowest]
+
+    for trace_id in order:
+        print(format_trace(trace_id, traces[trace_id]))
+        print()
+
+
+if __name__ == "__main__":
+    main()
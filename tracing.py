@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("Tracing")
+
+# Claves del contexto de petición de Ice que llevan la traza entre procesos
+TRACE_ID = 'trace-id'
+SPAN_ID = 'span-id'
+
+
+class Span:
+    def __init__(self, trace_id, name, parent_id=None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.attributes = {}
+
+    def context(self):
+        return {TRACE_ID: self.trace_id, SPAN_ID: self.span_id}
+
+    def record(self, service, error=None):
+        record = {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'service': service,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': (time.perf_counter_ns() - self.start_ns) / 1e6,
+        }
+        if self.attributes:
+            record['attributes'] = self.attributes
+        if error:
+            record['error'] = error
+        return record
+
+
+class Tracer:
+    """
+    Trazas de extremo a extremo. El cliente abre la traza (trace) y pasa su
+    contexto en cada llamada (context=tracing.context()); cada servidor abre
+    un span hijo a partir del Ice.Current (span). Los spans terminados se
+    añaden como JSON lines al fichero de este proceso.
+
+    El muestreo se decide solo en la raíz: una traza no muestreada no envía
+    contexto, así que los demás procesos no registran nada para ella.
+    """
+    def __init__(self, path=None, sample_rate=1.0, service='spotifice'):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.fd = None
+        self.local = threading.local()
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # O_APPEND: varios procesos (p. ej. los workers) comparten el fichero
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    @property
+    def enabled(self):
+        return self.fd is not None
+
+    @property
+    def active(self):
+        return getattr(self.local, 'span', None)
+
+    def context(self):
+        """Contexto a propagar en las llamadas salientes ({} sin traza)."""
+        span = self.active
+        return span.context() if span else {}
+
+    @contextmanager
+    def trace(self, name):
+        """Abre una traza nueva (solo en el cliente), según el muestreo."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        with self.run(Span(secrets.token_hex(16), name)) as span:
+            yield span
+
+    @contextmanager
+    def span(self, name, current=None):
+        """
+        Span hijo del activo en este hilo o, si no hay, del que llega en el
+        contexto de la petición. Sin traza en curso no registra nada.
+        """
+        parent = self.active
+        if parent:
+            span = Span(parent.trace_id, name, parent.span_id)
+        elif self.enabled and current is not None and TRACE_ID in (current.ctx or {}):
+            span = Span(current.ctx[TRACE_ID], name, current.ctx.get(SPAN_ID))
+        else:
+            yield None
+            return
+
+        with self.run(span):
+            yield span
+
+    @contextmanager
+    def resume(self, context, name):
+        """Span en otro hilo a partir de un contexto capturado con context()."""
+        if not context or not self.enabled:
+            yield None
+            return
+
+        with self.run(Span(context[TRACE_ID], name, context.get(SPAN_ID))) as span:
+            yield span
+
+    @contextmanager
+    def run(self, span):
+        previous, self.local.span = self.active, span
+        error = None
+        try:
+            yield span
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.local.span = previous
+            self.emit(span.record(self.service, error))
+
+    def emit(self, record):
+        line = (json.dumps(record) + '\n').encode()
+        try:
+            os.write(self.fd, line)
+        except OSError as e:
+            logger.warning(f"Could not write trace record: {e}")
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+# Tracer del proceso; inactivo hasta que se configura
+tracer = Tracer()
+
+
+def configure(properties, service):
+    """Activa el tracer del proceso con Tracing.File y Tracing.SampleRate."""
+    tracer.service = service
+    tracer.sample_rate = float(
+        properties.getPropertyWithDefault('Tracing.SampleRate', '1'))
+
+    path = properties.getProperty('Tracing.File')
+    if path and not tracer.enabled:
+        tracer.open(path)
+        logger.info(f"Tracing to '{path}' (sample rate {tracer.sample_rate})")
+
+
+trace = tracer.trace
+span = tracer.span
+resume = tracer.resume
+context = tracer.context
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger("TrackCache")
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Una descarga a medias sin tocar desde hace tanto ya no la termina nadie
+STALE_PART_AGE = 24 * 3600
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OverflowError):
+        pass
+    return True
+
+
+class CacheWriter:
+    """Va guardando los chunks de un stream; la pista solo entra al completarse."""
+    def __init__(self, cache, version, quality, served_original):
+        self.cache = cache
+        self.version = version
+        self.quality = quality
+        self.served_original = served_original
+        self.digest = hashlib.sha256()
+        self.size = 0
+        # Único por proceso y por escritor: varias zonas pueden bajar la misma pista
+        part = f"{version}.{quality}.{os.getpid()}-{id(self):x}.part"
+        self.path = cache.cache_dir / part
+        self.file = open(self.path, 'wb')
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        self.file.close()
+        digest = self.digest.hexdigest()
+
+        # Si nos sirvieron el original, su hash debe ser la versión de la pista
+        if self.served_original and digest != self.version:
+            logger.warning(f"Discarding corrupt download of '{self.version}'")
+            self.path.unlink(missing_ok=True)
+            return
+
+        self.cache.add(self.path, self.version, self.quality, digest, self.size)
+
+    def abort(self):
+        self.file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class TrackCache:
+    """
+    Caché en disco de pistas completas en el render, con límite de tamaño y
+    expulsión LRU. Cada entrada se identifica por la versión de la pista que
+    publica el servidor (hash de contenido) y la calidad pedida, y su nombre
+    lleva el hash de los bytes guardados para comprobarlos al reutilizarla.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.cache_dir.glob('*.part'):
+            if self.stale_part(path):
+                path.unlink(missing_ok=True)
+
+        # El mtime guarda el orden LRU entre ejecuciones
+        paths = sorted(self.cache_dir.glob('*.mp3'), key=lambda p: p.stat().st_mtime_ns)
+        for path in paths:
+            try:
+                version, quality, digest, _ = path.name.split('.')
+            except ValueError:
+                logger.warning(f"Ignoring unexpected file '{path.name}' in track cache")
+                continue
+            size = path.stat().st_size
+            self.entries[(version, quality)] = (path, digest, size)
+            self.size += size
+
+        logger.info(f"Track cache: {len(self.entries)} tracks, {self.size} bytes")
+
+    def stale_part(self, path):
+        """
+        Las descargas a medias de otro render que comparte el directorio se
+        respetan: solo se borran si su proceso ya no existe o llevan
+        demasiado tiempo sin escribirse.
+        """
+        try:
+            age = time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if age > STALE_PART_AGE:
+            return True
+        try:
+            pid = int(path.name.split('.')[2].split('-')[0])
+        except (IndexError, ValueError):
+            return True
+        return not process_alive(pid)
+
+    def open(self, version, quality):
+        """Devuelve la pista cacheada abierta para lectura, o None."""
+        with self.lock:
+            entry = self.entries.get((version, quality))
+            if entry is None:
+                return None
+            self.entries.move_to_end((version, quality))
+
+        path, digest, _ = entry
+        try:
+            with open(path, 'rb') as f:
+                valid = hashlib.file_digest(f, 'sha256').hexdigest() == digest
+            if valid:
+                os.utime(path)
+                return open(path, 'rb')
+        except OSError:
+            pass
+
+        logger.warning(f"Cached track '{path.name}' failed integrity check")
+        self.remove((version, quality))
+        return None
+
+    def writer(self, version, quality, served_original):
+        return CacheWriter(self, version, quality, served_original)
+
+    def add(self, part_path, version, quality, digest, size):
+        path = self.cache_dir / f"{version}.{quality}.{digest}.mp3"
+        os.replace(part_path, path)
+
+        with self.lock:
+            old = self.entries.pop((version, quality), None)
+            if old:
+                self.size -= old[2]
+                if old[0] != path:
+                    old[0].unlink(missing_ok=True)
+            self.entries[(version, quality)] = (path, digest, size)
+            self.size += size
+            self.evict()
+
+        logger.info(f"Cached track '{version}' ({quality}, {size} bytes)")
+
+    def remove(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry:
+                self.size -= entry[2]
+                entry[0].unlink(missing_ok=True)
+
+    def evict(self):
+        while self.size > self.max_bytes and self.entries:
+            _, (path, _, size) = self.entries.popitem(last=False)
+            self.size -= size
+            path.unlink(missing_ok=True)
+            logger.info(f"Evicted cached track '{path.name}'")
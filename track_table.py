@@ -0,0 +1,121 @@
+import sys
+import threading
+from array import array
+
+# Columnas de una fila, en el orden de los campos de Spotifice.TrackInfo
+FIELDS = ('id', 'title', 'filename', 'duration_ms', 'gain_db', 'peak', 'version')
+DIGEST_SIZE = 32  # la versión de una pista es su SHA-256
+
+
+class TrackTable:
+    """
+    Catálogo en columnas en lugar de un objeto por pista: listas de cadenas
+    internadas (id y fichero suelen coincidir y se comparten), arrays para
+    los números y los hashes en binario. Cada TrackInfo se construye con
+    'factory' solo cuando se pide.
+
+    Las filas se añaden al cargar el catálogo, antes de servirlo; después
+    solo cambian los datos de análisis, bajo el lock, de modo que quien lee
+    una fila nunca ve una mezcla de valores viejos y nuevos.
+    """
+    def __init__(self, factory=tuple):
+        self.factory = factory
+        self.ids = []
+        self.titles = []
+        self.filenames = []
+        self.durations = array('q')
+        self.gains = array('f')
+        self.peaks = array('f')
+        self.versions = bytearray()  # DIGEST_SIZE bytes por fila; ceros si no se conoce
+        self.index = {}
+        # Fichero -> fila, o lista de filas si hay copias con otro nombre
+        self.by_filename = {}
+        self.lock = threading.Lock()
+
+    def append(self, id, title, filename, duration_ms=0, gain_db=0.0, peak=0.0,
+               version=''):
+        row = len(self.ids)
+        id, filename = sys.intern(id), sys.intern(filename)
+        self.ids.append(id)
+        self.titles.append(sys.intern(title))
+        self.filenames.append(filename)
+        self.durations.append(duration_ms)
+        self.gains.append(gain_db)
+        self.peaks.append(peak)
+        self.versions += bytes.fromhex(version) if version else bytes(DIGEST_SIZE)
+        self.index[id] = row
+
+        rows = self.by_filename.get(filename)
+        if rows is None:
+            self.by_filename[filename] = row
+        elif isinstance(rows, int):
+            self.by_filename[filename] = [rows, row]
+        else:
+            rows.append(row)
+        return row
+
+    def rows_for(self, filename):
+        rows = self.by_filename.get(filename, [])
+        return [rows] if isinstance(rows, int) else rows
+
+    def ids_for(self, filename):
+        return [self.ids[row] for row in self.rows_for(filename)]
+
+    def version(self, row):
+        digest = self.versions[row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE]
+        return digest.hex() if any(digest) else ''
+
+    def values_at(self, row):
+        return (self.ids[row], self.titles[row], self.filenames[row], self.durations[row],
+                self.gains[row], self.peaks[row], self.version(row))
+
+    def set_analysis(self, filename, duration_ms, gain_db=None, peak=None):
+        with self.lock:
+            for row in self.rows_for(filename):
+                self.durations[row] = duration_ms
+                if gain_db is not None:
+                    self.gains[row] = gain_db
+                if peak is not None:
+                    self.peaks[row] = peak
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, track_id):
+        return track_id in self.index
+
+    def __getitem__(self, track_id):
+        row = self.index[track_id]
+        with self.lock:
+            return self.factory(*self.values_at(row))
+
+    def get(self, track_id, default=None):
+        return self[track_id] if track_id in self.index else default
+
+    def values(self):
+        """
+        Todas las filas (get_all_tracks). Bajo el lock solo se copian las
+        columnas que cambia el análisis; los objetos se construyen fuera y
+        no se guardan, para no volver a un objeto por pista en memoria.
+        """
+        with self.lock:
+            durations = array('q', self.durations)
+            gains, peaks = array('f', self.gains), array('f', self.peaks)
+        return [self.factory(self.ids[row], self.titles[row], self.filenames[row],
+                             durations[row], gains[row], peaks[row], self.version(row))
+                for row in range(len(durations))]
+
+    def records(self):
+        """Filas como diccionarios, sin los campos desconocidos (snapshot)."""
+        with self.lock:
+            return [{name: value for name, value in zip(FIELDS, self.values_at(row))
+                     if value or name in ('id', 'title', 'filename')}
+                    for row in range(len(self.ids))]
+
+    def columns(self):
+        """Ids, títulos y duraciones en paralelo (get_track_columns)."""
+        with self.lock:
+            return list(self.ids), list(self.titles), array('q', self.durations)
+
+    def distinct_filenames(self):
+        return self.by_filename.keys()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import partial
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("Transcoder")
+
+DEFAULT_BITRATES = (64, 128, 256)
+
+
+def source_key(source):
+    """Versión del fichero original: cambia si cambia su tamaño o su mtime."""
+    st = source.stat()
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def transcode(source, target, bitrate):
+    """
+    Recodifica 'source' a MP3 CBR de 'bitrate' kbps y lo deja en 'target'.
+    Se ejecuta dentro de un proceso del pool, por eso GStreamer se importa aquí.
+    """
+    from gst_player import init_gst
+    Gst = init_gst()
+
+    # Nombre temporal único: varias réplicas pueden compartir la caché
+    partial_target = target.with_name(f"{target.name}.{os.getpid()}.part")
+    pipeline = Gst.parse_launch(
+        'filesrc name=src ! decodebin ! audioconvert ! audioresample ! '
+        f'lamemp3enc target=bitrate cbr=true bitrate={bitrate} ! filesink name=sink')
+    pipeline.get_by_name('src').set_property('location', str(source))
+    pipeline.get_by_name('sink').set_property('location', str(partial_target))
+
+    pipeline.set_state(Gst.State.PLAYING)
+    msg = pipeline.get_bus().timed_pop_filtered(
+        Gst.CLOCK_TIME_NONE, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    pipeline.set_state(Gst.State.NULL)
+
+    if msg.type == Gst.MessageType.ERROR:
+        partial_target.unlink(missing_ok=True)
+        error, _ = msg.parse_error()
+        raise RuntimeError(f"{source.name} @ {bitrate}k: {error.message}")
+
+    # Renombrado atómico: nunca se sirve una variante a medio escribir
+    os.replace(partial_target, target)
+    return target
+
+
+class VariantCache:
+    """
+    Caché en disco de variantes de menor bitrate de cada pista.
+    El nombre de cada variante incluye la versión del original, así que
+    cuando el fichero fuente cambia la variante antigua deja de encontrarse.
+    """
+    def __init__(self, cache_dir, bitrates=DEFAULT_BITRATES, workers=0):
+        self.cache_dir = Path(cache_dir)
+        self.bitrates = tuple(bitrates)
+        self.workers = workers or os.cpu_count()
+        self.executor = None
+        self.pending = {}
+
+    def variant_path(self, source, bitrate):
+        return self.cache_dir / f"{source.stem}.{source_key(source)}.{bitrate}k.mp3"
+
+    def lookup(self, source, bitrate):
+        try:
+            path = self.variant_path(source, bitrate)
+        except OSError:
+            return None
+
+        return path if path.is_file() else None
+
+    def prune(self, source):
+        """Borra las variantes de 'source' generadas a partir de otra versión."""
+        current = source_key(source)
+        for path in self.cache_dir.glob('*.mp3'):
+            # <stem>.<versión>.<bitrate>k.mp3
+            parts = path.name.rsplit('.', 3)
+            if len(parts) == 4 and parts[0] == source.stem and parts[1] != current:
+                logger.info(f"Removing stale variant '{path.name}'")
+                path.unlink(missing_ok=True)
+
+    def generate(self, sources):
+        """
+        Encola en segundo plano las variantes que falten y devuelve los futures.
+        Cada variante se genera en un proceso distinto para repartir los núcleos.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+        for source in sources:
+            self.prune(source)
+            for bitrate in self.bitrates:
+                target = self.variant_path(source, bitrate)
+                if target.is_file() or target in self.pending:
+                    continue
+
+                future = self.executor.submit(transcode, source, target, bitrate)
+                self.pending[target] = future
+                future.add_done_callback(partial(self._on_done, target))
+
+        logger.info(f"Transcoding {len(self.pending)} variants "
+                    f"with {self.workers} workers")
+        return list(self.pending.values())
+
+    def _on_done(self, target, future):
+        self.pending.pop(target, None)
+        if future.cancelled():
+            return
+        if error := future.exception():
+            logger.error(f"Transcoding failed: {error}")
+        else:
+            logger.info(f"Variant ready: '{target.name}'")
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("Usage: transcoder.py <media-dir> <cache-dir> [bitrate,...]")
+
+    bitrates = DEFAULT_BITRATES
+    if len(sys.argv) > 3:
+        bitrates = [int(b) for b in sys.argv[3].split(',')]
+
+    cache = VariantCache(sys.argv[2], bitrates)
+    sources = sorted(Path(sys.argv[1]).glob('*.mp3'))
+    wait(cache.generate(sources))
+    cache.shutdown()